@@ -1,19 +1,53 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.core.middleware import attach_supabase_middleware
-from app.core.security import refresh_cookie_middleware
+from app.core.lifecycle import lifespan
+from app.core.middleware import RequestContextMiddleware
+from app.core.admission import AdmissionMiddleware, GradientLimit, CRITICAL, BULK, EXEMPT
+from app.core.compression import CompressionMiddleware
+from app.core.error_handlers import http_exception_handler, unavailable_handler
 from app.routes.auth_routes import router as auth_router
 from app.routes.account_routes import router as account_router
 from app.routes.transaction_routes import router as transaction_router
 from app.routes.update_routes import router as update_router
 from app.routes.history_routes import router as history_router
+from app.routes.audit_routes import router as audit_router
 from app.routes.debug_routes import router as debug_router
+from app.routes.metrics_routes import router as metrics_router
+from app.routes.health_routes import router as health_router
 from app.config import settings
+from app.services.repository import UnavailableError
+
+
+# Admission priority per router prefix (unlisted prefixes are `normal`).
+# Money operations are shed last, full history / audit dumps first.
+ROUTE_PRIORITIES = {
+    "/transaction": CRITICAL,
+    "/history": BULK,
+    "/audit": BULK,
+    "/health": EXEMPT,
+    "/metrics": EXEMPT,
+    "/auth/health": EXEMPT,
+}
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="RupeeWave API", version="3.0")
+    app = FastAPI(title="RupeeWave API", version="3.0", lifespan=lifespan)
+
+    # -------------------- ADMISSION --------------------
+    # Added first so it sits innermost: shed 503s still get CORS headers,
+    # a request ID and latency metrics from the layers around it.
+    if settings.ADMISSION_CONTROL:
+        app.add_middleware(
+            AdmissionMiddleware,
+            priorities=ROUTE_PRIORITIES,
+            limit=GradientLimit(
+                initial=settings.ADMISSION_INITIAL_LIMIT,
+                min_limit=settings.ADMISSION_MIN_LIMIT,
+                max_limit=settings.ADMISSION_MAX_LIMIT,
+            ),
+            retry_after=settings.ADMISSION_RETRY_AFTER,
+        )
 
     # -------------------- CORS --------------------
     app.add_middleware(
@@ -29,8 +63,20 @@ def create_app() -> FastAPI:
     )
 
     # ---------------- Middlewares ----------------
-    app.middleware("http")(attach_supabase_middleware)
-    app.middleware("http")(refresh_cookie_middleware)
+    app.add_middleware(
+        CompressionMiddleware,
+        min_size=settings.COMPRESSION_MIN_SIZE,
+        level=settings.COMPRESSION_LEVEL,
+    )
+
+    # One pure-ASGI pass: repositories, request ID, cookie refresh, timing.
+    # Added last so it is outermost and times the full stack.
+    app.add_middleware(RequestContextMiddleware)
+
+    # 400s caused by an unavailable backend, and unavailable errors nothing
+    # caught, go out as 503 + Retry-After
+    app.add_exception_handler(HTTPException, http_exception_handler)
+    app.add_exception_handler(UnavailableError, unavailable_handler)
 
     # ------------------- Routers -------------------
     app.include_router(auth_router, prefix="/auth", tags=["Auth"])
@@ -38,6 +84,9 @@ def create_app() -> FastAPI:
     app.include_router(transaction_router, prefix="/transaction", tags=["Transaction"])
     app.include_router(update_router, prefix="/update", tags=["Update"])
     app.include_router(history_router, prefix="/history", tags=["History"])
+    app.include_router(audit_router, prefix="/audit", tags=["Audit"])
     app.include_router(debug_router, prefix="/debug", tags=["Debug"])
+    app.include_router(metrics_router, tags=["Metrics"])
+    app.include_router(health_router, prefix="/health", tags=["Health"])
 
     return app
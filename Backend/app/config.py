@@ -6,6 +6,46 @@ class Settings(BaseSettings):
     # -------------------- GENERAL --------------------
     ENV: str = "dev"   # dev | prod
 
+    # -------------------- DATA BACKEND --------------------
+    DATA_BACKEND: str = "supabase"   # supabase | memory | postgres
+
+    # -------------------- POSTGRES (DATA_BACKEND=postgres) --------------------
+    DATABASE_URL: str = ""
+    PG_POOL_MIN_SIZE: int = 2
+    PG_POOL_MAX_SIZE: int = 10
+    PG_POOL_TIMEOUT: float = 5.0
+    PG_STATEMENT_CACHE_SIZE: int = 100
+    PG_POOL_MAX_IDLE: float = 300.0   # close connections idle longer than this (s)
+    PG_HEALTHCHECK: bool = True       # ping each connection on checkout
+
+    # -------------------- ACCOUNT SHARDING --------------------
+    SHARDS: str = ""                       # JSON list of shard backends ("" = one database); see app/services/sharding.py
+    SHARD_STRATEGY: str = "hash"           # hash | range (per-shard "from" account number)
+    SHARD_RECOVERY_INTERVAL: float = 30.0  # seconds between transfer recovery scans (0 = off)
+    SHARD_RECOVERY_AFTER: float = 60.0     # settle cross-shard transfer legs prepared this long ago
+
+    # -------------------- READ REPLICAS --------------------
+    READ_REPLICAS: str = ""                # JSON list of replica backends ("" = primary only); see app/services/replicas.py
+    READ_YOUR_WRITES_SECONDS: float = 2.0  # reads of an account stay on the primary at least this long after a write
+    REPLICA_MAX_LAG_SECONDS: float = 5.0   # replicas trailing further get no reads
+    REPLICA_LAG_CHECK_INTERVAL: float = 1.0
+
+    # -------------------- BACKEND RESILIENCE --------------------
+    DB_TIMEOUT_SECONDS: float = 5.0        # per backend call, capped by the request deadline
+    REQUEST_DEADLINE_SECONDS: float = 10.0 # budget for all backend calls of one request (0 = none)
+    DB_READ_RETRIES: int = 2               # extra attempts for idempotent reads only
+    DB_RETRY_BACKOFF: float = 0.05         # first backoff cap (s); doubles per attempt, full jitter
+    DB_RETRY_BACKOFF_MAX: float = 1.0
+    BREAKER_FAILURE_THRESHOLD: int = 5     # consecutive transient failures before failing fast
+    BREAKER_RESET_SECONDS: float = 10.0    # open time before one probe call is let through
+
+    # -------------------- ADMISSION CONTROL --------------------
+    ADMISSION_CONTROL: bool = True         # adaptive concurrency limit + priority shedding
+    ADMISSION_INITIAL_LIMIT: int = 64
+    ADMISSION_MIN_LIMIT: int = 8
+    ADMISSION_MAX_LIMIT: int = 512
+    ADMISSION_RETRY_AFTER: int = 1         # seconds, sent with shed 503s
+
     # -------------------- SUPABASE --------------------
     SUPABASE_URL: str = ""
     SUPABASE_KEY: str = ""
@@ -15,6 +55,48 @@ class Settings(BaseSettings):
     SUPABASE_JWT_SECRET: str = ""
     SECRET_KEY: str | None = None  # local fallback
 
+    # -------------------- SERVER / LIFECYCLE --------------------
+    WEB_CONCURRENCY: int = 0               # worker processes, 0 = one per core
+    SHUTDOWN_DRAIN_SECONDS: float = 5.0    # report not-ready this long before shutting down
+
+    # -------------------- OFFLINE (STORE-AND-FORWARD) --------------------
+    OFFLINE_MODE: bool = False             # journal deposits / small withdrawals while the backend is unreachable
+    OFFLINE_JOURNAL_DIR: str = "offline_journal"  # one fsync'd journal shared (flock) by all workers
+    OFFLINE_WITHDRAW_LIMIT: int = 0        # max offline withdrawals per account until replayed, all workers together (0 = none)
+    OFFLINE_PIN_CACHE_SIZE: int = 10000    # accounts whose PIN hash is kept for offline checks
+    OFFLINE_REPLAY_INTERVAL: float = 5.0
+    OFFLINE_REPLAY_BATCH: int = 200        # entries posted per fsync'd ack batch
+
+    # -------------------- WRITE BUFFERS --------------------
+    AUDIT_BUFFER_SIZE: int = 0             # audit rows stay write-through unless set (buffered rows die with the process)
+    AUDIT_FLUSH_INTERVAL: float = 0.5
+    HISTORY_BUFFER_SIZE: int = 0           # history stays write-through unless set
+    HISTORY_FLUSH_INTERVAL: float = 0.2
+
+    # -------------------- MONEY EVENT OUTBOX --------------------
+    OUTBOX_SINK: str = ""                  # file:/path.jsonl | webhook:https://... | queue ("" = off)
+    OUTBOX_RELAY: bool = False             # run the relay in this process (one instance only)
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_WEBHOOK_TIMEOUT: float = 5.0
+
+    # -------------------- LEDGER RECONCILIATION --------------------
+    RECONCILE_CHUNK_SIZE: int = 50000      # history rows / accounts per page (PostgREST caps pages at its max-rows)
+    RECONCILE_SETTLE_SECONDS: float = 2.0  # wait before re-checking suspects (>= HISTORY_FLUSH_INTERVAL)
+
+    # -------------------- LIVE HISTORY FEED --------------------
+    FEED_CHANNEL: str = "local"            # local | postgres (LISTEN/NOTIFY, sql/002_history_feed.sql)
+    FEED_QUEUE_SIZE: int = 32              # rows buffered per subscriber before it must resync
+    FEED_HEARTBEAT_SECONDS: float = 15.0   # idle keep-alive comment interval
+    FEED_MAX_STREAM_SECONDS: float = 300.0 # end streams so clients reconnect (rebalances workers)
+
+    # -------------------- READ COALESCING --------------------
+    SINGLE_FLIGHT: bool = True             # merge concurrent identical reads
+
+    # -------------------- RESPONSES --------------------
+    COMPRESSION_MIN_SIZE: int = 1024       # bytes; smaller bodies go out as-is
+    COMPRESSION_LEVEL: int = 6             # gzip 1-9 (brotli quality is mapped to 0-11)
+
     # -------------------- Pydantic Config --------------------
     class Config:
         env_file = ".env"
@@ -28,6 +110,27 @@ class Settings(BaseSettings):
             raise ValueError(f"ENV must be one of {allowed}")
         return v
 
+    @field_validator("DATA_BACKEND")
+    def validate_backend(cls, v):
+        allowed = {"supabase", "memory", "postgres"}
+        if v not in allowed:
+            raise ValueError(f"DATA_BACKEND must be one of {allowed}")
+        return v
+
+    @field_validator("SHARD_STRATEGY")
+    def validate_shard_strategy(cls, v):
+        allowed = {"hash", "range"}
+        if v not in allowed:
+            raise ValueError(f"SHARD_STRATEGY must be one of {allowed}")
+        return v
+
+    @field_validator("FEED_CHANNEL")
+    def validate_feed_channel(cls, v):
+        allowed = {"local", "postgres"}
+        if v not in allowed:
+            raise ValueError(f"FEED_CHANNEL must be one of {allowed}")
+        return v
+
     # JWT Secret (final)
     @property
     def JWT_SECRET(self) -> str:
@@ -43,15 +146,37 @@ class Settings(BaseSettings):
 settings = Settings()
 
 # -------------------- MANUAL STARTUP VALIDATION --------------------
-required_vars = [
-    ("SUPABASE_URL", settings.SUPABASE_URL),
-    ("SUPABASE_KEY", settings.SUPABASE_KEY),
-    ("SUPABASE_SERVICE_ROLE_KEY", settings.SUPABASE_SERVICE_ROLE_KEY),
-]
-
-for key, value in required_vars:
-    if not value:
-        raise RuntimeError(f"{key} missing from .env")
-
-# JWT Secret is checked via property inside JWT_SECRET
-_ = settings.JWT_SECRET
+def validate_settings():
+    """
+    Fail fast on missing configuration. Called from the app lifespan rather
+    than at import, so importing the package stays cheap.
+    """
+    required_vars = [
+        ("SUPABASE_URL", settings.SUPABASE_URL),
+        ("SUPABASE_KEY", settings.SUPABASE_KEY),
+        ("SUPABASE_SERVICE_ROLE_KEY", settings.SUPABASE_SERVICE_ROLE_KEY),
+    ]
+
+    for key, value in required_vars:
+        if settings.DATA_BACKEND != "memory" and not settings.SHARDS and not value:
+            raise RuntimeError(f"{key} missing from .env")
+
+    if settings.SHARDS:
+        from app.services.sharding import parse_shards
+        try:
+            parse_shards(settings.SHARDS)
+        except ValueError as e:
+            raise RuntimeError(f"SHARDS: {e}")
+
+    if settings.READ_REPLICAS:
+        from app.services.repository import parse_backends
+        try:
+            parse_backends(settings.READ_REPLICAS, "READ_REPLICAS")
+        except ValueError as e:
+            raise RuntimeError(str(e))
+
+    if settings.FEED_CHANNEL == "postgres" and not settings.DATABASE_URL:
+        raise RuntimeError("FEED_CHANNEL=postgres needs DATABASE_URL for LISTEN")
+
+    # JWT Secret is checked via property inside JWT_SECRET
+    _ = settings.JWT_SECRET
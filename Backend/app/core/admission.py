@@ -0,0 +1,199 @@
+# app/core/admission.py
+#
+# Adaptive admission control with priority load shedding.
+#
+# One concurrency limit per worker, adjusted from observed latency (a
+# gradient limiter in the style of Netflix's concurrency-limits). Every
+# window, with short_rtt = the window's mean latency and long_rtt its
+# moving average:
+#
+#   gradient = clamp(tolerance * long_rtt / short_rtt, 0.5, 1.0)
+#   limit    = limit * gradient + sqrt(limit)        (smoothed, bounded)
+#
+# While latency stays near its long-run level the sqrt term lets the limit
+# grow; once queueing shows up as a rising short-term latency the gradient
+# pulls it down.
+#
+# Requests carry a priority class, chosen by path prefix (see create_app):
+#   critical -> money operations; may use the whole limit
+#   normal   -> reads, login, updates; up to 80% of it
+#   bulk     -> history dumps, audit queries; up to 50% of it (SHARES)
+# A request whose class is over its share is answered 503 + Retry-After
+# straight away, so bulk work is shed first and money operations last.
+# Exempt paths (probes, metrics) and SSE streams (paths ending in /stream,
+# which hold a connection for minutes) are never limited.
+
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import Counter, Gauge, register
+from app.utils.json_tools import dumps
+
+
+CRITICAL, NORMAL, BULK, EXEMPT = "critical", "normal", "bulk", "exempt"
+
+SHARES = {CRITICAL: 1.0, NORMAL: 0.8, BULK: 0.5}
+
+ADMISSION_REJECTED = register(Counter(
+    "admission_rejected_total", "Requests shed with 503 by admission control, by priority."
+))
+
+
+class GradientLimit:
+    """
+    Latency-driven concurrency limit, updated once per `window` seconds from
+    the mean latency of the requests that finished in it. Not thread-safe:
+    it is only touched from the worker's event loop.
+    """
+
+    def __init__(
+        self,
+        initial: int = 64,
+        min_limit: int = 8,
+        max_limit: int = 512,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        window: float = 0.25,
+        long_windows: int = 40,
+        clock=time.monotonic,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.window = window
+        self.clock = clock
+        self._long_alpha = 2.0 / (long_windows + 1)
+        self.long_rtt: Optional[float] = None
+        self.short_rtt: Optional[float] = None
+        self._window_end = clock() + window
+        self._sum = 0.0
+        self._count = 0
+        self._peak = 0
+
+    def observe(self, rtt: float, inflight: int):
+        self._sum += rtt
+        self._count += 1
+        self._peak = max(self._peak, inflight)
+        now = self.clock()
+        if now < self._window_end:
+            return
+        self._window_end = now + self.window
+        short, peak = self._sum / self._count, self._peak
+        self._sum, self._count, self._peak = 0.0, 0, 0
+        self._update(short, peak)
+
+    def _update(self, short: float, peak: int):
+        self.short_rtt = short
+        if self.long_rtt is None:
+            self.long_rtt = short
+            return
+        # Rises slowly, so sustained queueing is not mistaken for the new normal
+        alpha = self._long_alpha if short < self.long_rtt else self._long_alpha / 4
+        self.long_rtt += alpha * (short - self.long_rtt)
+
+        # After an overload the long average lags far above the short one;
+        # decay it so the limit does not overshoot on recovery
+        if self.long_rtt > 2 * short:
+            self.long_rtt *= 0.9
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / short))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        new = self.limit * (1 - self.smoothing) + target * self.smoothing
+
+        # Idle capacity says nothing about what the backend can take
+        if new > self.limit and peak < self.limit / 2:
+            return
+        self.limit = max(self.min_limit, min(self.max_limit, new))
+
+
+class AdmissionMiddleware:
+    """
+    Pure-ASGI gate in front of the routes. `priorities` maps path prefixes to
+    a class; the longest matching prefix wins, anything else is `normal`.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        priorities: Dict[str, str],
+        limit: Optional[GradientLimit] = None,
+        retry_after: int = 1,
+    ):
+        global _active
+        unknown = set(priorities.values()) - {CRITICAL, NORMAL, BULK, EXEMPT}
+        if unknown:
+            raise ValueError(f"Unknown priority class(es): {', '.join(sorted(unknown))}")
+        self.app = app
+        self.priorities: Tuple[Tuple[str, str], ...] = tuple(
+            sorted(priorities.items(), key=lambda kv: len(kv[0]), reverse=True)
+        )
+        self.limit = limit or GradientLimit()
+        self.retry_after = retry_after
+        self.inflight = 0
+        _active = self
+
+    def classify(self, path: str) -> str:
+        if path.endswith("/stream"):
+            return EXEMPT
+        for prefix, priority in self.priorities:
+            if path.startswith(prefix):
+                return priority
+        return NORMAL
+
+    def admit(self, priority: str) -> bool:
+        return self.inflight < self.limit.limit * SHARES[priority]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority = self.classify(scope["path"])
+        if priority == EXEMPT:
+            await self.app(scope, receive, send)
+            return
+
+        if not self.admit(priority):
+            ADMISSION_REJECTED.inc(priority=priority)
+            await _reject(send, self.retry_after)
+            return
+
+        self.inflight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limit.observe(time.perf_counter() - start, self.inflight)
+            self.inflight -= 1
+
+
+async def _reject(send: Send, retry_after: int):
+    body = dumps({"detail": "Server busy, retry later."})
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# The app's gate, read by the gauges at scrape time
+_active: Optional[AdmissionMiddleware] = None
+
+register(Gauge(
+    "admission_limit", "Current adaptive concurrency limit.",
+    fn=lambda: round(_active.limit.limit, 2) if _active is not None else None,
+))
+register(Gauge(
+    "admission_inflight", "Requests currently admitted.",
+    fn=lambda: _active.inflight if _active is not None else None,
+))
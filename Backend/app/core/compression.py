@@ -0,0 +1,116 @@
+# app/core/compression.py
+
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import Counter, register
+
+# brotli is optional: without it only gzip is offered.
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only without the extra
+    brotli = None
+
+
+COMPRESSED_BYTES = register(Counter(
+    "http_compressed_bytes_total",
+    "Response body bytes before/after compression, by encoding.",
+))
+
+_COMPRESSIBLE = ("application/json", "text/", "application/javascript")
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """Pick br over gzip when the client allows it (q=0 means refused)."""
+    offered = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return ""
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        # gzip levels 1-9 onto brotli quality 1-11; 6 -> 7 stays cheap enough per request
+        return brotli.compress(body, quality=min(11, max(1, round(level * 11 / 9))))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated gzip / brotli for complete responses of at least `min_size`
+    bytes. Streamed responses (more_body) and bodies that are already encoded
+    pass through untouched, so SSE and other streams keep flushing per chunk.
+    Every complete response of a compressible type carries
+    `Vary: Accept-Encoding`, compressed or not, so a shared cache never hands
+    a gzip body to a client that did not ask for one (or the reverse).
+    """
+
+    def __init__(self, app: ASGIApp, min_size: int = 1024, level: int = 6):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message: Message = {}
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                # Hold headers until the first body chunk shows whether it is complete
+                start_message = message
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=start_message)
+            media = headers.get("content-type", "")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or not media.startswith(_COMPRESSIBLE)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            if not encoding or len(body) < self.min_size:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding, self.level)
+            COMPRESSED_BYTES.inc(len(body), encoding=encoding, stage="raw")
+            COMPRESSED_BYTES.inc(len(compressed), encoding=encoding, stage="sent")
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,9 +1,38 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 
+from app.core.resilience import current_budget
+from app.services.repository import UnavailableError
+
 
 async def http_exception_handler(request: Request, exc: HTTPException):
+    status_code, headers = exc.status_code, exc.headers
+
+    # Services report backend failures as plain errors (400); when the
+    # backend was unavailable (circuit open, timeouts, deadline spent) the
+    # client should back off and retry, not fix its request. Never for a
+    # write that may have been applied: retrying it could post money twice.
+    budget = current_budget()
+    if (status_code == 400 and budget is not None and budget.unavailable is not None
+            and not budget.outcome_unknown):
+        status_code = 503
+        headers = {**(headers or {}), "Retry-After": str(budget.unavailable)}
+
     return JSONResponse(
-        status_code=exc.status_code,
+        status_code=status_code,
         content={"detail": exc.detail},
+        headers=headers,
+    )
+
+
+async def unavailable_handler(request: Request, exc: UnavailableError):
+    # Circuit open / deadline spent in code that does not turn backend
+    # failures into a service error (the role lookup of every authenticated
+    # route): still a fast 503 with the breaker's Retry-After, not a 500
+    budget = current_budget()
+    retry_after = budget.unavailable if budget is not None and budget.unavailable is not None else 1
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service temporarily unavailable. Try again shortly."},
+        headers={"Retry-After": str(retry_after)},
     )
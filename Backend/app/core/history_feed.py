@@ -0,0 +1,268 @@
+# app/core/history_feed.py
+#
+# Live feed of committed history rows, served as server-sent events.
+#
+# Every subscriber is one bounded asyncio.Queue on the worker's event loop,
+# so an idle connection costs a queue and a suspended generator, no thread.
+# A subscriber that falls `queue_size` rows behind stops receiving rows and
+# gets a single `resync` event instead; the client refetches /history.
+#
+# Rows reach the feed in one of two ways (FEED_CHANNEL):
+#   local    -> HistoryService publishes after its own inserts (one worker)
+#   postgres -> every worker LISTENs on `history_feed`, fed by the trigger in
+#               sql/002_history_feed.sql, so rows written by any worker or
+#               process arrive once they commit
+
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
+
+from app.core.metrics import Counter, Gauge, register
+from app.utils.json_tools import dumps, loads
+
+
+FEED_PUBLISHED = register(Counter(
+    "history_feed_published_total", "History rows handed to the live feed."
+))
+FEED_DROPPED = register(Counter(
+    "history_feed_dropped_total", "Rows dropped for subscribers that fell behind."
+))
+
+NOTIFY_CHANNEL = "history_feed"
+
+Row = Dict[str, Any]
+
+
+class _Subscriber:
+    __slots__ = ("loop", "queue", "lagged")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, size: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.lagged = False
+
+    def offer(self, row: Row):
+        # Runs on the subscriber's loop
+        if self.lagged:
+            FEED_DROPPED.inc()
+            return
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.lagged = True
+            FEED_DROPPED.inc()
+            # Wake the reader so it sends `resync` now, not at the next row
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class HistoryFeed:
+    """Per-account fan-out. publish() is safe from any thread."""
+
+    def __init__(self, queue_size: int = 32):
+        self.queue_size = queue_size
+        self._subs: Dict[str, Set[_Subscriber]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, ac_no: str) -> _Subscriber:
+        """Must be called from the event loop that will read the queue."""
+        sub = _Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subs.setdefault(ac_no, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, ac_no: str, sub: _Subscriber):
+        with self._lock:
+            subs = self._subs.get(ac_no)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[ac_no]
+
+    def subscribers(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+    def publish(self, row: Row):
+        with self._lock:
+            subs = self._subs.get(str(row.get("account_no")))
+            subs = tuple(subs) if subs else ()
+        if not subs:
+            return
+        FEED_PUBLISHED.inc()
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, row)
+            except RuntimeError:
+                # Loop already closed (shutdown); the generator is gone too
+                self.unsubscribe(str(row.get("account_no")), sub)
+
+    def publish_many(self, rows: Iterable[Row]):
+        for row in rows:
+            self.publish(row)
+
+
+# -------------------- SSE FRAMING --------------------
+def format_event(row: Row) -> bytes:
+    head = f"id: {row['id']}\n" if row.get("id") is not None else ""
+    return f"{head}event: history\ndata: ".encode() + dumps(row) + b"\n\n"
+
+
+RESYNC_EVENT = b"event: resync\ndata: {}\n\n"
+HEARTBEAT = b": ping\n\n"
+
+
+def _after(row: Row, last_id: Optional[int]) -> bool:
+    if last_id is None:
+        return True
+    try:
+        return int(row["id"]) > last_id
+    except (KeyError, TypeError, ValueError):
+        return True
+
+
+async def event_stream(
+    feed: HistoryFeed,
+    ac_no: str,
+    heartbeat: float,
+    last_event_id: Optional[int] = None,
+    backfill: Optional[Callable[[], Any]] = None,
+    max_age: Optional[float] = None,
+) -> AsyncIterator[bytes]:
+    """
+    SSE body for one account. With `last_event_id` (a reconnect), rows newer
+    than it are replayed from `backfill` (an awaitable returning rows) before
+    live rows; live rows already replayed are skipped by id.
+
+    After `max_age` seconds the stream ends and EventSource reconnects with
+    Last-Event-ID, which spreads long-lived connections over workers again.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_age if max_age else None
+    sub = feed.subscribe(ac_no)
+    try:
+        # `retry` is how long EventSource waits before reconnecting
+        yield b"retry: 3000\n\n"
+
+        if backfill is not None and last_event_id is not None:
+            rows = await backfill()
+            newer = [r for r in rows or () if _after(r, last_event_id)]
+            newer.sort(key=lambda r: int(r.get("id") or 0))
+            for row in newer:
+                yield format_event(row)
+                if row.get("id") is not None:
+                    last_event_id = max(last_event_id, int(row["id"]))
+
+        while True:
+            timeout = heartbeat
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                timeout = min(timeout, remaining)
+            try:
+                row = await asyncio.wait_for(sub.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            if row is None or sub.lagged:
+                # Drop what is queued; the client reloads the full history
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.lagged = False
+                yield RESYNC_EVENT
+                continue
+            if not _after(row, last_event_id):
+                continue
+            yield format_event(row)
+    finally:
+        feed.unsubscribe(ac_no, sub)
+
+
+# -------------------- SHARED CHANNEL (POSTGRES) --------------------
+class PostgresListener:
+    """
+    LISTENs on `history_feed` over one dedicated connection and publishes
+    each notification into `feed`. Reconnects with backoff.
+    """
+
+    def __init__(self, dsn: str, feed: HistoryFeed, max_backoff: float = 30.0):
+        # Imported here so the package import stays free of psycopg
+        try:
+            import psycopg
+        except ImportError:
+            raise RuntimeError("FEED_CHANNEL=postgres requires psycopg (pip install 'psycopg[binary]')")
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self.feed = feed
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _listen_once(self):
+        with self._psycopg.connect(self.dsn, autocommit=True) as conn:
+            conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            while not self._stop.is_set():
+                # Wake up periodically to notice stop()
+                for note in conn.notifies(timeout=1.0):
+                    try:
+                        self.feed.publish(loads(note.payload))
+                    except ValueError as e:
+                        print(f"[FEED ERROR] bad payload: {e}")
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                self._listen_once()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                print(f"[FEED ERROR] listener: {e}")
+                self._stop.wait(min(2 ** failures, self.max_backoff))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="history-feed-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+# -------------------- PROCESS-WIDE FEED --------------------
+_feed: Optional[HistoryFeed] = None
+_feed_lock = threading.Lock()
+
+
+def get_feed() -> HistoryFeed:
+    global _feed
+    if _feed is None:
+        with _feed_lock:
+            if _feed is None:
+                from app.config import settings
+                _feed = HistoryFeed(settings.FEED_QUEUE_SIZE)
+    return _feed
+
+
+def publish_local(rows: List[Row]):
+    """Publish rows this process inserted, unless the shared channel carries them."""
+    from app.config import settings
+    if settings.FEED_CHANNEL == "local":
+        get_feed().publish_many(rows)
+
+
+def listener_from_settings() -> Optional[PostgresListener]:
+    from app.config import settings
+
+    if settings.FEED_CHANNEL != "postgres":
+        return None
+    return PostgresListener(settings.DATABASE_URL, get_feed())
+
+
+register(Gauge(
+    "history_feed_subscribers",
+    "Open live history subscriptions in this worker.",
+    fn=lambda: _feed.subscribers() if _feed is not None else 0,
+))
@@ -0,0 +1,152 @@
+# app/core/lifecycle.py
+
+import signal
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI
+
+from app.core.metrics import Gauge, register
+
+
+# Taken when the `app` package is first imported (see app/__init__.py)
+IMPORTED_AT = time.perf_counter()
+
+
+class _State:
+    ready = False
+    draining = False
+    ready_at: Optional[float] = None
+    first_request_at: Optional[float] = None
+
+
+state = _State()
+
+register(Gauge(
+    "app_startup_seconds",
+    "Seconds from package import until the app reported ready.",
+    fn=lambda: state.ready_at - IMPORTED_AT if state.ready_at else None,
+))
+register(Gauge(
+    "app_cold_start_seconds",
+    "Seconds from package import until the first response was sent.",
+    fn=lambda: state.first_request_at - IMPORTED_AT if state.first_request_at else None,
+))
+register(Gauge(
+    "app_ready",
+    "1 while the instance accepts traffic, 0 while starting or draining.",
+    fn=lambda: 1 if state.ready and not state.draining else 0,
+))
+
+
+def mark_first_request():
+    if state.first_request_at is None:
+        state.first_request_at = time.perf_counter()
+
+
+def is_ready() -> bool:
+    return state.ready and not state.draining
+
+
+# -------------------- WARMUP --------------------
+def warm_up():
+    """
+    Pay one-time costs before the first request: validate settings, open the
+    data backend (client / pool), and load the JWT and bcrypt code paths.
+    """
+    from app.config import validate_settings
+    from app.services.repository import get_repository
+    from app.utils.jwt_tools import make_access, decode_token
+    from bcrypt import hashpw, gensalt, checkpw
+
+    validate_settings()
+    get_repository(privileged=True)
+    get_repository(privileged=False)
+    decode_token(make_access("warmup", "warmup"))
+    checkpw(b"warmup", hashpw(b"warmup", gensalt(4)))
+
+
+def flush_buffers():
+    from app.core.write_buffer import flush_all
+    flush_all()
+
+
+# -------------------- DRAIN ON SIGTERM --------------------
+def install_drain_handler(delay: float):
+    """
+    On SIGTERM, report not-ready immediately so the load balancer stops
+    routing here, then hand the signal to the server after `delay` seconds.
+    Only possible from the main thread (real servers, not the TestClient).
+    """
+    if delay <= 0 or threading.current_thread() is not threading.main_thread():
+        return
+
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def _handler(signum, frame):
+        if state.draining:
+            return
+        state.draining = True
+        if callable(previous):
+            threading.Timer(delay, previous, args=(signum, frame)).start()
+        else:
+            threading.Timer(delay, signal.raise_signal, args=(signal.SIGINT,)).start()
+
+    signal.signal(signal.SIGTERM, _handler)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from starlette.concurrency import run_in_threadpool
+    from app.config import settings
+
+    await run_in_threadpool(warm_up)
+    install_drain_handler(settings.SHUTDOWN_DRAIN_SECONDS)
+
+    relay = None
+    if settings.OUTBOX_RELAY:
+        from app.core.outbox import relay_from_settings
+        relay = relay_from_settings()
+        if relay is not None:
+            relay.start()
+
+    from app.services.sharding import recovery_from_settings
+    recovery = recovery_from_settings()
+    if recovery is not None:
+        recovery.start()
+
+    from app.services.replicas import monitor_from_settings
+    monitor = await run_in_threadpool(monitor_from_settings)
+    if monitor is not None:
+        monitor.start()
+
+    from app.core.offline import replayer_from_settings
+    replayer = await run_in_threadpool(replayer_from_settings)
+    if replayer is not None:
+        replayer.start()
+
+    from app.core.history_feed import listener_from_settings
+    listener = listener_from_settings()
+    if listener is not None:
+        listener.start()
+
+    state.ready = True
+    state.ready_at = time.perf_counter()
+
+    yield
+
+    state.draining = True
+    await run_in_threadpool(flush_buffers)
+    if relay is not None:
+        await run_in_threadpool(relay.stop)
+    if listener is not None:
+        await run_in_threadpool(listener.stop)
+    if recovery is not None:
+        await run_in_threadpool(recovery.stop)
+    if monitor is not None:
+        await run_in_threadpool(monitor.stop)
+    if replayer is not None:
+        await run_in_threadpool(replayer.stop)
+    state.ready = False
@@ -0,0 +1,249 @@
+# app/core/metrics.py
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+
+# Latency buckets in seconds (Prometheus `le` bounds)
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with labels, rendered in Prometheus text format.
+    One lock per histogram keeps observe() cheap under the threadpool.
+    """
+
+    def __init__(self, name: str, doc: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket counts..., count, sum]
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(key, le=repr(bound))} {int(cumulative)}")
+            lines.append(f"{self.name}_bucket{_labels(key, le='+Inf')} {int(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(key)} {int(series[-2])}")
+            lines.append(f"{self.name}_sum{_labels(key)} {series[-1]:.6f}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, doc: str):
+        self.name = name
+        self.doc = doc
+        self._series: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._series)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_labels(key)} {value:g}")
+        return lines
+
+
+class Gauge:
+    """Point-in-time value; either set() directly or read from `fn` at scrape."""
+
+    def __init__(self, name: str, doc: str, fn=None):
+        self.name = name
+        self.doc = doc
+        self.fn = fn
+        self._series: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._series[tuple(sorted(labels.items()))] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} gauge"]
+        if self.fn is not None:
+            # fn returns {labels_dict_as_tuple: value} or a bare number
+            values = self.fn()
+            snapshot = values if isinstance(values, dict) else {(): values}
+        else:
+            with self._lock:
+                snapshot = dict(self._series)
+        for key, value in sorted(snapshot.items()):
+            if value is not None:
+                lines.append(f"{self.name}{_labels(key)} {value:g}")
+        return lines
+
+
+def _labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# -------------------- REGISTRY --------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route."
+)
+DB_LATENCY = Histogram(
+    "db_call_duration_seconds", "PostgREST round trip latency by table/RPC."
+)
+SERVICE_LATENCY = Histogram(
+    "service_call_duration_seconds", "Service method latency."
+)
+BCRYPT_LATENCY = Histogram(
+    "bcrypt_duration_seconds", "bcrypt hash/verify CPU time."
+)
+BCRYPT_WAIT = Histogram(
+    "bcrypt_queue_wait_seconds", "Time spent waiting for a bcrypt slot."
+)
+
+REGISTRY: list = [REQUEST_LATENCY, DB_LATENCY, SERVICE_LATENCY, BCRYPT_LATENCY, BCRYPT_WAIT]
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -------------------- PER-REQUEST SPANS --------------------
+# The middleware installs a fresh list per request. Child tasks and threadpool
+# workers copy the context, so they append to the same list object.
+_request_spans: ContextVar[Optional[list]] = ContextVar("request_spans", default=None)
+
+
+def start_request_spans() -> list:
+    spans: list = []
+    _request_spans.set(spans)
+    return spans
+
+
+def record_span(name: str, seconds: float):
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def span(name: str, histogram: Histogram = SERVICE_LATENCY, **labels: str):
+    """Time a block, observe it in `histogram` and attach it to the request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, **(labels or {"call": name}))
+        record_span(name, elapsed)
+
+
+def traced(name: str):
+    """Decorator form of `span` for service methods."""
+    def _wrap(fn):
+        @wraps(fn)
+        def _inner(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return _inner
+    return _wrap
+
+
+def server_timing_header(spans: list) -> str:
+    """Collapse spans by name into a `Server-Timing` header value."""
+    totals: Dict[str, float] = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+# -------------------- POSTGREST INSTRUMENTATION --------------------
+REST_PREFIX = "/rest/v1/"
+
+
+def _db_target(path: str) -> str:
+    """`/rest/v1/accounts` -> `accounts`, `/rest/v1/rpc/deposit_money` -> `rpc.deposit_money`."""
+    idx = path.find(REST_PREFIX)
+    target = path[idx + len(REST_PREFIX):] if idx >= 0 else path.strip("/")
+    return target.replace("/", ".") or "unknown"
+
+
+def _on_request(request):
+    request.extensions["metrics_start"] = time.perf_counter()
+
+
+def _on_response(response):
+    request = response.request
+    start = request.extensions.get("metrics_start")
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    target = _db_target(request.url.path)
+    DB_LATENCY.observe(
+        elapsed,
+        target=target,
+        method=request.method,
+        status=str(response.status_code),
+    )
+    record_span(f"db-{target}", elapsed)
+
+
+def instrument_client(client):
+    """
+    Hook timing into the httpx session behind a PostgREST client.
+    Works for every query builder without touching call sites.
+    """
+    session = client.session
+    hooks = session.event_hooks
+    if _on_request not in hooks["request"]:
+        hooks["request"].append(_on_request)
+        hooks["response"].append(_on_response)
+        session.event_hooks = hooks
+    return client
@@ -1,14 +1,108 @@
-from fastapi import Request
-from app.core.supabase_client import get_public_client, get_service_client
+# app/core/middleware.py
 
+import re
+import time
+import uuid
 
-async def attach_supabase_middleware(request: Request, call_next):
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.repository import get_repository
+from app.config import settings
+from app.core.lifecycle import mark_first_request
+from app.core.resilience import start_request_budget
+from app.core.metrics import (
+    REQUEST_LATENCY,
+    start_request_spans,
+    server_timing_header,
+)
+from app.utils.cookie_tools import set_cookie
+from app.utils.jwt_tools import ACCESS_TTL
+
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Accept upstream IDs (load balancer / frontend) only if they look sane
+_REQUEST_ID_OK = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+def _request_id(scope: Scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            candidate = value.decode("latin-1")
+            if _REQUEST_ID_OK.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex
+
+
+def _access_cookie(token: str) -> str:
+    """Render the refreshed atm_token Set-Cookie value via the shared cookie settings."""
+    carrier = Response()
+    set_cookie(carrier, "atm_token", token, max_age=int(ACCESS_TTL.total_seconds()))
+    return carrier.headers["set-cookie"]
+
+
+class RequestContextMiddleware:
     """
-    Attach both public and service Supabase clients to request.state.
-    This ensures each request gets its own clean client instances.
+    Single pure-ASGI middleware for every HTTP request:
+
+    - attaches the public / service repositories to `request.state`
+    - assigns a request ID (reuses a valid incoming X-Request-ID)
+    - refreshes the atm_token cookie when a handler sets
+      `request.state.new_access_token`
+    - records route latency and sends the collected spans as `Server-Timing`
+    - opens the request's backend deadline (REQUEST_DEADLINE_SECONDS)
+
+    Headers are edited on `http.response.start` and body messages pass
+    straight through, so streaming responses flush as they are produced.
     """
-    request.state.supabase = get_public_client()
-    request.state.service = get_service_client()
-    
-    response = await call_next(request)
-    return response
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        spans = start_request_spans()
+        start_request_budget(settings.REQUEST_DEADLINE_SECONDS)
+        request_id = _request_id(scope)
+
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        state["supabase"] = get_repository(privileged=False)
+        state["service"] = get_repository(privileged=True)
+
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+
+                new_access = state.get("new_access_token")
+                if new_access:
+                    headers.append("set-cookie", _access_cookie(new_access))
+
+                mark_first_request()
+                # Time to headers; for streamed bodies this excludes the stream
+                spans.append(("total", time.perf_counter() - start))
+                headers["Server-Timing"] = server_timing_header(spans)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                route=getattr(route, "path", "unmatched"),
+                method=scope["method"],
+                status=str(status),
+            )
@@ -0,0 +1,471 @@
+# app/core/offline.py
+#
+# Store-and-forward for ATM terminals (OFFLINE_MODE). When the PIN check
+# cannot reach the data backend, a deposit (or a withdrawal up to
+# OFFLINE_WITHDRAW_LIMIT) is verified against the PIN hash cached from an
+# earlier online check and written to a local journal instead of failing.
+# The replayer posts journaled operations in order once the backend answers
+# again (see app/services/offline_service.py for the request side).
+#
+# Journal: one append-only JSONL file in OFFLINE_JOURNAL_DIR shared by all
+# worker processes, every record flushed and fsync'd before the client gets
+# an answer. Record types:
+#   {"seq": 7, "key": "...", "kind": "deposit", "account_no": ..., "amount": ..., "at": ...}
+#   {"ack": 7, "status": "applied" | "duplicate" | "conflict", "detail": ...}
+#   {"pin_failed": ..., "ts": ...}
+# An entry is pending until its ack. Every read or write holds an exclusive
+# flock on the file and first loads what the other workers appended, so the
+# withdrawal limit and the wrong-PIN lock hold for the whole terminal. A
+# torn last line (crash mid-write) is cut off by the next worker to take the
+# lock. One worker at a time replays (flock on <journal>.replay).
+#
+# Exactly once: entries carry an idempotency key and are posted with
+# accounts.apply_once (sql/009_offline_replay.sql). A crash between posting
+# and writing the ack replays the entry, which the backend then reports as a
+# duplicate instead of posting it twice. The key is a UUID, or the client's
+# Idempotency-Key header scoped to the operation ("withdraw:<account>:<key>")
+# so client keys never meet other requests in the backend's key space. A
+# client key reused for a different account, kind or amount is refused
+# (KeyReused) instead of answering with the other operation.
+
+import fcntl
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, UTC
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.metrics import Counter, Gauge, register
+from app.services.repository import UnavailableError
+from app.utils.json_tools import dumps, loads
+
+
+OFFLINE_ACCEPTED = register(Counter(
+    "offline_accepted_total", "Money operations journaled while the backend was unreachable, by kind."
+))
+OFFLINE_REPLAYED = register(Counter(
+    "offline_replayed_total", "Journaled operations replayed, by status (applied / duplicate / conflict)."
+))
+
+
+# -------------------- JOURNAL --------------------
+class KeyReused(Exception):
+    """The client's idempotency key belongs to a different operation."""
+
+
+class OfflineJournal:
+    """
+    One journal file shared by every worker process. Each operation takes an
+    exclusive flock on the file and first reads what other workers appended
+    since (their entries, acks and wrong-PIN records), so limits checked
+    under `locked()` see the whole terminal, not one worker.
+    """
+
+    def __init__(self, path: str, pin_attempts: int = 3):
+        self.path = path
+        self.pin_attempts = pin_attempts
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = open(path, "a+b")
+        self._replay_file = open(f"{path}.replay", "a+b")
+        self._reset()
+        with self.locked():
+            pass
+
+    def _reset(self):
+        self._pending: Dict[int, Dict[str, Any]] = {}    # seq -> entry, insertion = seq order
+        self._client_keys: Dict[str, Dict[str, Any]] = {}   # client idempotency key -> entry (incl. acked)
+        self._failures: Dict[str, Deque[float]] = {}     # account_no -> last wrong offline PINs
+        self._seq = 0
+        self._offset = 0                                 # bytes of the file already loaded
+
+    @contextmanager
+    def locked(self):
+        """Hold the journal (re-entrant) with everything other workers wrote loaded."""
+        with self._lock:
+            if self._depth == 0:
+                self._acquire()
+            self._depth += 1
+            try:
+                yield self
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _acquire(self):
+        while True:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                current = os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                break
+            # Another worker compacted (replaced) the file: load the new one
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = open(self.path, "a+b")
+            self._reset()
+        self._catch_up()
+
+    def _catch_up(self):
+        self._file.seek(self._offset)
+        data = self._file.read()
+        good = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = loads(line)
+            except ValueError:
+                break
+            good += len(line)
+            self._load(record)
+        if good < len(data):
+            # Torn tail from a crash mid-append (appends hold the lock, so
+            # nobody is still writing it): nothing after it was acknowledged
+            print(f"[OFFLINE] {self.path}: dropping {len(data) - good} bytes of torn record")
+            self._file.truncate(self._offset + good)
+            self._sync()
+        self._offset += good
+
+    def _load(self, record: Dict[str, Any]):
+        if "ack" in record:
+            entry = self._pending.pop(record["ack"], None)
+            if entry is not None:
+                entry["status"] = record["status"]
+        elif "pin_failed" in record:
+            failures = self._failures.setdefault(record["pin_failed"], deque(maxlen=self.pin_attempts))
+            failures.append(record["ts"])
+        else:
+            self._pending[record["seq"]] = record
+            if record.get("client_key") is not None:
+                self._client_keys[record["client_key"]] = record
+            self._seq = max(self._seq, record["seq"])
+
+    def _write(self, records: List[Dict[str, Any]]):
+        data = b"".join(dumps(r) + b"\n" for r in records)
+        self._file.write(data)
+        self._sync()
+        self._offset += len(data)
+        for record in records:
+            self._load(record)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def find(self, kind: str, account_no: str, amount: int, client_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The entry journaled earlier under `client_key`; KeyReused if it was another operation."""
+        if client_key is None:
+            return None
+        with self.locked():
+            entry = self._client_keys.get(client_key)
+        if entry is None:
+            return None
+        if (entry["kind"], entry["account_no"], entry["amount"]) != (kind, account_no, amount):
+            raise KeyReused(client_key)
+        return dict(entry)
+
+    def append(self, kind: str, account_no: str, amount: int, client_key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Durably journal one operation. Returns (entry, created); a known client key returns its entry."""
+        with self.locked():
+            known = self.find(kind, account_no, amount, client_key)
+            if known is not None:
+                return known, False
+            entry = {
+                "seq": self._seq + 1,
+                "key": f"{kind}:{account_no}:{client_key}" if client_key is not None else uuid.uuid4().hex,
+                "client_key": client_key,
+                "kind": kind,
+                "account_no": account_no,
+                "amount": amount,
+                "at": datetime.now(UTC).isoformat(),
+            }
+            self._write([entry])
+            return dict(entry), True
+
+    def ack(self, results: List[Tuple[int, str, Optional[str]]]):
+        """Record (seq, status, detail) outcomes with one fsync."""
+        if not results:
+            return
+        with self.locked():
+            self._write([{"ack": seq, "status": status, "detail": detail} for seq, status, detail in results])
+
+    def pending(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self.locked():
+            entries = list(self._pending.values())
+        return [dict(e) for e in entries[:limit]]
+
+    def pending_amount(self, kind: str, account_no: str) -> int:
+        with self.locked():
+            return sum(e["amount"] for e in self._pending.values() if e["kind"] == kind and e["account_no"] == account_no)
+
+    # ---- wrong offline PINs ----
+    # Counted from the journal so every worker sees them. `since` is when
+    # the caller's cached PIN state came from the backend: failures before
+    # an online check are the backend's business, not the offline lock's.
+    def pin_failures(self, account_no: str, since: float) -> int:
+        with self.locked():
+            return sum(1 for ts in self._failures.get(account_no, ()) if ts > since)
+
+    def pin_failed(self, account_no: str, since: float) -> int:
+        """Record a wrong offline PIN; returns the failures since `since`."""
+        with self.locked():
+            self._write([{"pin_failed": account_no, "ts": time.time()}])
+            return self.pin_failures(account_no, since)
+
+    @contextmanager
+    def replaying(self):
+        """Yields whether this process may replay; one replayer at a time across workers."""
+        with self._lock:
+            try:
+                fcntl.flock(self._replay_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(self._replay_file.fileno(), fcntl.LOCK_UN)
+
+    def compact(self) -> bool:
+        """
+        Drop settled records: rewrite the file with pending entries and the
+        recent wrong-PIN records only (atomic rename). Skipped while another
+        worker is replaying.
+        """
+        with self.replaying() as allowed:
+            if not allowed:
+                return False
+            with self.locked():
+                records = list(self._pending.values()) + [
+                    {"pin_failed": ac_no, "ts": ts} for ac_no, failures in self._failures.items() for ts in failures
+                ]
+                data = b"".join(dumps(r) + b"\n" for r in records)
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "wb") as new:
+                    new.write(data)
+                    new.flush()
+                    os.fsync(new.fileno())
+                os.replace(tmp, self.path)
+                _fsync_dir(self.path)
+                # Our flock is on the replaced file; the next locked() sees
+                # the new inode and reloads from it
+            return True
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._replay_file.close()
+
+
+def _fsync_dir(path: str):
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# -------------------- PIN CACHE --------------------
+class PinCache:
+    """
+    PIN hash and lock state per account, refreshed by every online PIN check
+    (LRU, bounded). Wrong offline PINs are counted in the shared journal
+    (OfflineJournal.pin_failed) against the time of that check.
+    """
+
+    def __init__(self, size: int = 10_000):
+        self.size = size
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, ac_no: str, pin_hash: str, locked: bool):
+        with self._lock:
+            self._entries[ac_no] = {"pin": pin_hash, "locked": bool(locked), "seen": time.time()}
+            self._entries.move_to_end(ac_no)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def get(self, ac_no: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(ac_no)
+            return dict(entry) if entry else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# -------------------- REPLAY --------------------
+class OfflineReplayer:
+    """
+    Posts pending journal entries in order, `batch_size` at a time, with one
+    fsync'd ack batch per round. Stops at the first entry the backend could
+    not be reached for and retries it next round, so nothing overtakes it.
+    Every worker runs one; whichever holds the replay lock posts the
+    entries of all of them. Business errors (unknown account, insufficient balance for a withdrawal
+    already paid out) are conflicts: acked, audited and counted.
+    """
+
+    def __init__(
+        self,
+        journal: OfflineJournal,
+        repo_factory: Callable[[], Any],
+        batch_size: int = 200,
+        interval: float = 5.0,
+        on_applied: Optional[Callable[[Any, Dict[str, Any]], None]] = None,
+    ):
+        self.journal = journal
+        self.repo_factory = repo_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.on_applied = on_applied
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def replay_once(self) -> Dict[str, int]:
+        with self.journal.replaying() as allowed:
+            if not allowed:
+                return {"applied": 0, "duplicate": 0, "conflict": 0}
+            return self._replay(self.journal)
+
+    def _replay(self, journal: OfflineJournal) -> Dict[str, int]:
+        done = {"applied": 0, "duplicate": 0, "conflict": 0}
+        db = self.repo_factory()
+        while True:
+            batch = journal.pending(self.batch_size)
+            if not batch:
+                return done
+            results, reachable = [], True
+            for entry in batch:
+                try:
+                    outcome = db.accounts.apply_once(entry["key"], entry["kind"], entry["account_no"], entry["amount"])
+                except Exception as e:
+                    if _unreachable(e):
+                        reachable = False
+                        break
+                    results.append((entry["seq"], "conflict", str(e)))
+                    self._conflict(db, entry, str(e))
+                    continue
+                status = "duplicate" if outcome.get("duplicate") else "applied"
+                results.append((entry["seq"], status, None))
+                if status == "applied" and self.on_applied is not None:
+                    self.on_applied(db, entry)
+            journal.ack(results)
+            for _, status, _ in results:
+                done[status] += 1
+                OFFLINE_REPLAYED.inc(status=status)
+            if not reachable:
+                return done
+
+    @staticmethod
+    def _conflict(db, entry: Dict[str, Any], detail: str):
+        print(f"[OFFLINE CONFLICT] {entry['kind']} {entry['amount']} on {entry['account_no']} ({entry['key']}): {detail}")
+        try:
+            db.audit.add({
+                "actor": entry["account_no"],
+                "action": "offline_conflict",
+                "details": f"{entry['kind']} {entry['amount']} taken offline at {entry['at']} (ref {entry['key']}): {detail}",
+                "ip": "offline",
+                "user_agent": "offline-replay",
+            })
+        except Exception as e:
+            print(f"[OFFLINE ERROR] conflict audit: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.replay_once()
+            except Exception as e:
+                print(f"[OFFLINE ERROR] replay: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="offline-replay", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.replay_once()
+            if not self.journal.pending():
+                self.journal.compact()
+        except Exception as e:
+            print(f"[OFFLINE ERROR] final replay: {e}")
+
+
+def _unreachable(e: Optional[BaseException]) -> bool:
+    """
+    The backend did not answer: circuit open / deadline, or a transport
+    failure anywhere in the cause chain (repositories wrap driver errors).
+    """
+    while e is not None:
+        if isinstance(e, (UnavailableError, ConnectionError, TimeoutError)):
+            return True
+        if type(e).__name__ in {"TransportError", "ConnectError", "ReadTimeout", "ConnectTimeout",
+                                "OperationalError", "PoolTimeout", "_ServerError"}:
+            return True
+        e = e.__cause__
+    return False
+
+
+# -------------------- PROCESS STATE --------------------
+_journal: Optional[OfflineJournal] = None
+_journal_lock = threading.Lock()
+pin_cache: Optional[PinCache] = None
+
+register(Gauge(
+    "offline_pending", "Journaled operations waiting to be replayed (all workers, as last read).",
+    fn=lambda: len(_journal.pending()) if _journal is not None else None,
+))
+
+
+def get_journal() -> OfflineJournal:
+    """The journal shared by the workers, opened by this process on first use."""
+    global _journal
+    if _journal is None:
+        from app.config import settings
+        with _journal_lock:
+            if _journal is None:
+                os.makedirs(settings.OFFLINE_JOURNAL_DIR, exist_ok=True)
+                path = os.path.join(settings.OFFLINE_JOURNAL_DIR, "journal.jsonl")
+                _journal = OfflineJournal(path)
+    return _journal
+
+
+def get_pin_cache() -> Optional[PinCache]:
+    """The PIN cache, or None while OFFLINE_MODE is off."""
+    global pin_cache
+    from app.config import settings
+    if not settings.OFFLINE_MODE:
+        return None
+    if pin_cache is None:
+        with _journal_lock:
+            if pin_cache is None:
+                pin_cache = PinCache(settings.OFFLINE_PIN_CACHE_SIZE)
+    return pin_cache
+
+
+def replayer_from_settings() -> Optional[OfflineReplayer]:
+    from app.config import settings
+    from app.services.repository import get_repository
+    from app.services.history_service import HistoryService
+
+    if not settings.OFFLINE_MODE:
+        return None
+    journal = get_journal()
+    history = HistoryService()
+    return OfflineReplayer(
+        journal,
+        lambda: get_repository(privileged=True),
+        batch_size=settings.OFFLINE_REPLAY_BATCH,
+        interval=settings.OFFLINE_REPLAY_INTERVAL,
+        on_applied=lambda db, e: history.add_entry(db, e["account_no"], e["kind"], e["amount"], context={"offline": e["key"]}),
+    )
@@ -0,0 +1,218 @@
+# app/core/outbox.py
+#
+# Relay for the money_outbox table (sql/001_money_outbox.sql).
+#
+# Events are written by the money RPCs in the same transaction as the
+# balance change. The relay reads undelivered rows in id order, hands each
+# batch to a sink and only then marks it delivered: at-least-once delivery,
+# per-account order preserved. Consumers dedupe on the event `id`.
+#
+# Run exactly one relay per database, either inside one app instance
+# (OUTBOX_RELAY=true) or standalone:
+#   python -m app.core.outbox
+
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from app.core.metrics import Counter, register
+
+
+OUTBOX_DELIVERED = register(Counter(
+    "outbox_delivered_events_total", "Money events delivered to the outbox sink."
+))
+OUTBOX_ERRORS = register(Counter(
+    "outbox_delivery_errors_total", "Failed outbox relay batches (retried)."
+))
+
+Event = Dict[str, Any]
+
+
+# -------------------- SINKS --------------------
+class Sink:
+    name = "sink"
+
+    def deliver(self, events: List[Event]) -> None:
+        """Accept the whole batch or raise; the relay retries the same batch."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class FileSink(Sink):
+    """Appends one JSON line per event and fsyncs per batch."""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def deliver(self, events: List[Event]) -> None:
+        self._file.write("".join(json.dumps(e, default=str) + "\n" for e in events))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class WebhookSink(Sink):
+    """POSTs {"events": [...]} and treats any non-2xx answer as a failed batch."""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 5.0, client: Optional[httpx.Client] = None):
+        self.url = url
+        self.client = client or httpx.Client(timeout=timeout)
+
+    def deliver(self, events: List[Event]) -> None:
+        res = self.client.post(
+            self.url,
+            content=json.dumps({"events": events}, default=str),
+            headers={
+                "content-type": "application/json",
+                # Same batch on retry -> same key
+                "idempotency-key": f"outbox-{events[0]['id']}-{events[-1]['id']}",
+            },
+        )
+        res.raise_for_status()
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class QueueSink(Sink):
+    """In-process queue, one item per event (tests, local consumers)."""
+
+    name = "queue"
+
+    def __init__(self, q: Optional[queue.Queue] = None):
+        self.queue = q if q is not None else queue.Queue()
+
+    def deliver(self, events: List[Event]) -> None:
+        for e in events:
+            self.queue.put(e)
+
+
+def create_sink(spec: str, timeout: float = 5.0) -> Sink:
+    """`file:/path/events.jsonl`, `webhook:https://...` or `queue`."""
+    kind, _, target = spec.partition(":")
+    if kind == "file" and target:
+        return FileSink(target)
+    if kind == "webhook" and target:
+        return WebhookSink(target, timeout=timeout)
+    if kind == "queue":
+        return QueueSink()
+    raise ValueError(f"Unknown OUTBOX_SINK {spec!r}")
+
+
+# -------------------- RELAY --------------------
+class OutboxRelay:
+    """
+    Polls the outbox and delivers batches in id order. A failed batch is
+    retried as-is with backoff, so nothing after it overtakes it.
+    """
+
+    def __init__(
+        self,
+        repo_factory: Callable[[], Any],
+        sink: Sink,
+        batch_size: int = 100,
+        interval: float = 1.0,
+        max_backoff: float = 30.0,
+    ):
+        self.repo_factory = repo_factory
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        """Deliver one batch; returns the number of events delivered."""
+        outbox = self.repo_factory().outbox
+        events = outbox.pending(self.batch_size)
+        if not events:
+            return 0
+        self.sink.deliver(events)
+        outbox.mark_delivered([e["id"] for e in events])
+        OUTBOX_DELIVERED.inc(len(events), sink=self.sink.name)
+        return len(events)
+
+    def drain(self) -> int:
+        total = 0
+        while True:
+            n = self.run_once()
+            total += n
+            if n < self.batch_size:
+                return total
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                n = self.run_once()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                OUTBOX_ERRORS.inc(sink=self.sink.name)
+                print(f"[OUTBOX ERROR] {self.sink.name}: {e}")
+                self._stop.wait(min(self.interval * 2 ** failures, self.max_backoff))
+                continue
+            if n < self.batch_size:
+                self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.drain()
+        except Exception as e:
+            print(f"[OUTBOX ERROR] final drain: {e}")
+        self.sink.close()
+
+
+def relay_from_settings() -> Optional[OutboxRelay]:
+    from app.config import settings
+    from app.services.repository import get_repository
+
+    if not settings.OUTBOX_SINK:
+        return None
+    return OutboxRelay(
+        lambda: get_repository(privileged=True),
+        create_sink(settings.OUTBOX_SINK, timeout=settings.OUTBOX_WEBHOOK_TIMEOUT),
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        interval=settings.OUTBOX_POLL_INTERVAL,
+    )
+
+
+def main():
+    from app.config import validate_settings
+
+    validate_settings()
+    relay = relay_from_settings()
+    if relay is None:
+        raise SystemExit("OUTBOX_SINK is not set")
+    relay.start()
+    try:
+        relay._thread.join()
+    except KeyboardInterrupt:
+        relay.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# app/core/resilience.py
+#
+# Guards every data-backend call (PostgREST requests, Postgres statements):
+#
+#   - per-call timeout: DB_TIMEOUT_SECONDS, cut down to what is left of the
+#     request deadline
+#   - request deadline: the middleware opens a budget of
+#     REQUEST_DEADLINE_SECONDS per request; routes / services can narrow it
+#     with `deadline(seconds)`. Once it is spent, calls fail before they
+#     are sent instead of occupying a threadpool worker
+#   - retries: idempotent reads only, at most DB_READ_RETRIES, with full
+#     jitter backoff and never past the deadline
+#   - circuit breaker per backend: after BREAKER_FAILURE_THRESHOLD
+#     consecutive transient failures (timeouts, connection errors, 5xx) calls
+#     fail fast for BREAKER_RESET_SECONDS, then one probe call decides
+#
+# Business errors (duplicates, insufficient balance, 4xx) mean the backend
+# answered, so they count as successes for the breaker and are never retried.
+# A request that failed because the backend was unavailable is reported as
+# 503 with Retry-After (see app/core/error_handlers.py). A money write
+# (deposit, withdraw, transfer, account opening) that was sent but never
+# answered (read timeout, dropped connection) may have been applied: it
+# raises OutcomeUnknownError instead, which must not be retried blindly (a
+# second deposit would post twice). Other writes (audit rows, PIN counters)
+# fail like any transient error.
+
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from app.core.metrics import Counter, Gauge, register
+from app.services.repository import OutcomeUnknownError, UnavailableError
+
+
+T = TypeVar("T")
+
+DB_FAILURES = register(Counter(
+    "db_transient_failures_total", "Backend calls that timed out, could not connect or got a 5xx."
+))
+DB_RETRIES = register(Counter(
+    "db_retries_total", "Idempotent reads retried after a transient failure."
+))
+CIRCUIT_REJECTED = register(Counter(
+    "db_circuit_rejected_total", "Calls failed fast because the backend's circuit was open."
+))
+DEADLINE_EXCEEDED = register(Counter(
+    "request_deadline_exceeded_total", "Backend calls skipped because the request deadline had passed."
+))
+
+
+class CircuitOpenError(UnavailableError):
+    pass
+
+
+class DeadlineExceeded(UnavailableError):
+    pass
+
+
+# -------------------- REQUEST DEADLINE --------------------
+class Budget:
+    """
+    One request's time budget. Threadpool workers copy the context, so they
+    share this object; `unavailable` carries a Retry-After hint back to the
+    error handler once a call failed for lack of a backend, `outcome_unknown`
+    marks a write that may have been applied (never answered as retryable).
+    """
+
+    __slots__ = ("expires", "unavailable", "outcome_unknown")
+
+    def __init__(self, seconds: Optional[float]):
+        self.expires = time.monotonic() + seconds if seconds else None
+        self.unavailable: Optional[int] = None
+        self.outcome_unknown = False
+
+    def left(self) -> Optional[float]:
+        return self.expires - time.monotonic() if self.expires is not None else None
+
+
+_budget: ContextVar[Optional[Budget]] = ContextVar("request_budget", default=None)
+
+
+def start_request_budget(seconds: Optional[float]) -> Budget:
+    budget = Budget(seconds)
+    _budget.set(budget)
+    return budget
+
+
+def current_budget() -> Optional[Budget]:
+    return _budget.get()
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[Budget]:
+    """Narrow the deadline for a block (never extends the request's own)."""
+    outer = _budget.get()
+    budget = Budget(seconds)
+    if outer is not None and outer.expires is not None and outer.expires < budget.expires:
+        budget.expires = outer.expires
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+        if outer is not None and budget.unavailable is not None:
+            outer.unavailable = budget.unavailable
+        if outer is not None and budget.outcome_unknown:
+            outer.outcome_unknown = True
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current deadline, None when there is none."""
+    budget = _budget.get()
+    return budget.left() if budget is not None else None
+
+
+def _mark_unavailable(retry_after: float):
+    budget = _budget.get()
+    if budget is not None:
+        budget.unavailable = max(1, math.ceil(retry_after))
+
+
+# -------------------- CIRCUIT BREAKER --------------------
+class CircuitBreaker:
+    """
+    closed    -> calls pass; consecutive transient failures are counted
+    open      -> calls fail fast until `reset_timeout` has passed
+    half_open -> one probe call at a time; success closes, failure reopens
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed (0 when not open)."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for one backend (shared by its public / service clients)."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        from app.config import settings
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(
+                name, settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SECONDS,
+            ))
+    return breaker
+
+
+register(Gauge(
+    "db_circuit_state",
+    "Circuit breaker state per backend: 0 closed, 1 half-open, 2 open.",
+    fn=lambda: {(("backend", b.name),): CircuitBreaker.STATE_VALUES[b.state] for b in list(_breakers.values())},
+))
+
+
+# -------------------- GUARDED CALL --------------------
+def backoff(attempt: int, base: float, cap: float) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def call(
+    breaker: CircuitBreaker,
+    fn: Callable[[float], T],
+    transient: Callable[[Exception], bool],
+    idempotent: bool = False,
+    timeout: Optional[float] = None,
+    not_applied: Callable[[Exception], bool] = lambda e: False,
+    money: bool = False,
+) -> T:
+    """
+    Run `fn(timeout_seconds)` under the breaker and the current deadline.
+    `transient(e)` tells backend trouble (retry / trip the breaker) from an
+    answer the caller should see. Only `idempotent` calls are retried.
+    `not_applied(e)` tells the transient failures that prove the call had no
+    effect (never sent, rolled back); any other one on a non-idempotent
+    `money` write is reported as OutcomeUnknownError, not as an unavailable
+    backend.
+    """
+    from app.config import settings
+
+    timeout = timeout or settings.DB_TIMEOUT_SECONDS
+    attempts = 1 + (settings.DB_READ_RETRIES if idempotent else 0)
+    for attempt in range(attempts):
+        left = time_left()
+        if left is not None and left <= 0:
+            DEADLINE_EXCEEDED.inc(backend=breaker.name)
+            _mark_unavailable(1)
+            raise DeadlineExceeded(f"Request deadline exceeded before calling {breaker.name}")
+        if not breaker.allow():
+            CIRCUIT_REJECTED.inc(backend=breaker.name)
+            _mark_unavailable(breaker.retry_after())
+            raise CircuitOpenError(f"{breaker.name} unavailable (circuit open)")
+
+        try:
+            result = fn(min(timeout, left) if left is not None else timeout)
+        except Exception as e:
+            if not transient(e):
+                breaker.record_success()
+                raise
+            DB_FAILURES.inc(backend=breaker.name)
+            breaker.record_failure()
+            delay = backoff(attempt, settings.DB_RETRY_BACKOFF, settings.DB_RETRY_BACKOFF_MAX)
+            left = time_left()
+            if attempt + 1 == attempts or (left is not None and delay >= left):
+                if money and not idempotent and not not_applied(e):
+                    budget = _budget.get()
+                    if budget is not None:
+                        budget.outcome_unknown = True
+                    raise OutcomeUnknownError(
+                        f"{breaker.name} did not confirm the write ({type(e).__name__}); "
+                        "it may have been applied, check the balance before trying again"
+                    ) from e
+                _mark_unavailable(max(breaker.retry_after(), 1))
+                raise
+            DB_RETRIES.inc(backend=breaker.name)
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
@@ -0,0 +1,78 @@
+# app/core/single_flight.py
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from app.core.metrics import Counter, register
+
+
+SINGLE_FLIGHT_CALLS = register(Counter(
+    "single_flight_calls_total",
+    "Coalesced reads: leader = went to the backend, shared = reused a leader's result.",
+))
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Merge concurrent identical reads: the first caller for a key runs `fn`,
+    callers arriving while it is in flight wait and get the same result (or
+    exception). Nothing is kept once the call finishes, so this never serves
+    data older than a read that was already running - put any cache in front
+    of it, and cache misses are coalesced too.
+
+    Results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, result="shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        SINGLE_FLIGHT_CALLS.inc(group=self.name, result="leader")
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self.forget(key, call)
+            call.done.set()
+
+    def forget(self, key: Hashable, call: _Call | None = None):
+        """
+        Stop new callers from joining the in-flight read for `key`. Writers
+        call this after changing the data, so a read that starts after the
+        write never reuses one that started before it.
+        """
+        with self._lock:
+            if call is None or self._calls.get(key) is call:
+                self._calls.pop(key, None)
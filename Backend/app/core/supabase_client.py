@@ -1,19 +1,68 @@
-from supabase import create_client, Client
+from functools import lru_cache
+from typing import Optional, TYPE_CHECKING
+
+import httpx
 from app.config import settings
+from app.core.metrics import instrument_client
+
+if TYPE_CHECKING:
+    from postgrest import SyncPostgrestClient
+
+
+# Optional shared HTTP client for PostgREST (benchmarks / local stand-ins)
+_http_client: Optional[httpx.Client] = None
+
+
+def use_http_client(http_client: Optional[httpx.Client]):
+    """
+    Route every Supabase client built after this call through `http_client`.
+    Pass None to go back to the default per-client session.
+    """
+    global _http_client
+    _http_client = http_client
+    _create.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _create(key: str, url: Optional[str] = None) -> "SyncPostgrestClient":
+    # The services only use the PostgREST API, so build that client alone.
+    # Importing and constructing the full supabase-py Client (auth, storage,
+    # realtime, functions) roughly doubles cold-start time for nothing.
+    from postgrest import SyncPostgrestClient
+    from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+
+    session = _http_client or httpx.Client(
+        http2=True,
+        follow_redirects=True,
+        timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT,
+    )
+    client = SyncPostgrestClient(
+        f"{(url or settings.SUPABASE_URL).rstrip('/')}/rest/v1",
+        headers={"apiKey": key, "Authorization": f"Bearer {key}"},
+        http_client=session,
+    )
+    return instrument_client(client)
 
 
-def get_public_client() -> Client:
+def get_public_client() -> "SyncPostgrestClient":
     """
-    Returns a fresh Supabase client using anon (public) key.
+    Returns the shared Supabase (PostgREST) client using anon (public) key.
     Safe to use for user-level operations.
     """
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    return _create(settings.SUPABASE_KEY)
 
 
-def get_service_client() -> Client:
+def get_service_client() -> "SyncPostgrestClient":
     """
-    Returns a fresh Supabase client using the service role key.
+    Returns the shared Supabase (PostgREST) client using the service role key.
     Must ONLY be used for privileged or internal operations.
     """
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+    return _create(settings.SUPABASE_SERVICE_ROLE_KEY)
 
+
+def get_client(url: str, key: str) -> "SyncPostgrestClient":
+    """
+    Returns the shared client for another Supabase project (an account shard,
+    see app/services/sharding.py). Same caching and session rules as above.
+    """
+    return _create(key, url)
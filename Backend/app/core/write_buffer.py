@@ -0,0 +1,105 @@
+# app/core/write_buffer.py
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.metrics import Counter, register
+
+
+BUFFER_FLUSHED = register(Counter(
+    "write_buffer_flushed_rows_total", "Rows written by background write buffers."
+))
+BUFFER_ERRORS = register(Counter(
+    "write_buffer_errors_total", "Failed write buffer flushes."
+))
+
+_buffers: List["WriteBuffer"] = []
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer: rows are queued in memory and written in batches by
+    a daemon thread, either when `max_items` accumulate or every `interval`
+    seconds. flush() drains synchronously (used on shutdown).
+
+    A batch that fails to write goes back to the front of the queue and is
+    retried with backoff (a partly written batch may repeat rows; none are
+    dropped). Once `max_pending` rows wait, add() writes through so the
+    caller sees the failure instead of the queue growing without bound.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        write_many: Callable[[List[Dict[str, Any]]], None],
+        max_items: int,
+        interval: float,
+        max_pending: Optional[int] = None,
+        max_backoff: float = 30.0,
+    ):
+        self.name = name
+        self.write_many = write_many
+        self.max_items = max_items
+        self.interval = interval
+        self.max_pending = max_pending or 10 * max_items
+        self.max_backoff = max_backoff
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()    # one writer at a time keeps requeued rows in order
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"write-buffer-{name}", daemon=True)
+        self._thread.start()
+        _buffers.append(self)
+
+    def add(self, row: Dict[str, Any]):
+        with self._lock:
+            backlog = len(self._rows) >= self.max_pending
+            if not backlog:
+                self._rows.append(row)
+                full = len(self._rows) >= self.max_items
+        if backlog:
+            self.write_many([row])
+            return
+        if full:
+            self._wake.set()
+
+    def flush(self) -> bool:
+        """Write everything queued; False (rows kept for the next try) on failure."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return True
+            try:
+                self.write_many(rows)
+            except Exception as e:
+                BUFFER_ERRORS.inc(buffer=self.name)
+                with self._lock:
+                    self._rows[:0] = rows
+                    pending = len(self._rows)
+                print(f"[BUFFER ERROR] {self.name}: {len(rows)} rows kept for retry ({pending} pending): {e}")
+                return False
+            BUFFER_FLUSHED.inc(len(rows), buffer=self.name)
+            return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def _run(self):
+        failures = 0
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self.flush():
+                failures = 0
+                continue
+            failures += 1
+            time.sleep(min(self.interval * 2 ** failures, self.max_backoff))
+
+
+def flush_all():
+    for buf in _buffers:
+        if not buf.flush():
+            print(f"[BUFFER ERROR] {buf.name}: {buf.pending()} rows could not be written before shutdown")
@@ -2,8 +2,15 @@ from fastapi import Request, HTTPException, Depends
 from typing import Dict, Any
 from app.utils.jwt_tools import decode_token, make_access, REFRESH_GRACE_SECONDS
 from app.utils.time_tools import now_utc_ts
-from app.core.supabase_client import get_public_client
-from supabase import Client
+from app.services.repository import Repository, UnavailableError, get_repository
+from app.core.single_flight import SingleFlight
+from app.services.offline_service import backend_unreachable
+from app.config import settings
+
+
+# Every authenticated request looks up the caller's role; concurrent
+# requests from the same user share one lookup.
+_role_flight = SingleFlight("users.get_role", enabled=settings.SINGLE_FLIGHT)
 
 
 def get_current_user(request: Request) -> Dict[str, str]:
@@ -27,22 +34,25 @@ def get_current_user(request: Request) -> Dict[str, str]:
     if not user_id or not app_role:
         raise HTTPException(401, "Invalid token payload")
 
-    # Fetch user from Supabase
-    client: Client = getattr(request.state, "supabase", None) or get_public_client()
-
-    res = (
-        client.table("users")
-        .select("uid, role")
-        .eq("uid", user_id)
-        .single()
-        .execute()
-    )
+    # Fetch user from the data backend
+    db: Repository = getattr(request.state, "supabase", None) or get_repository(privileged=False)
 
-    if not res.data:
+    try:
+        db_role = _role_flight.do((id(db), user_id), lambda: db.users.get_role(user_id))
+    except Exception as e:
+        if not backend_unreachable():
+            raise
+        # Offline mode keeps ATM deposits / small withdrawals going while the
+        # backend is down, so the signed token's role has to do until it is back
+        if not settings.OFFLINE_MODE:
+            if isinstance(e, UnavailableError):
+                raise
+            raise UnavailableError(f"Role lookup failed: {e}") from e   # 503 + Retry-After
+        db_role = app_role
+    if not db_role:
         raise HTTPException(401, "User not found")
 
     # DB is source of truth, update role if mismatch
-    db_role = res.data["role"]
     if db_role != app_role:
         app_role = db_role
 
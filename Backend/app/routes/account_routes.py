@@ -1,16 +1,26 @@
 # app/routes/account_routes.py
 
-from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi import APIRouter, Depends, Query, Request, Response, HTTPException
 from app.dependencies.auth_deps import require_roles
 from app.services.account_service import AccountService
-from app.schemas.account_schemas import CreateAccountRequest
+from app.schemas.account_schemas import (
+    CreateAccountRequest,
+    CreateAccountResponse,
+    BalanceResponse,
+    AccountSearchResponse,
+)
+from app.services.auth_service import AuthService
+from app.services.history_service import HistoryService
+from app.utils.etag_tools import make_etag, etag_matches, not_modified, cache_headers
 
 router = APIRouter()
 
 account_service = AccountService()
+auth_service = AuthService()
+history_service = HistoryService()
 
 
-@router.post("/create")
+@router.post("/create", response_model=CreateAccountResponse)
 def create_account(
     request: Request,
     data: CreateAccountRequest,
@@ -36,3 +46,52 @@ def create_account(
         "account_no": result["account_no"],
         "message": result["message"],
     }
+
+
+# -------- SEARCH (teller lookup) --------
+@router.get("/search", response_model=AccountSearchResponse)
+def search_accounts(
+    request: Request,
+    q: str = Query(..., max_length=64),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0, le=1000),
+    _: dict = Depends(require_roles("admin", "teller")),
+):
+    db = request.state.service
+
+    ok, result = account_service.search(db, q, limit, offset)
+    if not ok:
+        raise HTTPException(400, result)
+
+    return result
+
+
+# -------- BALANCE (conditional GET) --------
+@router.get("/balance/{ac_no}", response_model=BalanceResponse)
+def get_balance(
+    ac_no: str,
+    pin: str,
+    request: Request,
+    response: Response,
+    _: dict = Depends(require_roles("admin", "teller", "customer")),
+):
+    db = request.state.service
+
+    ok, msg = auth_service.check(db, ac_no=ac_no, pin=pin, request=request)
+    if not ok:
+        raise HTTPException(400, msg)
+
+    ok, balance = account_service.get_balance(db, ac_no)
+    if not ok:
+        raise HTTPException(404, balance)
+
+    # Every balance change writes a history row, but history inserts can be
+    # buffered or fail independently, so the balance itself is part of the tag.
+    ok, version = history_service.get_version(db, ac_no)
+    if ok:
+        etag = make_etag("balance", ac_no, version, balance)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+
+    return {"account_no": ac_no, "balance": balance}
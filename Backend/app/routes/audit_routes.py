@@ -0,0 +1,58 @@
+# app/routes/audit_routes.py
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, HTTPException
+from app.dependencies.auth_deps import require_roles
+from app.schemas.audit_schemas import AuditEventsResponse, AuditCountsResponse
+from app.services.audit_service import AuditService
+
+router = APIRouter()
+
+audit_service = AuditService()
+
+
+# -------- EVENTS (newest first, keyset pages) --------
+@router.get("/events", response_model=AuditEventsResponse)
+def audit_events(
+    request: Request,
+    actor: Optional[str] = None,
+    action: Optional[str] = None,
+    ip: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, max_length=256),
+    _: dict = Depends(require_roles("admin")),
+):
+    db = request.state.service
+
+    filters = {"actor": actor, "action": action, "ip": ip, "since": since, "until": until}
+    ok, result = audit_service.query_events(db, filters, limit, cursor)
+    if not ok:
+        raise HTTPException(400, result)
+
+    return result
+
+
+# -------- COUNTS PER ACTION PER BUCKET (dashboards) --------
+@router.get("/counts", response_model=AuditCountsResponse)
+def audit_counts(
+    request: Request,
+    bucket: str = "hour",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    actor: Optional[str] = None,
+    action: Optional[str] = None,
+    _: dict = Depends(require_roles("admin")),
+):
+    db = request.state.service
+
+    ok, result = audit_service.action_counts(
+        db, bucket, since, until, {"actor": actor, "action": action}
+    )
+    if not ok:
+        raise HTTPException(400, result)
+
+    return result
@@ -22,7 +22,15 @@ from app.utils.jwt_tools import (
     REFRESH_TTL,
 )
 from app.utils.cookie_tools import set_cookie, clear_cookie
-from app.schemas.auth_schemas import CreateUserRequest  # or app.schemas.auth_schemas if you split
+from app.utils.etag_tools import make_etag, etag_matches, not_modified, cache_headers
+from app.schemas.auth_schemas import (  # or app.schemas.auth_schemas if you split
+    CreateUserRequest,
+    CreateUserResponse,
+    LoginResponse,
+    AuthCheckResponse,
+    AuthHealthResponse,
+)
+from app.schemas.common_schemas import MessageResponse, SuccessResponse
 
 
 router = APIRouter()
@@ -30,13 +38,14 @@ auth_service = AuthService()
 
 
 # -------- ROOT (optional: if you want /auth/health) --------
-@router.get("/health")
-def auth_health():
+@router.get("/health", response_model=AuthHealthResponse)
+async def auth_health():
+    # async: no threadpool worker needed, so it stays up when the backend stalls
     return {"status": "OK", "scope": "auth"}
 
 
 # -------- CREATE USER (admin only) --------
-@router.post("/create-user")
+@router.post("/create-user", response_model=CreateUserResponse)
 def create_user(
     request: Request,
     data: CreateUserRequest,
@@ -50,25 +59,20 @@ def create_user(
     if len(data.pas) < 4:
         raise HTTPException(400, "Password must be at least 4 characters")
 
-    ok, msg = auth_service.create_employ(db, data.username, data.pas, data.role)
+    # The insert returns the new row, so no follow-up lookup for the id
+    ok, user = auth_service.create_employ(db, data.username, data.pas, data.role)
     if not ok:
-        raise HTTPException(400, msg)
-
-    user = auth_service.get_user(db, data.username)
-    if not user:
-        raise HTTPException(500, "User created but cannot fetch ID")
-
-    user_id = user["id"]
+        raise HTTPException(400, user)
 
     return {
         "success": True,
         "message": f"User created: {data.username}",
-        "user_id": user_id,
+        "user_id": user["id"],
     }
 
 
 # -------- LOGIN --------
-@router.post("/login")
+@router.post("/login", response_model=LoginResponse)
 def login(
     request: Request,
     response: Response,
@@ -77,14 +81,12 @@ def login(
 ):
     db = request.state.service  # privileged client
 
-    if not auth_service.password_check(db, username, password):
+    # One lookup; unknown users are checked against a dummy hash
+    user = auth_service.authenticate(db, username, password)
+    if not user:
         auth_service.log_event(db, username, "login_failed", "Wrong password", request)
         raise HTTPException(401, "Invalid credentials")
 
-    user = auth_service.get_user(db, username)
-    if not user:
-        raise HTTPException(404, "User not found")
-
     user_id = str(user["id"])
     app_role = user["role"]
 
@@ -109,7 +111,7 @@ def login(
 
 
 # -------- LOGOUT --------
-@router.post("/logout")
+@router.post("/logout", response_model=MessageResponse)
 def logout(response: Response):
     clear_cookie(response, "atm_token")
     clear_cookie(response, "refresh_token")
@@ -117,7 +119,7 @@ def logout(response: Response):
 
 
 # -------- REFRESH TOKENS --------
-@router.post("/refresh")
+@router.post("/refresh", response_model=SuccessResponse)
 def refresh_tokens(
     request: Request,
     response: Response,
@@ -137,17 +139,11 @@ def refresh_tokens(
 
     db = request.state.service
 
-    res = (
-        db.table("users")
-        .select("role")
-        .eq("uid", sub)
-        .single()
-        .execute()
-    )
-    if not res.data:
+    db_role = db.users.get_role(sub)
+    if not db_role:
         raise HTTPException(401, "User not found")
 
-    app_role = res.data["role"]
+    app_role = db_role
     new_access = make_access(str(sub), app_role)
     new_refresh = make_refresh(str(sub), app_role)
 
@@ -168,8 +164,14 @@ def refresh_tokens(
 
 
 # -------- AUTH CHECK --------
-@router.get("/check")
-def auth_check(user=Depends(get_current_user)):
+@router.get("/check", response_model=AuthCheckResponse)
+def auth_check(request: Request, response: Response, user=Depends(get_current_user)):
+    # Polled by the frontend: unchanged identity/role answers 304
+    etag = make_etag("auth", user["sub"], user["app_role"])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+
     return {
         "authenticated": True,
         "user_id": user["sub"],
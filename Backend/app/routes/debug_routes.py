@@ -2,19 +2,19 @@
 
 from fastapi import APIRouter, Depends, Request, HTTPException
 from app.dependencies.auth_deps import require_roles
+from app.schemas.auth_schemas import DebugClaimsResponse
 
 router = APIRouter()
 
 
-@router.get("/jwt")
+@router.get("/jwt", response_model=DebugClaimsResponse, response_model_exclude_none=True)
 def debug_jwt(
     request: Request,
     _: dict = Depends(require_roles("admin")),  # <--- LOCKED TO ADMINS ONLY
 ):
-    db = request.state.service  # service client = privileged
+    db = request.state.service  # service repository = privileged
 
     try:
-        res = db.rpc("debug_claims").execute()
-        return {"jwt": res.data}
+        return {"jwt": db.debug_claims()}
     except Exception as e:
         return {"error": str(e)}
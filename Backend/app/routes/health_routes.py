@@ -0,0 +1,25 @@
+# app/routes/health_routes.py
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.lifecycle import is_ready
+from app.schemas.common_schemas import StatusResponse
+
+router = APIRouter()
+
+# Probes are async: they answer on the event loop even while every
+# threadpool worker is stuck waiting on a slow backend.
+
+
+# -------- LIVENESS: process is up and serving --------
+@router.get("/live", response_model=StatusResponse)
+async def live():
+    return {"status": "OK"}
+
+
+# -------- READINESS: warmed up and not draining --------
+@router.get("/ready", response_model=StatusResponse, responses={503: {"model": StatusResponse}})
+async def ready():
+    if not is_ready():
+        return JSONResponse({"status": "unavailable"}, status_code=503)
+    return {"status": "OK"}
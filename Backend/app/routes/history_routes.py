@@ -1,9 +1,16 @@
 # app/routes/history_routes.py
 
 from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.core.history_feed import get_feed, event_stream
 from app.dependencies.auth_deps import require_roles
 from app.services.history_service import HistoryService
 from app.services.auth_service import AuthService
+from app.schemas.history_schemas import HistoryResponse
+from app.utils.json_tools import FastJSONResponse
+from app.utils.etag_tools import make_etag, etag_matches, not_modified, cache_headers
 
 router = APIRouter()
 
@@ -11,7 +18,9 @@ history_service = HistoryService()
 auth_service = AuthService()
 
 
-@router.get("/{ac_no}")
+# Rows come back from the backend already JSON-shaped, so they are written
+# out directly; HistoryResponse only documents the payload.
+@router.get("/{ac_no}", response_model=HistoryResponse)
 def get_history(
     ac_no: str,
     pin: str,
@@ -25,9 +34,52 @@ def get_history(
     if not ok:
         raise HTTPException(400, msg)
 
+    # Version first: a row landing between the two reads makes the tag older
+    # than the body, which only costs the client one extra full fetch.
+    headers = None
+    ok, version = history_service.get_version(db, ac_no)
+    if ok:
+        etag = make_etag("history", ac_no, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        headers = cache_headers(etag)
+
     # fetch history
     ok, history = history_service.get_history(db, ac_no)
     if not ok:
         raise HTTPException(404, history)
 
-    return {"history": history}
+    return FastJSONResponse({"history": history}, headers=headers)
+
+
+# Live feed of new rows (server-sent events). Async so an idle subscriber
+# holds no threadpool worker; the blocking checks run in the threadpool.
+@router.get("/{ac_no}/stream")
+async def stream_history(
+    ac_no: str,
+    pin: str,
+    request: Request,
+    _: dict = Depends(require_roles("admin", "teller")),
+):
+    db = request.state.service
+
+    ok, msg = await run_in_threadpool(auth_service.check, db, ac_no=ac_no, pin=pin, request=request)
+    if not ok:
+        raise HTTPException(400, msg)
+
+    # EventSource resends the last id it saw when it reconnects
+    last_event_id = request.headers.get("last-event-id")
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    async def backfill():
+        ok, rows = await run_in_threadpool(history_service.get_history, db, ac_no)
+        return rows if ok else []
+
+    return StreamingResponse(
+        event_stream(
+            get_feed(), ac_no, settings.FEED_HEARTBEAT_SECONDS, last_event_id, backfill,
+            max_age=settings.FEED_MAX_STREAM_SECONDS,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
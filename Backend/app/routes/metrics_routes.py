@@ -0,0 +1,16 @@
+# app/routes/metrics_routes.py
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.dependencies.auth_deps import require_roles
+from app.core.metrics import render_prometheus
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(_: dict = Depends(require_roles("admin"))):
+    return PlainTextResponse(
+        render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
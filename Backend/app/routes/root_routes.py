@@ -1,7 +1,8 @@
 from fastapi import APIRouter
+from app.schemas.common_schemas import ServiceStatusResponse
 
 router = APIRouter()
 
-@router.get("/")
+@router.get("/", response_model=ServiceStatusResponse)
 def root():
     return {"status": "OK", "message": "RupeeWave API Running"}
@@ -3,14 +3,16 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
 from app.dependencies.auth_deps import require_roles
 from app.schemas.transaction_schemas import TransactionRequest, TransferRequest
+from app.schemas.common_schemas import MessageResponse
 from app.services.transaction_service import TransactionService
+from app.services.offline_service import KEY_REUSED
 
 router = APIRouter()
 transaction_service = TransactionService()
 
 
 # -------- DEPOSIT --------
-@router.post("/deposit")
+@router.post("/deposit", response_model=MessageResponse)
 def deposit(
     request: Request,
     data: TransactionRequest,
@@ -27,13 +29,13 @@ def deposit(
     )
 
     if not ok:
-        raise HTTPException(400, msg)
+        raise HTTPException(409 if msg == KEY_REUSED else 400, msg)
 
     return {"success": True, "message": msg}
 
 
 # -------- WITHDRAW --------
-@router.post("/withdraw")
+@router.post("/withdraw", response_model=MessageResponse)
 def withdraw(
     request: Request,
     data: TransactionRequest,
@@ -50,13 +52,13 @@ def withdraw(
     )
 
     if not ok:
-        raise HTTPException(400, msg)
+        raise HTTPException(409 if msg == KEY_REUSED else 400, msg)
 
     return {"success": True, "message": msg}
 
 
 # -------- TRANSFER --------
-@router.post("/transfer")
+@router.post("/transfer", response_model=MessageResponse)
 def transfer(
     request: Request,
     data: TransferRequest,
@@ -76,7 +78,4 @@ def transfer(
     if not ok:
         raise HTTPException(400, msg)
 
-    return {
-        "success": True,
-        "message": msg,
-    }
+    return {"success": True, "message": msg}
@@ -3,14 +3,15 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
 from app.dependencies.auth_deps import require_roles
 from app.schemas.update_schemas import ChangePinRequest, UpdateMobileRequest, UpdateEmailRequest
-from app.services.update_service import UpdateService
+from app.schemas.common_schemas import MessageResponse
+from app.services.update_service import UpdateService, OLD_VALUE_MISMATCH
 
 router = APIRouter()
 update_service = UpdateService()
 
 
 # -------- CHANGE PIN --------
-@router.put("/change-pin")
+@router.put("/change-pin", response_model=MessageResponse)
 def change_pin(
     request: Request,
     data: ChangePinRequest,
@@ -36,7 +37,7 @@ def change_pin(
 
 
 # -------- UPDATE MOBILE --------
-@router.put("/update-mobile")
+@router.put("/update-mobile", response_model=MessageResponse)
 def update_mobile(
     request: Request,
     data: UpdateMobileRequest,
@@ -54,13 +55,13 @@ def update_mobile(
     )
 
     if not ok:
-        raise HTTPException(400, msg)
+        raise HTTPException(409 if msg in OLD_VALUE_MISMATCH else 400, msg)
 
     return {"success": True, "message": msg}
 
 
 # -------- UPDATE EMAIL --------
-@router.put("/update-email")
+@router.put("/update-email", response_model=MessageResponse)
 def update_email(
     request: Request,
     data: UpdateEmailRequest,
@@ -78,6 +79,6 @@ def update_email(
     )
 
     if not ok:
-        raise HTTPException(400, msg)
+        raise HTTPException(409 if msg in OLD_VALUE_MISMATCH else 400, msg)
 
     return {"success": True, "message": msg}
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel, Field, EmailStr
 
 
@@ -12,3 +14,27 @@ class CreateAccountRequest(BaseModel):
     vpin: str = Field(..., pattern=r"^\d{4}$")
     mobileno: str = Field(..., min_length=10, max_length=10, pattern=r"^\d{10}$")
     gmail: EmailStr
+
+
+class BalanceResponse(BaseModel):
+    account_no: str
+    balance: int
+
+
+class CreateAccountResponse(BaseModel):
+    success: bool = True
+    account_no: str
+    message: str
+
+
+class AccountSearchHit(BaseModel):
+    account_no: str
+    name: str
+    mobileno: Optional[str] = None
+    gmail: Optional[str] = None
+    score: float
+
+
+class AccountSearchResponse(BaseModel):
+    results: List[AccountSearchHit]
+    next_offset: Optional[int] = None
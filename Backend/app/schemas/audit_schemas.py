@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import List, Optional, Union
+
+from pydantic import BaseModel
+
+
+class AuditEvent(BaseModel):
+    id: Union[int, str]
+    actor: str
+    action: str
+    details: Optional[str] = None
+    ip: Optional[str] = None
+    user_agent: Optional[str] = None
+    created_at: Union[datetime, str]
+
+
+class AuditEventsResponse(BaseModel):
+    events: List[AuditEvent]
+    next_cursor: Optional[str] = None
+
+
+class AuditBucketCount(BaseModel):
+    bucket: Union[datetime, str]
+    action: str
+    events: int
+
+
+class AuditCountsResponse(BaseModel):
+    bucket: str
+    since: datetime
+    until: datetime
+    counts: List[AuditBucketCount]
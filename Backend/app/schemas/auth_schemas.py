@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, EmailStr
 from enum import Enum
+from typing import Any, Optional, Union
 
 
 class UserRole(str, Enum):
@@ -13,3 +14,31 @@ class CreateUserRequest(BaseModel):
     pas: str = Field(..., min_length=4, max_length=64)
     vps: str = Field(..., min_length=4, max_length=64)
     role: UserRole
+
+
+class CreateUserResponse(BaseModel):
+    success: bool = True
+    message: str
+    user_id: Union[int, str]
+
+
+class LoginResponse(BaseModel):
+    success: bool = True
+    role: str
+    user_name: str
+
+
+class AuthCheckResponse(BaseModel):
+    authenticated: bool = True
+    user_id: str
+    role: str
+
+
+class AuthHealthResponse(BaseModel):
+    status: str
+    scope: str
+
+
+class DebugClaimsResponse(BaseModel):
+    jwt: Optional[Any] = None
+    error: Optional[str] = None
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+
+
+class MessageResponse(BaseModel):
+    success: bool = True
+    message: str
+
+
+class SuccessResponse(BaseModel):
+    success: bool = True
+
+
+class StatusResponse(BaseModel):
+    status: str
+
+
+class ServiceStatusResponse(StatusResponse):
+    message: str
@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel
+
+
+class HistoryEntry(BaseModel):
+    id: Union[int, str]
+    account_no: str
+    action: str
+    amount: int = 0
+    context: Optional[Dict[str, Any]] = None
+    created_at: Union[datetime, str]
+
+
+class HistoryResponse(BaseModel):
+    history: List[HistoryEntry]
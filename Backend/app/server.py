@@ -0,0 +1,81 @@
+# app/server.py
+#
+# Production entry point:
+#   python -m app.server
+#
+# Uses gunicorn with uvicorn workers when available (preloaded app, one
+# worker per core by default) and falls back to uvicorn's own supervisor.
+
+import importlib.util
+import os
+import sys
+
+from app.config import settings
+
+
+def worker_count() -> int:
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    return os.cpu_count() or 1
+
+
+def _bind() -> str:
+    host = os.getenv("HOST", "0.0.0.0")
+    port = os.getenv("PORT", "8000")
+    return f"{host}:{port}"
+
+
+def _worker_class() -> str:
+    # uvicorn.workers moved to the separate `uvicorn-worker` package
+    if importlib.util.find_spec("uvicorn_worker"):
+        return "uvicorn_worker.UvicornWorker"
+    return "uvicorn.workers.UvicornWorker"
+
+
+def run_gunicorn() -> bool:
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        return False
+
+    from app.main import app as asgi_app
+
+    class _Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", _bind())
+            self.cfg.set("workers", worker_count())
+            self.cfg.set("worker_class", _worker_class())
+            self.cfg.set("preload_app", True)
+            # Leave room for the readiness drain before the hard kill
+            self.cfg.set("graceful_timeout", int(settings.SHUTDOWN_DRAIN_SECONDS) + 30)
+            self.cfg.set("keepalive", 5)
+
+        def load(self):
+            return asgi_app
+
+    _Server().run()
+    return True
+
+
+def run_uvicorn():
+    import uvicorn
+
+    host, port = _bind().rsplit(":", 1)
+    workers = worker_count()
+    uvicorn.run(
+        "app.main:app",  # import string: required for multiple workers
+        host=host,
+        port=int(port),
+        workers=workers,
+        proxy_headers=True,
+        timeout_graceful_shutdown=int(settings.SHUTDOWN_DRAIN_SECONDS) + 30,
+    )
+
+
+def main():
+    if not run_gunicorn():
+        run_uvicorn()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+# app/services/account_search.py
+#
+# Teller lookup over holder name, mobile number, email and account number.
+#
+# Matching follows sql/003_account_search.sql so every backend ranks alike:
+#   - prefix hits score 1.0 (account_no / mobileno for digits, name / gmail
+#     otherwise)
+#   - fuzzy hits score their pg_trgm similarity and must reach
+#     SIMILARITY_THRESHOLD; on gmail when the term has an "@", else on name
+# Results are ordered by (score desc, matched key, account_no), which lets
+# each branch stop after `offset + limit` candidates.
+#
+# AccountSearchIndex is the in-process equivalent of those Postgres indexes,
+# used by the memory backend and kept current by its insert / update.
+
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+SIMILARITY_THRESHOLD = 0.3       # pg_trgm default for the % operator
+MIN_QUERY_LENGTH = 2
+MIN_FUZZY_LENGTH = 3
+
+SEARCH_COLUMNS = ("account_no", "name", "mobileno", "gmail")
+
+_WORD = re.compile(r"[0-9a-z]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def classify(term: str) -> str:
+    """`account` (AC + digits), `digits` (mobile / account number) or `text`."""
+    if term[:2] == "ac" and term[2:].isdigit():
+        return "account"
+    if term.isdigit():
+        return "digits"
+    return "text"
+
+
+def trigrams(text: str) -> Set[str]:
+    """pg_trgm trigrams: each word padded with two leading and one trailing space."""
+    grams: Set[str] = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def rank(hits: Iterable[Tuple[str, str, float]], limit: int, offset: int) -> List[Tuple[str, str, float]]:
+    """Keep each account's best (account_no, key, score) hit and page through them."""
+    best: Dict[str, Tuple[str, str, float]] = {}
+    for hit in hits:
+        seen = best.get(hit[0])
+        if seen is None or (-hit[2], hit[1]) < (-seen[2], seen[1]):
+            best[hit[0]] = hit
+    ordered = sorted(best.values(), key=lambda h: (-h[2], h[1], h[0]))
+    return ordered[offset:offset + limit]
+
+
+class _PrefixIndex:
+    """Sorted (key, account_no) pairs; a prefix scan is one bisect plus a walk."""
+
+    def __init__(self):
+        self.entries: List[Tuple[str, str]] = []
+
+    def add(self, key: str, ac_no: str):
+        if key:
+            bisect.insort(self.entries, (key, ac_no))
+
+    def remove(self, key: str, ac_no: str):
+        i = bisect.bisect_left(self.entries, (key, ac_no))
+        if i < len(self.entries) and self.entries[i] == (key, ac_no):
+            del self.entries[i]
+
+    def scan(self, prefix: str, n: int) -> List[Tuple[str, str]]:
+        out = []
+        i = bisect.bisect_left(self.entries, (prefix, ""))
+        while i < len(self.entries) and len(out) < n:
+            key, ac_no = self.entries[i]
+            if not key.startswith(prefix):
+                break
+            out.append((key, ac_no))
+            i += 1
+        return out
+
+
+class _TrigramIndex:
+    """
+    Inverted trigram -> key postings, scored like pg_trgm similarity().
+    Postings hold distinct keys, so accounts sharing a holder name cost one
+    entry; `members` maps each key back to its accounts.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = defaultdict(set)
+        self.grams: Dict[str, Set[str]] = {}
+        self.members: Dict[str, Set[str]] = {}
+        self.key_of: Dict[str, str] = {}
+
+    def add(self, key: str, ac_no: str):
+        if not key:
+            return
+        self.key_of[ac_no] = key
+        members = self.members.get(key)
+        if members is not None:
+            members.add(ac_no)
+            return
+        self.members[key] = {ac_no}
+        grams = self.grams[key] = trigrams(key)
+        for g in grams:
+            self.postings[g].add(key)
+
+    def remove(self, ac_no: str):
+        key = self.key_of.pop(ac_no, None)
+        if key is None:
+            return
+        members = self.members[key]
+        members.discard(ac_no)
+        if members:
+            return
+        del self.members[key]
+        for g in self.grams.pop(key):
+            posting = self.postings[g]
+            posting.discard(key)
+            if not posting:
+                del self.postings[g]
+
+    def scan(self, term: str, n: int) -> List[Tuple[str, str, float]]:
+        query = trigrams(term)
+        if not query:
+            return []
+        q = len(query)
+        # A key needs s >= THRESHOLD * q shared trigrams (similarity <= s / q),
+        # so it must appear in one of the q - k + 1 rarest posting lists; the
+        # most common trigrams ("com", "mai", ...) are never walked.
+        k = max(1, math.ceil(SIMILARITY_THRESHOLD * q - 1e-9))
+        lists = sorted((self.postings.get(g, ()) for g in query), key=len)
+        probe = lists[:q - k + 1]
+        unprobed = q - len(probe)
+        counts = Counter(chain.from_iterable(probe))    # tallied in C
+
+        # Walk candidates by probe count; (count + unprobed) / q bounds the
+        # score, so stop once it drops below the n-th best score so far.
+        best: List[Tuple[float, _Desc, _Desc]] = []    # min-heap, worst hit on top
+        floor = SIMILARITY_THRESHOLD
+        for key, count in counts.most_common():
+            if (count + unprobed) / q < floor:
+                break
+            grams = self.grams[key]
+            if unprobed:
+                # Cheap bound from sizes before paying for the intersection
+                most = min(count + unprobed, len(grams))
+                if most / (q + len(grams) - most) < floor:
+                    continue
+                shared = len(query & grams)
+            else:
+                shared = count
+            score = shared / (q + len(grams) - shared)
+            if score < floor:
+                continue
+            for ac_no in self.members[key]:
+                heapq.heappush(best, (score, _Desc(key), _Desc(ac_no)))
+                if len(best) > n:
+                    heapq.heappop(best)
+            if len(best) == n:
+                floor = max(floor, best[0][0])
+
+        hits = [(ac.value, key.value, score) for score, key, ac in best]
+        hits.sort(key=lambda h: (-h[2], h[1], h[0]))
+        return hits
+
+
+class _Desc:
+    """Reverses string order inside the heap so ties keep the smallest key."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: str):
+        self.value = value
+
+    def __lt__(self, other: "_Desc") -> bool:
+        return self.value > other.value
+
+    def __eq__(self, other) -> bool:
+        return self.value == other.value
+
+
+class AccountSearchIndex:
+    """Prefix + trigram index over the searchable account columns."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[str, Dict[str, str]] = {}     # account_no -> indexed keys
+        self._prefix = {
+            "account_no": _PrefixIndex(),
+            "mobileno": _PrefixIndex(),
+            "name": _PrefixIndex(),
+            "gmail": _PrefixIndex(),
+        }
+        self._fuzzy = {"name": _TrigramIndex(), "gmail": _TrigramIndex()}
+
+    @staticmethod
+    def _keys(row: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            "account_no": normalize(row.get("account_no")),
+            "mobileno": normalize(row.get("mobileno")),
+            "name": normalize(row.get("name")),
+            "gmail": normalize(row.get("gmail")),
+        }
+
+    def upsert(self, row: Dict[str, Any]):
+        """Index a new account or re-index one whose searchable columns changed."""
+        ac_no = row["account_no"]
+        keys = self._keys(row)
+        with self._lock:
+            old = self._rows.get(ac_no)
+            if old == keys:
+                return
+            if old is not None:
+                self._drop(ac_no, old)
+            self._rows[ac_no] = keys
+            for col, index in self._prefix.items():
+                index.add(keys[col], ac_no)
+            for col, index in self._fuzzy.items():
+                index.add(keys[col], ac_no)
+
+    def bulk_load(self, rows: Iterable[Dict[str, Any]]):
+        """Index many new accounts at once (one sort per column instead of an insort per row)."""
+        with self._lock:
+            for row in rows:
+                ac_no = row["account_no"]
+                keys = self._keys(row)
+                if ac_no in self._rows:
+                    self._drop(ac_no, self._rows[ac_no])
+                self._rows[ac_no] = keys
+                for col, index in self._prefix.items():
+                    if keys[col]:
+                        index.entries.append((keys[col], ac_no))
+                for col, index in self._fuzzy.items():
+                    index.add(keys[col], ac_no)
+            for index in self._prefix.values():
+                index.entries.sort()
+
+    def remove(self, ac_no: str):
+        with self._lock:
+            old = self._rows.pop(ac_no, None)
+            if old is not None:
+                self._drop(ac_no, old)
+
+    def _drop(self, ac_no: str, keys: Dict[str, str]):
+        for col, index in self._prefix.items():
+            index.remove(keys[col], ac_no)
+        for index in self._fuzzy.values():
+            index.remove(ac_no)
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Tuple[str, str, float]]:
+        """Ranked (account_no, matched key, score) hits for one page."""
+        term = normalize(query)
+        n = offset + limit
+        kind = classify(term)
+        hits: List[Tuple[str, str, float]] = []
+        with self._lock:
+            if kind == "account":
+                cols = ("account_no",)
+            elif kind == "digits":
+                cols = ("mobileno",)
+                hits += [(a, k, 1.0) for k, a in self._prefix["account_no"].scan("ac" + term, n)]
+            else:
+                cols = ("name", "gmail")
+            for col in cols:
+                hits += [(a, k, 1.0) for k, a in self._prefix[col].scan(term, n)]
+            if kind == "text" and len(term) >= MIN_FUZZY_LENGTH:
+                hits += self._fuzzy["gmail" if "@" in term else "name"].scan(term, n)
+        return rank(hits, limit, offset)
@@ -3,15 +3,20 @@
 from typing import Tuple, Any
 from fastapi import Request
 from app.services.auth_service import AuthService
+from app.services.repository import Repository, DuplicateError
+from app.services.account_search import normalize, MIN_QUERY_LENGTH
+from app.core.metrics import traced
 
 
+ACCOUNT_NO_ATTEMPTS = 3
+
 class AccountService:
     def __init__(self):
         self.auth = AuthService()
 
     def create_account(
         self,
-        db,
+        db: Repository,
         holder_name: str,
         pin: str,
         vpin: str,
@@ -27,54 +32,36 @@ class AccountService:
             return False, "PINs do not match."
         if len(mobileno) != 10 or not mobileno.isdigit():
             return False, "Invalid mobile number."
-        if '@' not in gmail:
+        if gmail.count("@") != 1:
             return False, "Invalid email."
 
-        # Generate account no
         try:
-            account_no = self.auth.generate_account_no()
             hashed = self.auth.hash_pin(pin)
         except Exception as e:
             return False, f"Server Error: {e}"
 
-        # Insert into users
-        try:
-            user_res = (
-                db.table("users")
-                .insert({
-                    "user_name": account_no,
-                    "password": hashed,
-                    "role": "customer",
+        # User + account in one atomic call; a duplicate means the random
+        # account number is taken, so draw another
+        for _ in range(ACCOUNT_NO_ATTEMPTS):
+            account_no = self.auth.generate_account_no()
+            try:
+                created = db.accounts.open({
+                    "account_no": account_no,
+                    "name": holder_name,
+                    "pin": hashed,
+                    "mobileno": mobileno,
+                    "gmail": gmail,
                 })
-                .execute()
-            )
-        except Exception as e:
-            msg = str(e).lower()
-            if "duplicate" in msg:
-                return False, "User already exists."
-            return False, f"User creation failed: {e}"
+            except DuplicateError:
+                continue
+            except Exception as e:
+                return False, f"Database Error: {e}"
+            break
+        else:
+            return False, "User already exists."
 
-        if not user_res.data:
-            return False, "User insert failed."
-
-        user_id = user_res.data[0]["id"]
-
-        # Insert into accounts
-        try:
-            db.table("accounts").insert({
-                "account_no": account_no,
-                "name": holder_name,
-                "pin": hashed,
-                "mobileno": mobileno,
-                "gmail": gmail,
-                "failed_attempts": 0,
-                "is_locked": 0,
-                "user_id": user_id,
-            }).execute()
-        except Exception as e:
-            # rollback
-            db.table("users").delete().eq("id", user_id).execute()
-            return False, f"Database Error: {e}"
+        if not created:
+            return False, "Account creation failed."
 
         # Log event
         self.auth.log_event(db, account_no, "create_account", "created", request)
@@ -83,3 +70,29 @@ class AccountService:
             "account_no": account_no,
             "message": f"Account created successfully with Acc_No {account_no}"
         }
+
+    # ---------- Balance ----------
+    @traced("account.get_balance")
+    def get_balance(self, db: Repository, ac_no: str) -> Tuple[bool, Any]:
+        try:
+            balance = db.accounts.balance(ac_no)
+        except Exception as e:
+            return False, f"Database Error: {e}"
+        if balance is None:
+            return False, "Account not found."
+        return True, balance
+
+    # ---------- Search (teller lookup) ----------
+    @traced("account.search")
+    def search(self, db: Repository, query: str, limit: int, offset: int = 0) -> Tuple[bool, Any]:
+        """One page of hits plus the offset of the next page (None on the last)."""
+        term = normalize(query)
+        if len(term) < MIN_QUERY_LENGTH:
+            return False, f"Search needs at least {MIN_QUERY_LENGTH} characters."
+        try:
+            # One extra row tells whether another page exists
+            rows = db.accounts.search(term, limit + 1, offset)
+        except Exception as e:
+            return False, f"Database Error: {e}"
+        next_offset = offset + limit if len(rows) > limit else None
+        return True, {"results": rows[:limit], "next_offset": next_offset}
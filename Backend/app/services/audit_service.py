@@ -0,0 +1,79 @@
+# app/services/audit_service.py
+
+import base64
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.repository import Repository
+from app.core.metrics import traced
+from app.utils.time_tools import BUCKETS, parse_ts
+
+
+# Bound the dashboard query so one request cannot ask for years of minutes
+MAX_BUCKETS = 2000
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque keyset cursor from the last row of a page."""
+    raw = f"{parse_ts(row['created_at']).isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    ts, _, row_id = raw.rpartition("|")
+    return parse_ts(ts), int(row_id)
+
+
+class AuditService:
+
+    # ---------- Events (keyset pages) ----------
+    @traced("audit.query_events")
+    def query_events(
+        self,
+        db: Repository,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Tuple[bool, Any]:
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except (ValueError, UnicodeDecodeError):
+            return False, "Invalid cursor."
+
+        try:
+            # One extra row tells whether another page exists
+            rows = db.audit.query(filters, limit + 1, after)
+        except Exception as e:
+            return False, f"Database Error: {e}"
+
+        page = rows[:limit]
+        next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+        return True, {"events": page, "next_cursor": next_cursor}
+
+    # ---------- Counts per action per bucket ----------
+    @traced("audit.action_counts")
+    def action_counts(
+        self,
+        db: Repository,
+        bucket: str,
+        since: Optional[datetime],
+        until: Optional[datetime],
+        filters: Dict[str, Any],
+    ) -> Tuple[bool, Any]:
+        if bucket not in BUCKETS:
+            return False, f"Bucket must be one of {', '.join(BUCKETS)}."
+
+        until = parse_ts(until) if until else datetime.now(UTC)
+        since = parse_ts(since) if since else until - timedelta(days=1)
+        if since >= until:
+            return False, "`since` must be before `until`."
+        if (until - since) / BUCKETS[bucket] > MAX_BUCKETS:
+            return False, f"Range spans more than {MAX_BUCKETS} {bucket} buckets."
+
+        try:
+            counts = db.audit.action_counts(bucket, since, until, filters)
+        except Exception as e:
+            return False, f"Database Error: {e}"
+
+        return True, {"bucket": bucket, "since": since, "until": until, "counts": counts}
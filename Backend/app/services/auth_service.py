@@ -1,28 +1,71 @@
 from bcrypt import hashpw, gensalt, checkpw
-from typing import Tuple, Any
+from typing import Tuple, Any, Optional
 from fastapi import Request
+import os
 import random
-from supabase import Client
+import threading
+import time
+
+from app.config import settings
+from app.services.repository import Repository, DuplicateError, get_repository
+from app.core.metrics import span, traced, record_span, BCRYPT_LATENCY, BCRYPT_WAIT
+from app.core.write_buffer import WriteBuffer
+from app.core.offline import get_pin_cache
+
+
+# bcrypt releases the GIL, so more concurrent hashes than cores only adds
+# contention. Waiting for a slot is recorded as bcrypt queue wait.
+_BCRYPT_SLOTS = threading.BoundedSemaphore(os.cpu_count() or 1)
+
+
+def _bcrypt(op: str, fn, *args):
+    start = time.perf_counter()
+    with _BCRYPT_SLOTS:
+        waited = time.perf_counter() - start
+        BCRYPT_WAIT.observe(waited, op=op)
+        record_span("bcrypt-wait", waited)
+        with span("bcrypt", BCRYPT_LATENCY, op=op):
+            return fn(*args)
+
+
+# Checked when the username does not exist, so an unknown user costs the
+# same bcrypt work as a wrong password. Cost 12 matches gensalt()'s default.
+_DUMMY_HASH = b"$2b$12$OLBQyxS5OdiLtmSjzSYsqOiQZe7s763tH4..cga9l0uYV3JmeZ5jq"
+
+
+_audit_buffer: Optional[WriteBuffer] = None
+_audit_buffer_lock = threading.Lock()
+
+
+def _get_audit_buffer() -> Optional[WriteBuffer]:
+    """Batch audit inserts off the request path (AUDIT_BUFFER_SIZE > 0)."""
+    global _audit_buffer
+    if settings.AUDIT_BUFFER_SIZE <= 0:
+        return None
+    if _audit_buffer is None:
+        with _audit_buffer_lock:
+            if _audit_buffer is None:
+                _audit_buffer = WriteBuffer(
+                    "audit",
+                    lambda rows: get_repository().audit.add_many(rows),
+                    max_items=settings.AUDIT_BUFFER_SIZE,
+                    interval=settings.AUDIT_FLUSH_INTERVAL,
+                )
+    return _audit_buffer
 
 
 class AuthService:
     def __init__(self):
         pass  # no DB stored here
 
-    def get_user(self, db: Client, username: str):
+    def get_user(self, db: Repository, username: str):
         try:
-            response = (
-                db.table("users")
-                .select("id, user_name, role, password")
-                .eq("user_name", username)
-                .single()
-                .execute()
-            )
+            return db.users.get_by_name(username)
         except Exception:
             return None
-        return response.data if response.data else None
 
-    def log_event(self, db: Client, actor: str, action: str, details: str, request: Request):
+    @traced("audit.log_event")
+    def log_event(self, db: Repository, actor: str, action: str, details: str, request: Request):
         try:
             ip = request.client.host if request.client else "unknown"
         except Exception:
@@ -41,143 +84,84 @@ class AuthService:
             "user_agent": ua,
         }
 
+        buffer = _get_audit_buffer()
+        if buffer is not None:
+            buffer.add(data)
+            return
+
         try:
-            db.table("app_audit_logs").insert(data).execute()
+            db.audit.add(data)
         except Exception:
             pass
 
     def hash_pin(self, pin: str) -> str:
-        return hashpw(pin.encode(), gensalt()).decode()
+        return _bcrypt("hash", hashpw, pin.encode(), gensalt()).decode()
 
     def verify_pin(self, pin: str, hashed_pin: str) -> bool:
-        return checkpw(pin.encode(), hashed_pin.encode())
+        return _bcrypt("verify", checkpw, pin.encode(), hashed_pin.encode())
 
     def generate_account_no(self) -> str:
         return "AC" + str(random.randint(10**9, 10**10 - 1))
 
-    def create(self, db: Client, holder: str, pin: str, vpin: str, mobileno: str, gmail: str) -> Tuple[bool, Any]:
-        # Validation
-        if len(pin) != 4 or not pin.isdigit():
-            return False, "PIN must be 4 digits."
-        if pin != vpin:
-            return False, "PINs do not match."
-        if len(mobileno) != 10 or not mobileno.isdigit():
-            return False, "Invalid mobile number."
-        if '@' not in gmail or gmail.count("@") != 1:
-            return False, "Invalid email."
-
-        try:
-            account_no = str(self.generate_account_no())
-            hashed = self.hash_pin(pin)
-        except Exception as e:
-            return False, f"Server Error: {e}"
-
-        # Insert user
-        try:
-            user_res = (
-                db.table("users")
-                .insert({
-                    "user_name": account_no,
-                    "password": hashed,
-                    "role": "customer",
-                })
-                .execute()
-            )
-        except Exception as e:
-            msg = str(e).lower()
-            if "duplicate" in msg:
-                return False, "User already exists."
-            return False, f"User creation failed: {e}"
-
-        if not user_res.data:
-            return False, "User insert failed."
-
-        user_id = user_res.data[0]["id"]
-
-        # Insert account
-        try:
-            acc_res = (
-                db.table("accounts")
-                .insert({
-                    "account_no": account_no,
-                    "name": holder,
-                    "pin": hashed,
-                    "mobileno": mobileno,
-                    "gmail": gmail,
-                    "failed_attempts": 0,
-                    "is_locked": 0,
-                    "user_id": user_id,
-                })
-                .execute()
-            )
-        except Exception as e:
-            # rollback user
-            db.table("users").delete().eq("id", user_id).execute()
-
-            msg = str(e).lower()
-            if "duplicate" in msg:
-                return False, "Account already exists."
-            return False, f"Database Error: {e}"
-
-        return True, {
-            "account_no": account_no,
-            "message": f"Account created successfully with Acc_No {account_no}"
-        }
-
-    def create_employ(self, db: Client, username: str, pas: str, role: str) -> Tuple[bool, str]:
+    def create_employ(self, db: Repository, username: str, pas: str, role: str) -> Tuple[bool, Any]:
+        """Returns the inserted row (id, user_name, role) on success."""
         try:
             hashed = self.hash_pin(pas)
-            db.table("users").insert({
+            user = db.users.insert({
                 "user_name": username,
                 "password": hashed,
                 "role": role
-            }).execute()
-            return True, f"User created: {username}"
+            })
+            if not user:
+                return False, "User insert failed."
+            return True, {k: v for k, v in user.items() if k != "password"}
+        except DuplicateError:
+            return False, "Username already exists."
         except Exception as e:
-            msg = str(e).lower()
-            if "duplicate" in msg or "unique constraint" in msg:
-                return False, "Username already exists."
             return False, f"Database Error: {e}"
 
-    def password_check(self, db: Client, username: str, pw: str) -> Any:
+    @traced("auth.authenticate")
+    def authenticate(self, db: Repository, username: str, pw: str) -> Optional[dict]:
+        """
+        Login check from a single user lookup. Returns the row (id,
+        user_name, role) on success, None otherwise; bcrypt runs either way.
+        """
         try:
-            resp = (
-                db.table("users")
-                .select("password")
-                .eq("user_name", username)
-                .limit(1)
-                .execute()
-            )
+            user = db.users.get_by_name(username)
         except Exception:
-            return False
+            user = None
 
-        if not resp.data:
-            return False
+        stored_hash = user["password"].encode() if user and user.get("password") else _DUMMY_HASH
+        matched = _bcrypt("verify", checkpw, pw.encode(), stored_hash)
 
-        stored_hash = resp.data[0]["password"]
-        return checkpw(pw.encode(), stored_hash.encode())
+        if not (user and matched):
+            return None
+        return {k: v for k, v in user.items() if k != "password"}
+
+    def password_check(self, db: Repository, username: str, pw: str) -> Any:
+        return self.authenticate(db, username, pw) is not None
 
-    def check(self, db: Client, ac_no: str, pin: str, request: Request) -> Tuple[bool, str]:
+    @traced("auth.check")
+    def check(self, db: Repository, ac_no: str, pin: str, request: Request) -> Tuple[bool, str]:
         pin = str(pin).strip()
         try:
-            response = (
-                db.table("accounts")
-                .select("pin, failed_attempts, is_locked")
-                .eq("account_no", ac_no)
-                .single()
-                .execute()
-            )
+            account = db.accounts.get(ac_no, "pin, failed_attempts, is_locked")
         except Exception as e:
             self.log_event(db, "unknown", "pin_failed", f"DB Error: {e}", request)
             return False, "Server error. Try again."
 
-        if not response or not response.data:
+        if not account:
             self.log_event(db, "unknown", "pin_failed", f"Account {ac_no} not found", request)
             return False, "Account not found."
 
-        stored_hash = response.data["pin"]
-        attempts = response.data["failed_attempts"] or 0
-        locked = response.data["is_locked"]
+        stored_hash = account["pin"]
+        attempts = account["failed_attempts"] or 0
+        locked = account["is_locked"]
+
+        # Offline mode verifies against the last PIN hash seen here
+        cache = get_pin_cache()
+        if cache is not None:
+            cache.remember(ac_no, stored_hash, locked or attempts >= 3)
 
         if locked:
             self.log_event(db, ac_no, "pin_failed", "Account locked", request)
@@ -185,7 +169,7 @@ class AuthService:
 
         if self.verify_pin(pin, stored_hash):
             try:
-                db.table("accounts").update({"failed_attempts": 0}).eq("account_no", ac_no).execute()
+                db.accounts.update(ac_no, {"failed_attempts": 0})
             except:
                 pass
 
@@ -195,18 +179,20 @@ class AuthService:
         attempts += 1
         if attempts >= 3:
             try:
-                db.table("accounts").update({
+                db.accounts.update(ac_no, {
                     "failed_attempts": attempts,
                     "is_locked": True
-                }).eq("account_no", ac_no).execute()
+                })
             except:
                 pass
 
+            if cache is not None:
+                cache.remember(ac_no, stored_hash, True)
             self.log_event(db, ac_no, "account_locked", "3 wrong attempts", request)
             return False, "Account locked after 3 wrong PIN attempts."
 
         try:
-            db.table("accounts").update({"failed_attempts": attempts}).eq("account_no", ac_no).execute()
+            db.accounts.update(ac_no, {"failed_attempts": attempts})
         except:
             pass
 
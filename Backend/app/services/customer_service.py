@@ -1,13 +1,13 @@
 from fastapi import Request
-from supabase import Client
 from app.services.auth_service import AuthService
+from app.services.repository import Repository
 
 
 class CustomerService:
     def __init__(self):
         self.auth = AuthService()   # stateless service
 
-    def enquiry(self, db: Client, ac_no: str, pin: str, request: Request):
+    def enquiry(self, db: Repository, ac_no: str, pin: str, request: Request):
         # PIN verification through AuthService
         ok, msg = self.auth.check(db, ac_no=ac_no, pin=pin, request=request)
         if not ok:
@@ -15,14 +15,7 @@ class CustomerService:
             return False, msg
 
         try:
-            response = (
-                db.table("accounts")
-                .select("balance")
-                .eq("account_no", ac_no)
-                .single()
-                .execute()
-            )
-            balance = response.data["balance"]
+            balance = db.accounts.balance(ac_no)
 
             self.auth.log_event(
                 db,
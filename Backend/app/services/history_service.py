@@ -1,42 +1,95 @@
 # app/services/history_service.py
 
+import threading
 from typing import Any, Tuple, Optional
-from supabase import Client
+from app.config import settings
+from app.services.repository import Repository, get_repository
+from app.core.metrics import traced
+from app.core.write_buffer import WriteBuffer
+from app.core.single_flight import SingleFlight
+from app.core.history_feed import publish_local
+
+
+# Concurrent reads of the same account (polling tabs, double clicks) share
+# one backend call. Keyed per repository so public/service reads never mix.
+_list_flight = SingleFlight("history.list", enabled=settings.SINGLE_FLIGHT)
+_version_flight = SingleFlight("history.latest_id", enabled=settings.SINGLE_FLIGHT)
+
+_history_buffer: Optional[WriteBuffer] = None
+_history_buffer_lock = threading.Lock()
+
+
+def _write_history_batch(rows):
+    get_repository().history.add_many(rows)
+    # Batched inserts return no ids; subscribers get the rows without one
+    publish_local(rows)
+
+
+def _get_history_buffer() -> Optional[WriteBuffer]:
+    """Opt-in batching of history inserts (HISTORY_BUFFER_SIZE > 0)."""
+    global _history_buffer
+    if settings.HISTORY_BUFFER_SIZE <= 0:
+        return None
+    if _history_buffer is None:
+        with _history_buffer_lock:
+            if _history_buffer is None:
+                _history_buffer = WriteBuffer(
+                    "history",
+                    _write_history_batch,
+                    max_items=settings.HISTORY_BUFFER_SIZE,
+                    interval=settings.HISTORY_FLUSH_INTERVAL,
+                )
+    return _history_buffer
 
 
 class HistoryService:
 
     # ------------------- Add History Entry -------------------
+    @traced("history.add_entry")
     def add_entry(
         self,
-        db: Client,
+        db: Repository,
         ac_no: str,
         action: str,
         amount: int = 0,
         context: Optional[dict] = None
     ):
+        row = {
+            "account_no": ac_no,
+            "action": action,
+            "amount": amount,
+            "context": context,
+        }
+
+        buffer = _get_history_buffer()
+        if buffer is not None:
+            buffer.add(row)
+        else:
+            try:
+                saved = db.history.add(row)
+                publish_local([saved or row])
+            except Exception as e:
+                print(f"[HISTORY ERROR] {e}")
+
+        # Reads starting from here must not join one that predates this row
+        _list_flight.forget((id(db), ac_no))
+        _version_flight.forget((id(db), ac_no))
+
+    # ------------------- Version (ETag source) -------------------
+    @traced("history.latest_id")
+    def get_version(self, db: Repository, ac_no: str) -> Tuple[bool, Any]:
+        """Newest history id for the account (0 when empty)."""
         try:
-            db.table("history").insert({
-                "account_no": ac_no,
-                "action": action,
-                "amount": amount,
-                "context": context,
-            }).execute()
+            latest = _version_flight.do((id(db), ac_no), lambda: db.history.latest_id(ac_no))
+            return True, latest or 0
         except Exception as e:
-            print(f"[HISTORY ERROR] {e}")
+            return False, f"Database Error: {e}"
 
     # ------------------- Fetch History -------------------
-    def get_history(self, db: Client, ac_no: str) -> Tuple[bool, Any]:
+    @traced("history.get_history")
+    def get_history(self, db: Repository, ac_no: str) -> Tuple[bool, Any]:
         try:
-            response = (
-                db.table("history")
-                .select("id, account_no, action, amount, context, created_at")
-                .eq("account_no", ac_no)
-                .order("created_at", desc=True)
-                .execute()
-            )
-
-            data = response.data or []
+            data = _list_flight.do((id(db), ac_no), lambda: db.history.list(ac_no))
 
             return True, data
 
@@ -0,0 +1,402 @@
+# app/services/memory_repository.py
+
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+
+from app.utils.time_tools import parse_ts, truncate
+from app.services.account_search import AccountSearchIndex, SEARCH_COLUMNS
+from app.services.repository import (
+    Repository,
+    AccountRepository,
+    UserRepository,
+    HistoryRepository,
+    AuditRepository,
+    OutboxRepository,
+    DuplicateError,
+    InsufficientBalanceError,
+    NotFoundError,
+)
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+def _project(row: Dict[str, Any], columns: str) -> Dict[str, Any]:
+    if columns.strip() == "*":
+        return dict(row)
+    return {c.strip(): row.get(c.strip()) for c in columns.split(",")}
+
+
+class _Store:
+    """
+    Shared state for all in-memory repositories. One re-entrant lock guards
+    every mutation, which makes each repository call atomic the same way a
+    single Postgres statement / RPC is.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.accounts: Dict[str, Dict[str, Any]] = {}          # account_no -> row
+        self.users: Dict[Any, Dict[str, Any]] = {}             # id -> row
+        self.users_by_name: Dict[str, Dict[str, Any]] = {}     # user_name -> row
+        self.history: Dict[str, List[Dict[str, Any]]] = defaultdict(list)  # account_no -> rows, oldest first
+        self.audit: List[Dict[str, Any]] = []
+        self.outbox: List[Dict[str, Any]] = []                 # id order
+        self.transfer_log: Dict[tuple, Dict[str, Any]] = {}    # (txid, direction) -> leg
+        self.applied: Dict[str, Dict[str, Any]] = {}           # idempotency key -> applied request
+        self.search = AccountSearchIndex()                     # teller lookup over accounts
+        self.ids = {
+            "users": itertools.count(1),
+            "accounts": itertools.count(1),
+            "history": itertools.count(1),
+            "audit": itertools.count(1),
+            "outbox": itertools.count(1),
+        }
+
+    def emit(self, account: Dict[str, Any], kind: str, amount: int, counterparty: Optional[str] = None):
+        """Append a money event; callers hold the lock, like the RPC's transaction."""
+        self.outbox.append({
+            "id": next(self.ids["outbox"]),
+            "account_no": account["account_no"],
+            "kind": kind,
+            "amount": amount,
+            "balance": account["balance"],
+            "counterparty": counterparty,
+            "created_at": _now(),
+            "delivered_at": None,
+        })
+
+
+class InMemoryAccounts(AccountRepository):
+    def __init__(self, store: _Store):
+        self.store = store
+
+    def _get_row(self, ac_no: str) -> Dict[str, Any]:
+        row = self.store.accounts.get(ac_no)
+        if row is None:
+            raise NotFoundError(f"Account {ac_no} not found")
+        return row
+
+    def get(self, ac_no: str, columns: str) -> Optional[Dict[str, Any]]:
+        with self.store.lock:
+            row = self.store.accounts.get(ac_no)
+            return _project(row, columns) if row else None
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        with self.store.lock:
+            if row["account_no"] in self.store.accounts:
+                raise DuplicateError('duplicate key value violates unique constraint "accounts_account_no_key"')
+            new = {
+                "balance": 0,
+                "failed_attempts": 0,
+                "is_locked": False,
+                **row,
+                "id": next(self.store.ids["accounts"]),
+                "created_at": _now(),
+            }
+            self.store.accounts[new["account_no"]] = new
+            self.store.search.upsert(new)
+            return dict(new)
+
+    def open(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        with self.store.lock:
+            ac_no = row["account_no"]
+            # Both checks before either write, so a conflict leaves nothing behind
+            if ac_no in self.store.users_by_name:
+                raise DuplicateError('duplicate key value violates unique constraint "users_user_name_key"')
+            if ac_no in self.store.accounts:
+                raise DuplicateError('duplicate key value violates unique constraint "accounts_account_no_key"')
+            user = InMemoryUsers(self.store).insert({
+                "user_name": ac_no,
+                "password": row["pin"],
+                "role": "customer",
+            })
+            self.insert({**row, "failed_attempts": 0, "is_locked": False, "user_id": user["id"]})
+            return {"account_no": ac_no, "user_id": user["id"]}
+
+    def update(self, ac_no: str, changes: Dict[str, Any]) -> int:
+        with self.store.lock:
+            row = self.store.accounts.get(ac_no)
+            if row is None:
+                return 0
+            row.update(changes)
+            if not changes.keys().isdisjoint(SEARCH_COLUMNS):
+                self.store.search.upsert(row)
+            return 1
+
+    def update_if(self, ac_no: str, expected: Dict[str, Any], changes: Dict[str, Any]) -> int:
+        with self.store.lock:
+            row = self.store.accounts.get(ac_no)
+            if row is None or any(row.get(c) != v for c, v in expected.items()):
+                return 0
+            return self.update(ac_no, changes)
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        with self.store.lock:
+            hits = self.store.search.search(query, limit, offset)
+            return [
+                {**_project(self.store.accounts[ac_no], ", ".join(SEARCH_COLUMNS)), "score": score}
+                for ac_no, _, score in hits
+            ]
+
+    def scan_balances(self, after: str, limit: int) -> List[Dict[str, Any]]:
+        with self.store.lock:
+            numbers = heapq.nsmallest(limit, (n for n in self.store.accounts if n > after))
+            return [{"account_no": n, "balance": self.store.accounts[n]["balance"]} for n in numbers]
+
+    def deposit(self, ac_no: str, amount: int) -> int:
+        with self.store.lock:
+            row = self._get_row(ac_no)
+            row["balance"] += amount
+            self.store.emit(row, "deposit", amount)
+            return row["balance"]
+
+    def withdraw(self, ac_no: str, amount: int) -> int:
+        with self.store.lock:
+            row = self._get_row(ac_no)
+            if row["balance"] < amount:
+                raise InsufficientBalanceError("Insufficient balance")
+            row["balance"] -= amount
+            self.store.emit(row, "withdraw", amount)
+            return row["balance"]
+
+    def transfer(self, from_ac: str, to_ac: str, amount: int) -> int:
+        with self.store.lock:
+            sender = self.store.accounts.get(from_ac)
+            receiver = self.store.accounts.get(to_ac)
+            if sender is None:
+                raise NotFoundError("Sender account not found")
+            if receiver is None:
+                raise NotFoundError("Receiver account not found")
+            if sender["balance"] < amount:
+                raise InsufficientBalanceError("Insufficient balance")
+            sender["balance"] -= amount
+            receiver["balance"] += amount
+            self.store.emit(sender, "transfer_out", amount, counterparty=to_ac)
+            self.store.emit(receiver, "transfer_in", amount, counterparty=from_ac)
+            return sender["balance"]
+
+    def apply_once(self, key: str, kind: str, ac_no: str, amount: int) -> Dict[str, Any]:
+        with self.store.lock:
+            prev = self.store.applied.get(key)
+            if prev is not None:
+                if (prev["account_no"], prev["kind"], prev["amount"]) != (ac_no, kind, amount):
+                    raise ValueError(f"Idempotency key {key} was used for a different operation")
+                return {"balance": prev["balance"], "duplicate": True}
+            if kind not in ("deposit", "withdraw"):
+                raise ValueError(f"Unknown operation {kind}")
+            balance = getattr(self, kind)(ac_no, amount)
+            self.store.applied[key] = {"account_no": ac_no, "kind": kind, "amount": amount, "balance": balance}
+            return {"balance": balance, "duplicate": False}
+
+    def prepare_leg(self, txid: str, direction: str, ac_no: str, amount: int, counterparty: str) -> Optional[int]:
+        with self.store.lock:
+            if (txid, direction) in self.store.transfer_log:
+                row = self.store.accounts.get(ac_no)
+                return row["balance"] if row else None
+            row = self._get_row(ac_no)
+            balance = None
+            if direction == "out":
+                if row["balance"] < amount:
+                    raise InsufficientBalanceError("Insufficient balance")
+                row["balance"] -= amount
+                balance = row["balance"]
+            self.store.transfer_log[(txid, direction)] = {
+                "txid": txid,
+                "direction": direction,
+                "account_no": ac_no,
+                "counterparty": counterparty,
+                "amount": amount,
+                "state": "prepared",
+                "created_at": _now(),
+                "resolved_at": None,
+                "_prepared": time.time(),
+            }
+            return balance
+
+    def resolve_leg(self, txid: str, direction: str, commit: bool) -> Optional[str]:
+        with self.store.lock:
+            leg = self.store.transfer_log.get((txid, direction))
+            if leg is None:
+                return None
+            if leg["state"] != "prepared":
+                return leg["state"]
+            row = self._get_row(leg["account_no"])
+            if commit:
+                if direction == "in":
+                    row["balance"] += leg["amount"]
+                self.store.emit(row, f"transfer_{direction}", leg["amount"], counterparty=leg["counterparty"])
+            elif direction == "out":
+                row["balance"] += leg["amount"]
+            leg["state"] = "committed" if commit else "aborted"
+            leg["resolved_at"] = _now()
+            return leg["state"]
+
+    def leg_state(self, txid: str, direction: str) -> Optional[str]:
+        with self.store.lock:
+            leg = self.store.transfer_log.get((txid, direction))
+            return leg["state"] if leg else None
+
+    def stale_legs(self, older_than: float) -> List[Dict[str, Any]]:
+        cutoff = time.time() - older_than
+        with self.store.lock:
+            legs = [
+                leg for leg in self.store.transfer_log.values()
+                if leg["state"] == "prepared" and leg["_prepared"] <= cutoff
+            ]
+            legs.sort(key=lambda leg: leg["_prepared"])
+            return [{k: v for k, v in leg.items() if not k.startswith("_")} for leg in legs]
+
+
+class InMemoryUsers(UserRepository):
+    def __init__(self, store: _Store):
+        self.store = store
+
+    def get_by_name(self, user_name: str) -> Optional[Dict[str, Any]]:
+        with self.store.lock:
+            row = self.store.users_by_name.get(user_name)
+            return _project(row, "id, user_name, role, password") if row else None
+
+    def get_role(self, uid: str) -> Optional[str]:
+        with self.store.lock:
+            # uid mirrors id here; tokens carry it as a string
+            row = self.store.users.get(int(uid)) if str(uid).isdigit() else None
+            return row["role"] if row else None
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        with self.store.lock:
+            if row["user_name"] in self.store.users_by_name:
+                raise DuplicateError('duplicate key value violates unique constraint "users_user_name_key"')
+            user_id = next(self.store.ids["users"])
+            new = {**row, "id": user_id, "uid": user_id, "created_at": _now()}
+            self.store.users[user_id] = new
+            self.store.users_by_name[new["user_name"]] = new
+            return dict(new)
+
+    def delete(self, user_id: Any) -> None:
+        with self.store.lock:
+            row = self.store.users.pop(user_id, None)
+            if row:
+                self.store.users_by_name.pop(row["user_name"], None)
+
+
+class InMemoryHistory(HistoryRepository):
+    def __init__(self, store: _Store):
+        self.store = store
+
+    def add(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        with self.store.lock:
+            new = {
+                "context": None,
+                **row,
+                "id": next(self.store.ids["history"]),
+                "created_at": _now(),
+            }
+            self.store.history[new["account_no"]].append(new)
+            return dict(new)
+
+    def list(self, ac_no: str) -> List[Dict[str, Any]]:
+        with self.store.lock:
+            rows = self.store.history.get(ac_no, [])
+            return [dict(r) for r in reversed(rows)]
+
+    def latest_id(self, ac_no: str) -> Optional[Any]:
+        with self.store.lock:
+            rows = self.store.history.get(ac_no)
+            return rows[-1]["id"] if rows else None
+
+    def scan(self, after_id: Any, limit: int) -> List[Dict[str, Any]]:
+        with self.store.lock:
+            newer = (r for rows in self.store.history.values() for r in rows if r["id"] > after_id)
+            return [
+                {c: r[c] for c in ("id", "account_no", "action", "amount", "context")}
+                for r in heapq.nsmallest(limit, newer, key=lambda r: r["id"])
+            ]
+
+
+class InMemoryAudit(AuditRepository):
+    def __init__(self, store: _Store):
+        self.store = store
+
+    def add(self, row: Dict[str, Any]) -> None:
+        with self.store.lock:
+            self.store.audit.append({
+                **row,
+                "id": next(self.store.ids["audit"]),
+                "created_at": _now(),
+            })
+
+    def _matching(self, filters: Dict[str, Any]):
+        since, until = filters.get("since"), filters.get("until")
+        for row in self.store.audit:
+            if any(filters.get(c) is not None and row.get(c) != filters[c] for c in ("actor", "action", "ip")):
+                continue
+            ts = parse_ts(row["created_at"])
+            if (since is not None and ts < since) or (until is not None and ts >= until):
+                continue
+            yield ts, row
+
+    def query(self, filters: Dict[str, Any], limit: int, after=None) -> List[Dict[str, Any]]:
+        with self.store.lock:
+            rows = [
+                (ts, row) for ts, row in self._matching(filters)
+                if after is None or (ts, row["id"]) < (parse_ts(after[0]), int(after[1]))
+            ]
+        rows.sort(key=lambda r: (r[0], r[1]["id"]), reverse=True)
+        return [dict(row) for _, row in rows[:limit]]
+
+    def action_counts(self, bucket: str, since, until, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        counts: Dict[Any, int] = defaultdict(int)
+        with self.store.lock:
+            for ts, row in self._matching({**filters, "since": since, "until": until}):
+                counts[(truncate(ts, bucket), row["action"])] += 1
+        return [
+            {"bucket": b.isoformat(), "action": action, "events": n}
+            for (b, action), n in sorted(counts.items())
+        ]
+
+
+class InMemoryOutbox(OutboxRepository):
+    def __init__(self, store: _Store):
+        self.store = store
+
+    def pending(self, limit: int) -> List[Dict[str, Any]]:
+        with self.store.lock:
+            rows = [r for r in self.store.outbox if r["delivered_at"] is None]
+            return [dict(r) for r in rows[:limit]]
+
+    def mark_delivered(self, ids: List[Any]) -> None:
+        wanted = set(ids)
+        with self.store.lock:
+            now = _now()
+            for r in self.store.outbox:
+                if r["id"] in wanted and r["delivered_at"] is None:
+                    r["delivered_at"] = now
+
+
+class InMemoryRepository(Repository):
+    """
+    Process-local backend with the same invariants as the Postgres schema:
+    unique account numbers and user names, atomic transfers and
+    insufficient-balance errors. Used for tests, benchmarks and DATA_BACKEND=memory.
+    """
+
+    def __init__(self):
+        self.store = _Store()
+        self.accounts = InMemoryAccounts(self.store)
+        self.users = InMemoryUsers(self.store)
+        self.history = InMemoryHistory(self.store)
+        self.audit = InMemoryAudit(self.store)
+        self.outbox = InMemoryOutbox(self.store)
+
+    def debug_claims(self) -> Any:
+        return {"backend": "memory"}
+
+    def replication_lag(self) -> Optional[float]:
+        return 0.0
@@ -0,0 +1,88 @@
+# app/services/offline_service.py
+
+from typing import Tuple
+from fastapi import Request
+
+from app.config import settings
+from app.core import offline
+from app.core.resilience import current_budget
+from app.services.auth_service import AuthService
+
+
+# Returned when an Idempotency-Key is replayed for a different operation; routes answer 409
+KEY_REUSED = "Idempotency-Key was already used for a different operation."
+
+# Nothing decided (PIN hash not cached, journal unwritable): still 503 + Retry-After
+RETRY_LATER = "Server error. Try again."
+
+
+def backend_unreachable() -> bool:
+    """True once a backend call of this request failed for lack of a backend."""
+    budget = current_budget()
+    return budget is not None and budget.unavailable is not None
+
+
+class OfflineService:
+    """
+    Degraded mode for ATM deposits / small withdrawals (see app/core/offline.py).
+    Only used after the online PIN check could not reach the backend, so no
+    money operation for the request has been sent yet.
+    """
+
+    def __init__(self):
+        self.auth = AuthService()
+
+    def accept(self, kind: str, ac_no: str, amount: int, pin: str, request: Request) -> Tuple[bool, str]:
+        ok, msg = self._accept(kind, ac_no, amount, pin, request)
+        if msg != RETRY_LATER:
+            # A final answer (accepted, wrong PIN, locked, over the limit):
+            # retrying it would only burn PIN attempts, so no 503
+            budget = current_budget()
+            if budget is not None:
+                budget.unavailable = None
+        return ok, msg
+
+    def _accept(self, kind: str, ac_no: str, amount: int, pin: str, request: Request) -> Tuple[bool, str]:
+        cache = offline.get_pin_cache()
+        cached = cache.get(ac_no) if cache is not None else None
+        if cached is None:
+            return False, RETRY_LATER
+        if amount <= 0:
+            return False, "Amount must be greater than zero."
+
+        journal = offline.get_journal()
+        try:
+            if cached["locked"] or journal.pin_failures(ac_no, cached["seen"]) >= journal.pin_attempts:
+                return False, "Account locked. Contact bank."
+
+            if not self.auth.verify_pin(str(pin).strip(), cached["pin"]):
+                attempts = journal.pin_failed(ac_no, cached["seen"])
+                if attempts >= journal.pin_attempts:
+                    return False, "Account locked after 3 wrong PIN attempts."
+                return False, f"Wrong PIN. {journal.pin_attempts - attempts} tries left."
+
+            # Decided under the journal lock, which every worker shares: the
+            # limit covers what all of them paid out and have not replayed yet.
+            # A client retry of an accepted operation gets the same answer.
+            client_key = request.headers.get("idempotency-key") or None
+            with journal.locked():
+                entry = journal.find(kind, ac_no, amount, client_key)
+                created = entry is None
+                if created:
+                    if journal.pin_failures(ac_no, cached["seen"]) >= journal.pin_attempts:
+                        return False, "Account locked. Contact bank."
+                    if kind == "withdraw":
+                        queued = journal.pending_amount("withdraw", ac_no)
+                        if queued + amount > settings.OFFLINE_WITHDRAW_LIMIT:
+                            return False, "Withdrawals are limited while the bank is unreachable."
+                    entry, _ = journal.append(kind, ac_no, amount, client_key)
+        except offline.KeyReused:
+            return False, KEY_REUSED
+        except Exception as e:
+            print(f"[OFFLINE ERROR] journal: {e}")
+            return False, RETRY_LATER
+
+        if created:
+            offline.OFFLINE_ACCEPTED.inc(kind=kind)
+        verb = "Deposit" if kind == "deposit" else "Withdrawal"
+        return True, f"{verb} accepted offline (ref {entry['client_key'] or entry['key']}); it will be posted when the bank is reachable."
@@ -0,0 +1,384 @@
+# app/services/postgres_repository.py
+
+from typing import Any, Dict, List, Optional
+
+from app.core import resilience
+from app.services.repository import (
+    Repository,
+    AccountRepository,
+    UserRepository,
+    HistoryRepository,
+    AuditRepository,
+    OutboxRepository,
+    DuplicateError,
+    InsufficientBalanceError,
+    NotFoundError,
+    RepositoryError,
+)
+
+# psycopg (v3) is optional: only DATA_BACKEND=postgres needs it.
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg.types.json import Jsonb
+    from psycopg_pool import ConnectionPool, PoolTimeout
+except ImportError:  # pragma: no cover - exercised only without the extra
+    psycopg = None
+
+
+# Columns callers may request / write. Every SQL string is built from these,
+# so the set of statements is fixed and each one gets prepared once.
+ACCOUNT_COLUMNS = {
+    "id", "account_no", "name", "pin", "mobileno", "gmail", "balance",
+    "failed_attempts", "is_locked", "user_id", "created_at",
+}
+USER_COLUMNS = {"id", "uid", "user_name", "password", "role"}
+
+SQL = {
+    "user_by_name": "SELECT id, user_name, role, password FROM users WHERE user_name = %s LIMIT 1",
+    "user_role": "SELECT role FROM users WHERE uid = %s LIMIT 1",
+    "user_insert": (
+        "INSERT INTO users (user_name, password, role) VALUES (%s, %s, %s) "
+        "RETURNING id, user_name, role"
+    ),
+    "user_delete": "DELETE FROM users WHERE id = %s",
+    "history_insert": (
+        "INSERT INTO history (account_no, action, amount, context) VALUES (%s, %s, %s, %s) "
+        "RETURNING id, account_no, action, amount, context, created_at"
+    ),
+    "history_list": (
+        "SELECT id, account_no, action, amount, context, created_at FROM history "
+        "WHERE account_no = %s ORDER BY created_at DESC"
+    ),
+    "history_latest_id": (
+        "SELECT id FROM history WHERE account_no = %s ORDER BY id DESC LIMIT 1"
+    ),
+    "history_scan": (
+        "SELECT id, account_no, action, amount, context FROM history "
+        "WHERE id > %s ORDER BY id LIMIT %s"
+    ),
+    "audit_insert": (
+        "INSERT INTO app_audit_logs (actor, action, details, ip, user_agent) "
+        "VALUES (%s, %s, %s, %s, %s)"
+    ),
+    "audit_events": (
+        "SELECT id, actor, action, details, ip, user_agent, created_at "
+        "FROM audit_events(%s, %s, %s, %s, %s, %s, %s, %s)"
+    ),
+    "audit_action_counts": (
+        "SELECT bucket, action, events FROM audit_action_counts(%s, %s, %s, %s, %s)"
+    ),
+    "outbox_pending": (
+        "SELECT id, account_no, kind, amount, balance, counterparty, created_at FROM money_outbox "
+        "WHERE delivered_at IS NULL ORDER BY id LIMIT %s"
+    ),
+    "outbox_mark_delivered": (
+        "UPDATE money_outbox SET delivered_at = now() WHERE id = ANY(%s) AND delivered_at IS NULL"
+    ),
+    "account_balances": (
+        "SELECT account_no, balance FROM accounts WHERE account_no > %s ORDER BY account_no LIMIT %s"
+    ),
+    "search_accounts": (
+        "SELECT account_no, name, mobileno, gmail, score FROM search_accounts(%s, %s, %s)"
+    ),
+    "account_open": "SELECT create_account(%s, %s, %s, %s, %s) AS created",
+    "deposit": "SELECT deposit_money(%s, %s) AS balance",
+    "withdraw": "SELECT withdraw_money(%s, %s) AS balance",
+    "transfer": "SELECT transfer_money(%s, %s, %s) AS balance",
+    "apply_once": "SELECT apply_once(%s, %s, %s, %s) AS applied",
+    "replica_lag": "SELECT replica_lag_seconds() AS lag",
+    "transfer_prepare": "SELECT transfer_prepare(%s, %s, %s, %s, %s) AS balance",
+    "transfer_resolve": "SELECT transfer_resolve(%s, %s, %s) AS state",
+    "transfer_leg_state": "SELECT state FROM transfer_log WHERE txid = %s AND direction = %s",
+    "transfer_stale_legs": (
+        "SELECT txid, direction, account_no, counterparty, amount, state, created_at "
+        "FROM transfer_stale_legs(%s)"
+    ),
+}
+
+
+def _columns(columns: str, allowed: set) -> List[str]:
+    cols = [c.strip() for c in columns.split(",")]
+    unknown = [c for c in cols if c not in allowed]
+    if unknown:
+        raise RepositoryError(f"Unknown column(s): {', '.join(unknown)}")
+    return cols
+
+
+def _translate(e: Exception) -> RepositoryError:
+    if isinstance(e, RepositoryError):
+        return e
+    msg = str(e).strip()
+    low = msg.lower()
+    if isinstance(e, psycopg.errors.UniqueViolation) or "duplicate" in low:
+        return DuplicateError(msg)
+    if "insufficient" in low:
+        return InsufficientBalanceError(msg)
+    if "not found" in low:
+        return NotFoundError(msg)
+    return RepositoryError(msg)
+
+
+def _transient(e: Exception) -> bool:
+    # Lost / refused connections, statement_timeout (QueryCanceled) and an
+    # exhausted pool; constraint and RPC errors are answers, not outages
+    return isinstance(e, (psycopg.OperationalError, PoolTimeout))
+
+
+def _not_applied(e: Exception) -> bool:
+    # No connection was handed out, or statement_timeout cancelled the
+    # statement (autocommit: it rolled back); a lost connection is ambiguous
+    return isinstance(e, (PoolTimeout, psycopg.errors.QueryCanceled))
+
+
+class _PgBase:
+    def __init__(self, pool: "ConnectionPool", name: str = "postgres"):
+        self.pool = pool
+        self.breaker = resilience.get_breaker(name)
+
+    def _fetch(self, sql: str, params: tuple, idempotent: bool = False, money: bool = False) -> List[Dict[str, Any]]:
+        """
+        Run one statement; only `idempotent` (read-only) statements are
+        retried, and only unanswered `money` statements are OutcomeUnknownError.
+        """
+        def execute(timeout: float):
+            # The deadline bounds the wait for a connection; statement_timeout
+            # (set per connection from DB_TIMEOUT_SECONDS) bounds the query
+            with self.pool.connection(timeout=timeout) as conn:
+                cur = conn.execute(sql, params, prepare=True)
+                return cur.fetchall() if cur.description else []
+
+        try:
+            return resilience.call(
+                self.breaker, execute, _transient, idempotent=idempotent, not_applied=_not_applied, money=money,
+            )
+        except Exception as e:
+            raise _translate(e) from e
+
+    def _fetch_one(self, sql: str, params: tuple, idempotent: bool = False, money: bool = False) -> Optional[Dict[str, Any]]:
+        rows = self._fetch(sql, params, idempotent, money)
+        return rows[0] if rows else None
+
+
+class PostgresAccounts(_PgBase, AccountRepository):
+    def get(self, ac_no: str, columns: str) -> Optional[Dict[str, Any]]:
+        cols = _columns(columns, ACCOUNT_COLUMNS)
+        sql = f"SELECT {', '.join(cols)} FROM accounts WHERE account_no = %s LIMIT 1"
+        return self._fetch_one(sql, (ac_no,), idempotent=True)
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        cols = _columns(",".join(row), ACCOUNT_COLUMNS)
+        sql = (
+            f"INSERT INTO accounts ({', '.join(cols)}) "
+            f"VALUES ({', '.join(['%s'] * len(cols))}) RETURNING id, account_no"
+        )
+        return self._fetch_one(sql, tuple(row[c] for c in cols)) or {}
+
+    def open(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        created = self._fetch_one(SQL["account_open"], (
+            row["account_no"], row["name"], row["pin"], row["mobileno"], row["gmail"],
+        ), money=True)
+        return created["created"] if created else {}
+
+    def update(self, ac_no: str, changes: Dict[str, Any]) -> int:
+        cols = _columns(",".join(changes), ACCOUNT_COLUMNS)
+        sql = (
+            f"UPDATE accounts SET {', '.join(f'{c} = %s' for c in cols)} "
+            f"WHERE account_no = %s RETURNING account_no"
+        )
+        return len(self._fetch(sql, (*[changes[c] for c in cols], ac_no)))
+
+    def update_if(self, ac_no: str, expected: Dict[str, Any], changes: Dict[str, Any]) -> int:
+        cols = _columns(",".join(changes), ACCOUNT_COLUMNS)
+        where = _columns(",".join(expected), ACCOUNT_COLUMNS)
+        sql = (
+            f"UPDATE accounts SET {', '.join(f'{c} = %s' for c in cols)} "
+            f"WHERE account_no = %s{''.join(f' AND {c} = %s' for c in where)} RETURNING account_no"
+        )
+        params = (*[changes[c] for c in cols], ac_no, *[expected[c] for c in where])
+        return len(self._fetch(sql, params))
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        return self._fetch(SQL["search_accounts"], (query, limit, offset), idempotent=True)
+
+    def scan_balances(self, after: str, limit: int) -> List[Dict[str, Any]]:
+        return self._fetch(SQL["account_balances"], (after, limit), idempotent=True)
+
+    def _money(self, sql: str, params: tuple) -> Optional[int]:
+        row = self._fetch_one(sql, params, money=True)
+        return row["balance"] if row else None
+
+    def deposit(self, ac_no: str, amount: int) -> Optional[int]:
+        return self._money(SQL["deposit"], (ac_no, amount))
+
+    def withdraw(self, ac_no: str, amount: int) -> Optional[int]:
+        return self._money(SQL["withdraw"], (ac_no, amount))
+
+    def transfer(self, from_ac: str, to_ac: str, amount: int) -> Optional[int]:
+        return self._money(SQL["transfer"], (from_ac, to_ac, amount))
+
+    def apply_once(self, key: str, kind: str, ac_no: str, amount: int) -> Dict[str, Any]:
+        # Keyed, so a retry after a lost reply reports a duplicate instead of posting twice
+        row = self._fetch_one(SQL["apply_once"], (key, kind, ac_no, amount), idempotent=True, money=True)
+        return row["applied"] if row else {}
+
+    def prepare_leg(self, txid: str, direction: str, ac_no: str, amount: int, counterparty: str) -> Optional[int]:
+        return self._money(SQL["transfer_prepare"], (txid, direction, ac_no, amount, counterparty))
+
+    def resolve_leg(self, txid: str, direction: str, commit: bool) -> Optional[str]:
+        # Idempotent on (txid, direction), so a retry after a lost reply is safe
+        row = self._fetch_one(SQL["transfer_resolve"], (txid, direction, commit), idempotent=True)
+        return row["state"] if row else None
+
+    def leg_state(self, txid: str, direction: str) -> Optional[str]:
+        row = self._fetch_one(SQL["transfer_leg_state"], (txid, direction), idempotent=True)
+        return row["state"] if row else None
+
+    def stale_legs(self, older_than: float) -> List[Dict[str, Any]]:
+        rows = self._fetch(SQL["transfer_stale_legs"], (older_than,), idempotent=True)
+        for r in rows:
+            r["created_at"] = r["created_at"].isoformat()
+        return rows
+
+
+class PostgresUsers(_PgBase, UserRepository):
+    def get_by_name(self, user_name: str) -> Optional[Dict[str, Any]]:
+        return self._fetch_one(SQL["user_by_name"], (user_name,), idempotent=True)
+
+    def get_role(self, uid: str) -> Optional[str]:
+        row = self._fetch_one(SQL["user_role"], (uid,), idempotent=True)
+        return row["role"] if row else None
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return self._fetch_one(SQL["user_insert"], (row["user_name"], row["password"], row["role"])) or {}
+
+    def delete(self, user_id: Any) -> None:
+        self._fetch(SQL["user_delete"], (user_id,))
+
+
+class PostgresHistory(_PgBase, HistoryRepository):
+    def add(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        context = row.get("context")
+        params = (row["account_no"], row["action"], row.get("amount", 0), Jsonb(context) if context is not None else None)
+        return self._fetch_one(SQL["history_insert"], params) or {}
+
+    def list(self, ac_no: str) -> List[Dict[str, Any]]:
+        rows = self._fetch(SQL["history_list"], (ac_no,), idempotent=True)
+        for r in rows:
+            r["created_at"] = r["created_at"].isoformat()
+        return rows
+
+    def latest_id(self, ac_no: str) -> Optional[Any]:
+        row = self._fetch_one(SQL["history_latest_id"], (ac_no,), idempotent=True)
+        return row["id"] if row else None
+
+    def scan(self, after_id: Any, limit: int) -> List[Dict[str, Any]]:
+        return self._fetch(SQL["history_scan"], (after_id, limit), idempotent=True)
+
+
+class PostgresAudit(_PgBase, AuditRepository):
+    def add(self, row: Dict[str, Any]) -> None:
+        self._fetch(SQL["audit_insert"], (
+            row.get("actor"), row.get("action"), row.get("details"), row.get("ip"), row.get("user_agent"),
+        ))
+
+    def add_many(self, rows: List[Dict[str, Any]]) -> None:
+        def execute(timeout: float):
+            with self.pool.connection(timeout=timeout) as conn:
+                with conn.cursor() as cur:
+                    cur.executemany(SQL["audit_insert"], [
+                        (r.get("actor"), r.get("action"), r.get("details"), r.get("ip"), r.get("user_agent"))
+                        for r in rows
+                    ])
+
+        try:
+            resilience.call(self.breaker, execute, _transient)
+        except Exception as e:
+            raise _translate(e) from e
+
+    def query(self, filters: Dict[str, Any], limit: int, after=None) -> List[Dict[str, Any]]:
+        after_ts, after_id = after or (None, None)
+        return self._fetch(SQL["audit_events"], (
+            filters.get("actor"), filters.get("action"), filters.get("ip"),
+            filters.get("since"), filters.get("until"), after_ts, after_id, limit,
+        ), idempotent=True)
+
+    def action_counts(self, bucket: str, since, until, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self._fetch(SQL["audit_action_counts"], (
+            bucket, since, until, filters.get("actor"), filters.get("action"),
+        ), idempotent=True)
+
+
+class PostgresOutbox(_PgBase, OutboxRepository):
+    def pending(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._fetch(SQL["outbox_pending"], (limit,), idempotent=True)
+        for r in rows:
+            r["created_at"] = r["created_at"].isoformat()
+        return rows
+
+    def mark_delivered(self, ids: List[Any]) -> None:
+        self._fetch(SQL["outbox_mark_delivered"], (list(ids),))
+
+
+class PostgresRepository(Repository):
+    """
+    Talks to Postgres directly over a pooled connection, skipping the
+    PostgREST HTTP hop. Statements are fixed strings prepared server-side.
+    """
+
+    def __init__(self, pool: "ConnectionPool", name: str = "postgres"):
+        # `name` keys the circuit breaker, one per database (see sharding)
+        self.pool = pool
+        self.accounts = PostgresAccounts(pool, name)
+        self.users = PostgresUsers(pool, name)
+        self.history = PostgresHistory(pool, name)
+        self.audit = PostgresAudit(pool, name)
+        self.outbox = PostgresOutbox(pool, name)
+
+    def debug_claims(self) -> Any:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT current_user AS role").fetchone()
+
+    def replication_lag(self) -> Optional[float]:
+        row = self.accounts._fetch_one(SQL["replica_lag"], (), idempotent=True)
+        return float(row["lag"]) if row and row["lag"] is not None else None
+
+
+# -------------------- POOL --------------------
+def _configure(conn):
+    conn.prepare_threshold = 0  # prepare on first use
+    conn.prepared_max = _settings().PG_STATEMENT_CACHE_SIZE
+
+
+def _settings():
+    from app.config import settings
+    return settings
+
+
+def create_pool(dsn: Optional[str] = None) -> "ConnectionPool":
+    """Pool for `dsn` (a shard's database), DATABASE_URL by default."""
+    if psycopg is None:
+        raise RuntimeError("DATA_BACKEND=postgres requires `psycopg[binary]` and `psycopg-pool`")
+
+    settings = _settings()
+    dsn = dsn or settings.DATABASE_URL
+    if not dsn:
+        raise RuntimeError("DATABASE_URL missing from .env")
+
+    pool = ConnectionPool(
+        dsn,
+        min_size=settings.PG_POOL_MIN_SIZE,
+        max_size=settings.PG_POOL_MAX_SIZE,
+        timeout=settings.PG_POOL_TIMEOUT,
+        max_idle=settings.PG_POOL_MAX_IDLE,
+        kwargs={
+            "row_factory": dict_row,
+            "autocommit": True,
+            "options": f"-c statement_timeout={int(settings.DB_TIMEOUT_SECONDS * 1000)}",
+        },
+        configure=_configure,
+        check=ConnectionPool.check_connection if settings.PG_HEALTHCHECK else None,
+        open=False,
+    )
+    pool.open(wait=True, timeout=settings.PG_POOL_TIMEOUT)
+    return pool
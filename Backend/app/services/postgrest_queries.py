@@ -0,0 +1,223 @@
+# app/services/postgrest_queries.py
+#
+# Catalog of the fixed PostgREST requests the services make. Each query's
+# path, constant query string and headers are built once per client; a call
+# only appends the bound filter values and sends the request on the shared
+# httpx session, skipping the query-builder chain and APIResponse model that
+# postgrest-py creates per call.
+
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+from postgrest.exceptions import APIError
+
+from app.core import resilience
+from app.utils.json_tools import dumps, loads
+
+
+class Query:
+    """
+    One fixed request shape. `filters` are the columns bound at call time,
+    `col` for eq or `col:op` for another operator (`in` takes a list).
+    `idempotent` requests (GETs and read-only RPCs) may be retried;
+    `money` marks the RPCs that move money, whose unanswered calls are
+    reported as OutcomeUnknownError; `timeout` overrides DB_TIMEOUT_SECONDS
+    for slow queries.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        select: Optional[str] = None,
+        filters: Tuple[str, ...] = (),
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+        prefer: Optional[str] = None,
+        idempotent: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        money: bool = False,
+    ):
+        self.method = method
+        self.path = path
+        self.filters = filters
+        self.prefer = prefer
+        self.idempotent = method == "GET" if idempotent is None else idempotent
+        self.timeout = timeout
+        self.money = money
+
+        params = []
+        if select:
+            params.append(("select", ",".join(c.strip() for c in select.split(","))))
+        if order:
+            params.append(("order", order))
+        if limit is not None:
+            params.append(("limit", str(limit)))
+        self.query_string = "&".join(f"{k}={quote(v, safe=',.')}" for k, v in params)
+
+
+# Names are what SupabaseRepository asks for; SELECT column lists for
+# accounts are added on first use (see PostgrestCatalog.account_select).
+QUERIES: Dict[str, Query] = {
+    "account_insert": Query("POST", "accounts", prefer="return=representation"),
+    "account_update": Query("PATCH", "accounts", filters=("account_no",), prefer="return=representation"),
+    "rpc_create_account": Query("POST", "rpc/create_account", money=True),
+    "rpc_deposit": Query("POST", "rpc/deposit_money", money=True),
+    "rpc_withdraw": Query("POST", "rpc/withdraw_money", money=True),
+    "rpc_transfer": Query("POST", "rpc/transfer_money", money=True),
+    "account_balances": Query(
+        "GET", "accounts", select="account_no, balance", filters=("account_no:gt",), order="account_no.asc",
+    ),
+    "rpc_search_accounts": Query("POST", "rpc/search_accounts", idempotent=True),
+    "rpc_apply_once": Query("POST", "rpc/apply_once", idempotent=True, money=True),
+    "rpc_replica_lag": Query("POST", "rpc/replica_lag_seconds", idempotent=True),
+    "rpc_transfer_prepare": Query("POST", "rpc/transfer_prepare", money=True),
+    "rpc_transfer_resolve": Query("POST", "rpc/transfer_resolve", idempotent=True),
+    "rpc_transfer_stale_legs": Query("POST", "rpc/transfer_stale_legs", idempotent=True),
+    "transfer_leg_state": Query("GET", "transfer_log", select="state", filters=("txid", "direction"), limit=1),
+    "user_by_name": Query("GET", "users", select="id, user_name, role, password", filters=("user_name",), limit=1),
+    "user_role": Query("GET", "users", select="uid, role", filters=("uid",), limit=1),
+    "user_insert": Query("POST", "users", prefer="return=representation"),
+    "user_delete": Query("DELETE", "users", filters=("id",), prefer="return=minimal"),
+    "history_insert": Query("POST", "history", prefer="return=representation"),
+    "history_insert_many": Query("POST", "history", prefer="return=minimal"),
+    "history_list": Query(
+        "GET", "history",
+        select="id, account_no, action, amount, context, created_at",
+        filters=("account_no",), order="created_at.desc",
+    ),
+    "history_latest_id": Query(
+        "GET", "history", select="id", filters=("account_no",), order="id.desc", limit=1,
+    ),
+    "history_scan": Query(
+        "GET", "history", select="id, account_no, action, amount, context", filters=("id:gt",), order="id.asc",
+    ),
+    "audit_insert": Query("POST", "app_audit_logs", prefer="return=minimal"),
+    "rpc_audit_events": Query("POST", "rpc/audit_events", idempotent=True),
+    "rpc_audit_action_counts": Query("POST", "rpc/audit_action_counts", idempotent=True, timeout=15.0),
+    "outbox_pending": Query(
+        "GET", "money_outbox",
+        select="id, account_no, kind, amount, balance, counterparty, created_at",
+        filters=("delivered_at:is",), order="id.asc",
+    ),
+    "outbox_mark_delivered": Query(
+        "PATCH", "money_outbox", filters=("id:in", "delivered_at:is"), prefer="return=minimal",
+    ),
+}
+
+
+def _bind(value: Any) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return "(" + ",".join(quote(str(v), safe="") for v in value) + ")"
+    return quote(str(value), safe="")
+
+
+class _Prepared:
+    __slots__ = ("method", "url", "filters", "headers", "idempotent", "timeout", "money")
+
+    def __init__(self, query: Query, base_url: str, headers: Dict[str, str]):
+        self.method = query.method
+        self.idempotent = query.idempotent
+        self.timeout = query.timeout
+        self.money = query.money
+        url = f"{base_url}/{query.path}"
+        if query.query_string:
+            url += "?" + query.query_string
+        self.url = url
+        # Leading separator for the bound filters
+        self.filters = []
+        for i, spec in enumerate(query.filters):
+            col, _, op = spec.partition(":")
+            self.filters.append(("&" if query.query_string or i else "?") + f"{col}={op or 'eq'}.")
+        self.headers = dict(headers)
+        if query.prefer:
+            self.headers["prefer"] = query.prefer
+        if query.method in ("POST", "PATCH"):
+            self.headers["content-type"] = "application/json"
+
+
+class _ServerError(APIError):
+    """5xx from PostgREST or the gateway in front of it: the backend is in trouble."""
+
+
+def _transient(e: Exception) -> bool:
+    return isinstance(e, (httpx.TransportError, _ServerError))
+
+
+# PostgREST's own "no database connection" errors (PGRST000-003)
+_NO_CONNECTION = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+
+
+def _not_applied(e: Exception) -> bool:
+    # The request never left this process, or PostgREST never got a database
+    # connection for it; read timeouts and gateway errors are ambiguous
+    if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    return isinstance(e, _ServerError) and e.code in _NO_CONNECTION
+
+
+class PostgrestCatalog:
+    """
+    QUERIES prepared against one SyncPostgrestClient (URL, auth headers,
+    session). Every request goes through the shared `supabase` circuit breaker
+    and the request deadline (app/core/resilience.py).
+    """
+
+    def __init__(self, client, breaker: Optional[resilience.CircuitBreaker] = None):
+        self.breaker = breaker or resilience.get_breaker("supabase")
+        self.session = client.session
+        self._base_url = str(client.base_url).rstrip("/")
+        self._headers = dict(client.headers)
+        self._prepared = {name: _Prepared(q, self._base_url, self._headers) for name, q in QUERIES.items()}
+
+    def account_select(self, columns: str) -> str:
+        """Name of the prepared `accounts` lookup for this column list."""
+        name = f"account_select:{columns}"
+        if name not in self._prepared:
+            query = Query("GET", "accounts", select=columns, filters=("account_no",), limit=1)
+            self._prepared[name] = _Prepared(query, self._base_url, self._headers)
+        return name
+
+    def account_update_where(self, columns: str) -> str:
+        """Name of the prepared `accounts` PATCH filtered on account_no plus `columns` (eq)."""
+        name = f"account_update_where:{columns}"
+        if name not in self._prepared:
+            filters = ("account_no", *(c.strip() for c in columns.split(",")))
+            query = Query("PATCH", "accounts", filters=filters, prefer="return=representation")
+            self._prepared[name] = _Prepared(query, self._base_url, self._headers)
+        return name
+
+    def run(self, name: str, *values: Any, body: Any = None, limit: Optional[int] = None) -> Any:
+        """Bind filter values (in Query.filters order), an optional JSON body and row limit."""
+        prepared = self._prepared[name]
+        url = prepared.url
+        for prefix, value in zip(prepared.filters, values):
+            url += prefix + _bind(value)
+        if limit is not None:
+            url += ("&" if "?" in url else "?") + f"limit={int(limit)}"
+        content = dumps(body) if body is not None else None
+
+        def send(timeout: float):
+            res = self.session.request(
+                prepared.method,
+                url,
+                headers=prepared.headers,
+                content=content,
+                timeout=timeout,
+            )
+            if res.status_code >= 400:
+                try:
+                    error = loads(res.content)
+                except ValueError:
+                    error = None
+                if not isinstance(error, dict):
+                    error = {"message": res.text or f"HTTP {res.status_code}", "code": str(res.status_code)}
+                raise (_ServerError if res.status_code >= 500 else APIError)(error)
+            return loads(res.content) if res.content else None
+
+        return resilience.call(
+            self.breaker, send, _transient,
+            idempotent=prepared.idempotent, timeout=prepared.timeout, not_applied=_not_applied,
+            money=prepared.money,
+        )
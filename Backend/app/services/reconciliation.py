@@ -0,0 +1,332 @@
+# app/services/reconciliation.py
+#
+# Ledger reconciliation. Every account's balance must equal the net of its
+# history (deposit / transfer_in credit, withdraw / transfer_out debit), and
+# every transfer_out needs its transfer_in. History rows are written after
+# the money RPC and a failed write is only logged (HistoryService.add_entry),
+# so this is where that drift shows up.
+#
+# History is read in id-ordered keyset pages (HistoryRepository.scan) and
+# folded into per-account totals one page at a time: vectorized with numpy
+# when it is installed (one np.add.at scatter per page), a dict loop
+# otherwise. Memory holds one page, one integer per account and the transfer
+# halves still waiting for their partner, which stays small because both
+# halves are written back to back.
+#
+# Balances keep moving while the scan runs, so a difference is only a
+# suspect: after RECONCILE_SETTLE_SECONDS the account (or transfer pair) is
+# read again on its own and reported if it still disagrees.
+#
+# Run nightly from cron, against the primary (replicas lag; shards are read
+# side by side):
+#   python -m app.services.reconciliation
+# Prints the report as JSON, records a "ledger_reconciliation" audit event
+# and exits with status 1 when anything was found.
+
+import json
+import sys
+import time
+from itertools import repeat
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.services.replicas import ReplicatedRepository
+from app.services.repository import Repository
+from app.services.sharding import ShardedRepository
+
+# numpy is optional: without it the group-by runs in pure Python.
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without the extra
+    np = None
+
+
+CREDITS = ("deposit", "transfer_in")
+DEBITS = ("withdraw", "transfer_out")
+_SIGN = {**dict.fromkeys(CREDITS, 1), **dict.fromkeys(DEBITS, -1)}
+_NO_CONTEXT: Dict[str, Any] = {}
+_ACCOUNT, _ACTION, _AMOUNT, _BALANCE = map(itemgetter, ("account_no", "action", "amount", "balance"))
+
+
+def net_movement(rows: List[Dict[str, Any]]) -> int:
+    """Balance implied by history rows (opening balance is 0)."""
+    net = 0
+    for r in rows:
+        if r["action"] in CREDITS:
+            net += r["amount"]
+        elif r["action"] in DEBITS:
+            net -= r["amount"]
+    return net
+
+
+# -------------------- PER-ACCOUNT TOTALS --------------------
+class _PythonLedger:
+    engine = "python"
+
+    def __init__(self):
+        self.net: Dict[str, int] = {}
+
+    def add(self, rows: List[Dict[str, Any]]):
+        net = self.net
+        for r in rows:
+            action = r["action"]
+            if action in CREDITS:
+                net[r["account_no"]] = net.get(r["account_no"], 0) + r["amount"]
+            elif action in DEBITS:
+                net[r["account_no"]] = net.get(r["account_no"], 0) - r["amount"]
+
+    def compare(self, accounts: List[Dict[str, Any]]) -> List[Tuple[str, Optional[int], int]]:
+        """(account_no, balance, ledger) for every account on the page that disagrees."""
+        out = []
+        for a in accounts:
+            expected = self.net.pop(a["account_no"], 0)
+            if a["balance"] != expected:
+                out.append((a["account_no"], a["balance"], expected))
+        return out
+
+    def leftover(self) -> List[Tuple[str, Optional[int], int]]:
+        """History with a net movement but no account row."""
+        return [(ac_no, None, net) for ac_no, net in self.net.items() if net]
+
+
+class _NumpyLedger:
+    engine = "numpy"
+
+    def __init__(self):
+        self.slots: Dict[str, int] = {}        # account_no -> index into net / seen
+        self.net = np.zeros(1024, dtype=np.int64)
+        self.seen = np.zeros(1024, dtype=bool)
+
+    def _slots_for(self, numbers: List[str]) -> "np.ndarray":
+        slots = self.slots
+        for n in set(numbers).difference(slots):
+            slots[n] = len(slots)
+        if len(slots) > len(self.net):
+            grow = max(len(slots), 2 * len(self.net)) - len(self.net)
+            self.net = np.concatenate([self.net, np.zeros(grow, dtype=np.int64)])
+            self.seen = np.concatenate([self.seen, np.zeros(grow, dtype=bool)])
+        return np.fromiter(map(slots.__getitem__, numbers), dtype=np.int64, count=len(numbers))
+
+    def add(self, rows: List[Dict[str, Any]]):
+        # One C-level pass per column; the arithmetic and the group-by
+        # (a scatter-add into the per-account totals) run in numpy
+        n = len(rows)
+        slots = self._slots_for(list(map(_ACCOUNT, rows)))
+        amounts = np.fromiter(map(_AMOUNT, rows), dtype=np.int64, count=n)
+        signs = np.fromiter(map(_SIGN.get, map(_ACTION, rows), repeat(0)), dtype=np.int64, count=n)
+        np.add.at(self.net, slots, amounts * signs)
+
+    def compare(self, accounts: List[Dict[str, Any]]) -> List[Tuple[str, Optional[int], int]]:
+        numbers = list(map(_ACCOUNT, accounts))
+        balances = np.fromiter(map(_BALANCE, accounts), dtype=np.int64, count=len(accounts))
+        slots = np.fromiter(map(self.slots.get, numbers, repeat(-1)), dtype=np.int64, count=len(numbers))
+        known = slots >= 0
+        expected = np.zeros(len(numbers), dtype=np.int64)
+        expected[known] = self.net[slots[known]]
+        self.seen[slots[known]] = True
+        return [(numbers[i], int(balances[i]), int(expected[i])) for i in np.flatnonzero(balances != expected)]
+
+    def leftover(self) -> List[Tuple[str, Optional[int], int]]:
+        n = len(self.slots)
+        missing = np.flatnonzero(~self.seen[:n] & (self.net[:n] != 0))
+        if not len(missing):
+            return []
+        numbers = list(self.slots)                # insertion order == slot order
+        return [(numbers[i], None, int(self.net[i])) for i in missing]
+
+
+# -------------------- TRANSFER PAIRS --------------------
+class _TransferPairs:
+    """Transfer halves seen so far whose partner has not been seen yet."""
+
+    def __init__(self):
+        self.open: Dict[Tuple[str, str, int], int] = {}   # (from, to, amount) -> outs - ins
+        self.unlabelled = 0                                 # rows without a counterparty
+
+    def add(self, rows: List[Dict[str, Any]]):
+        pending = self.open
+        for r in rows:
+            action = r["action"]
+            if action == "transfer_out":
+                key, step = (r["account_no"], (r["context"] or _NO_CONTEXT).get("to"), r["amount"]), 1
+            elif action == "transfer_in":
+                key, step = ((r["context"] or _NO_CONTEXT).get("from"), r["account_no"], r["amount"]), -1
+            else:
+                continue
+            if None in key:
+                self.unlabelled += 1
+                continue
+            n = pending.get(key, 0) + step
+            if n:
+                pending[key] = n
+            else:
+                del pending[key]
+
+
+# -------------------- RECONCILER --------------------
+def _pages(fetch: Callable[[Any, int], List[Dict[str, Any]]], cursor: str, start: Any, size: int) -> Iterator[List[Dict[str, Any]]]:
+    # Stop on an empty page only: PostgREST may return fewer rows than asked for
+    after = start
+    while True:
+        page = fetch(after, size)
+        if not page:
+            return
+        yield page
+        after = page[-1][cursor]
+
+
+class Reconciler:
+    def __init__(
+        self,
+        repo: Repository,
+        chunk_size: int = 50000,
+        settle: float = 2.0,
+        vectorized: Optional[bool] = None,
+    ):
+        if isinstance(repo, ReplicatedRepository):
+            repo = repo.primary
+        self.repo = repo
+        self.parts: Dict[str, Repository] = dict(repo.shards) if isinstance(repo, ShardedRepository) else {"primary": repo}
+        self.chunk_size = chunk_size
+        self.settle = settle
+        self.vectorized = np is not None if vectorized is None else vectorized
+        if self.vectorized and np is None:
+            raise RuntimeError("numpy is not installed")
+
+    def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        ledger = _NumpyLedger() if self.vectorized else _PythonLedger()
+        pairs = _TransferPairs()
+
+        # Shards page by page in turn, so both halves of a cross-shard
+        # transfer are seen at about the same time
+        history_rows = 0
+        streams = {
+            name: _pages(part.history.scan, "id", 0, self.chunk_size)
+            for name, part in self.parts.items()
+        }
+        while streams:
+            for name in list(streams):
+                page = next(streams[name], None)
+                if page is None:
+                    del streams[name]
+                    continue
+                ledger.add(page)
+                pairs.add(page)
+                history_rows += len(page)
+
+        accounts = 0
+        suspects = []
+        for part in self.parts.values():
+            for page in _pages(part.accounts.scan_balances, "account_no", "", self.chunk_size):
+                accounts += len(page)
+                suspects += ledger.compare(page)
+        suspects += ledger.leftover()
+        del ledger
+
+        if (suspects or pairs.open) and self.settle > 0:
+            time.sleep(self.settle)
+        mismatches, unsettled = [], []
+        for ac_no, _, _ in suspects:
+            found = self._recheck_account(ac_no)
+            if found is None:
+                unsettled.append(ac_no)
+            elif found:
+                mismatches.append(found)
+        orphans = [o for o in (self._recheck_pair(*key) for key in pairs.open) if o]
+
+        return {
+            "engine": "numpy" if self.vectorized else "python",
+            "history_rows": history_rows,
+            "accounts": accounts,
+            "seconds": round(time.perf_counter() - started, 3),
+            "mismatches": mismatches,
+            "orphan_transfers": orphans,
+            "unsettled": unsettled,
+            "transfers_without_counterparty": pairs.unlabelled,
+        }
+
+    def _recheck_account(self, ac_no: str, attempts: int = 3) -> Optional[Dict[str, Any]]:
+        """
+        The mismatch on its own, read between two equal balances; {} when it
+        is gone, None when the account kept moving on every attempt.
+        """
+        accounts, history = self.repo.accounts, self.repo.history
+        for _ in range(attempts):
+            balance = accounts.balance(ac_no)
+            ledger = net_movement(history.list(ac_no))
+            if accounts.balance(ac_no) != balance:
+                continue
+            if balance == ledger or (balance is None and ledger == 0):
+                return {}
+            return {
+                "account_no": ac_no,
+                "balance": balance,
+                "ledger": ledger,
+                "difference": (balance or 0) - ledger,
+            }
+        return None
+
+    def _recheck_pair(self, from_ac: str, to_ac: str, amount: int) -> Optional[Dict[str, Any]]:
+        history = self.repo.history
+        outs = [
+            r for r in history.list(from_ac)
+            if r["action"] == "transfer_out" and r["amount"] == amount and (r.get("context") or {}).get("to") == to_ac
+        ]
+        ins = [
+            r for r in history.list(to_ac)
+            if r["action"] == "transfer_in" and r["amount"] == amount and (r.get("context") or {}).get("from") == from_ac
+        ]
+        if len(outs) == len(ins):
+            return None
+        return {
+            "from": from_ac,
+            "to": to_ac,
+            "amount": amount,
+            "missing": "transfer_in" if len(outs) > len(ins) else "transfer_out",
+            "count": abs(len(outs) - len(ins)),
+            "ids": sorted(r["id"] for r in (outs if len(outs) > len(ins) else ins)),
+        }
+
+
+def record(db: Repository, report: Dict[str, Any], sample: int = 20):
+    """One audit event with the counts and the first `sample` findings of each kind."""
+    details = (
+        f"{report['history_rows']} history rows, {report['accounts']} accounts: "
+        f"{len(report['mismatches'])} mismatches, {len(report['orphan_transfers'])} orphan transfers, "
+        f"{len(report['unsettled'])} unsettled; "
+        + json.dumps({
+            "mismatches": report["mismatches"][:sample],
+            "orphan_transfers": report["orphan_transfers"][:sample],
+        })
+    )
+    db.audit.add({
+        "actor": "system",
+        "action": "ledger_reconciliation",
+        "details": details,
+        "ip": "localhost",
+        "user_agent": "ledger-reconciliation",
+    })
+
+
+def main():
+    from app.config import settings, validate_settings
+    from app.services.repository import get_repository
+
+    validate_settings()
+    db = get_repository(privileged=True)
+    report = Reconciler(
+        db,
+        chunk_size=settings.RECONCILE_CHUNK_SIZE,
+        settle=settings.RECONCILE_SETTLE_SECONDS,
+    ).run()
+    try:
+        record(db, report)
+    except Exception as e:
+        print(f"[RECONCILE ERROR] audit: {e}", file=sys.stderr)
+    print(json.dumps(report, indent=2, default=str))
+    raise SystemExit(1 if report["mismatches"] or report["orphan_transfers"] else 0)
+
+
+if __name__ == "__main__":
+    main()
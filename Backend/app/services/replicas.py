@@ -0,0 +1,344 @@
+# app/services/replicas.py
+#
+# Read-replica routing. ReplicatedRepository wraps the primary repository
+# and sends the reads that tolerate a slightly older snapshot to a replica:
+#
+#   accounts.balance, accounts.search     (balance screen, teller lookup)
+#   history.list, history.latest_id       (statements, ETag versions)
+#   users.get_role                        (every authenticated request)
+#   audit.query, audit.action_counts      (reports)
+#
+# Everything else (writes, PIN checks, compare-and-swap updates, logins,
+# the outbox) stays on the primary.
+#
+# Routing policy (ReplicaPolicy):
+#   - ReplicaMonitor probes every replica's lag each REPLICA_LAG_CHECK_INTERVAL
+#     (sql/008_replica_lag.sql). A replica that is unreachable or trails by
+#     more than REPLICA_MAX_LAG_SECONDS gets no reads until a probe says
+#     otherwise.
+#   - Read-your-writes: every mutation stamps its account (or user id). A
+#     replica may serve that key only once the write is older than the
+#     replica's measured lag plus one probe interval, and never within
+#     READ_YOUR_WRITES_SECONDS; until then reads of it go to the primary.
+#     So a balance read right after a deposit sees the deposit, and a slow
+#     replica extends the window by itself.
+#   - A replica read that fails, or finds no row, is repeated on the primary.
+#
+# Write stamps are per process; a client whose next request lands on another
+# worker is covered by READ_YOUR_WRITES_SECONDS only if that worker wrote
+# too. Size the window above typical lag if workers are many.
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.metrics import Counter, Gauge, register
+from app.services.repository import (
+    Repository,
+    AccountRepository,
+    UserRepository,
+    HistoryRepository,
+    AuditRepository,
+)
+
+
+REPLICA_READS = register(Counter(
+    "replica_reads_total", "Routable reads by target (primary or a replica name) and reason."
+))
+
+
+class ReplicaPolicy:
+    """Chooses a replica (or the primary) per read; shared by every wrapper in the process."""
+
+    def __init__(
+        self,
+        names: List[str],
+        window: float = 2.0,
+        max_lag: float = 5.0,
+        check_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.names = list(names)
+        self.window = window
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.clock = clock
+        self.lag: Dict[str, Optional[float]] = {n: None for n in self.names}   # None = unknown / down
+        self._writes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    # ---------- Feedback ----------
+    def wrote(self, key: Optional[str]):
+        if key is None:
+            return
+        now = self.clock()
+        with self._lock:
+            self._writes[key] = now
+            if len(self._writes) > 10_000:
+                horizon = now - max(self.window, self.max_lag + self.check_interval)
+                self._writes = {k: t for k, t in self._writes.items() if t > horizon}
+
+    def observed(self, name: str, lag: Optional[float]):
+        self.lag[name] = lag
+
+    def failed(self, name: str):
+        self.lag[name] = None
+
+    # ---------- Routing ----------
+    def choose(self, key: Optional[str]) -> Optional[str]:
+        """A replica that is fresh enough for `key`, or None for the primary."""
+        healthy = [n for n in self.names if self.lag[n] is not None and self.lag[n] <= self.max_lag]
+        if not healthy:
+            REPLICA_READS.inc(target="primary", reason="no_replica")
+            return None
+
+        written = self._writes.get(key) if key is not None else None
+        if written is not None:
+            age = self.clock() - written
+            healthy = [n for n in healthy if age > max(self.window, self.lag[n] + self.check_interval)]
+            if not healthy:
+                REPLICA_READS.inc(target="primary", reason="recent_write")
+                return None
+
+        name = random.choice(healthy)
+        REPLICA_READS.inc(target=name, reason="replica")
+        return name
+
+
+# -------------------- REPOSITORIES --------------------
+class _Routed:
+    def __init__(self, replicated: "ReplicatedRepository"):
+        self.r = replicated
+
+    def _read(self, part: str, key: Optional[str], fn: Callable[[Any], Any], retry_empty: bool = False):
+        """Run `fn(repository_part)` on a suitable replica, else (or on failure) on the primary."""
+        primary = getattr(self.r.primary, part)
+        name = self.r.policy.choose(key)
+        if name is None:
+            return fn(primary)
+        try:
+            result = fn(getattr(self.r.replicas[name], part))
+        except Exception as e:
+            print(f"[REPLICA ERROR] {name}: {e}")
+            self.r.policy.failed(name)
+            REPLICA_READS.inc(target="primary", reason="replica_error")
+            return fn(primary)
+        if retry_empty and result is None:
+            # The row may be newer than the replica (created on another worker)
+            REPLICA_READS.inc(target="primary", reason="replica_miss")
+            return fn(primary)
+        return result
+
+
+class _Writer(_Routed):
+    def _write(self, keys: Tuple[Optional[str], ...], fn: Callable[[], Any]):
+        """
+        Run a primary write, stamping `keys` before it (reads racing the call
+        stay on the primary) and again after it (the commit may land any time
+        before the call returns, so the window is measured from the end).
+        """
+        for key in keys:
+            self.r.policy.wrote(key)
+        try:
+            return fn()
+        finally:
+            for key in keys:
+                self.r.policy.wrote(key)
+
+
+class ReplicatedAccounts(_Writer, AccountRepository):
+    # Reads that must see the latest row (PIN checks, CAS) stay on the primary
+    def get(self, ac_no: str, columns: str) -> Optional[Dict[str, Any]]:
+        return self.r.primary.accounts.get(ac_no, columns)
+
+    def balance(self, ac_no: str) -> Optional[int]:
+        return self._read("accounts", ac_no, lambda a: a.balance(ac_no), retry_empty=True)
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        return self._read("accounts", None, lambda a: a.search(query, limit, offset))
+
+    def scan_balances(self, after: str, limit: int) -> List[Dict[str, Any]]:
+        return self.r.primary.accounts.scan_balances(after, limit)
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return self._write((row["account_no"],), lambda: self.r.primary.accounts.insert(row))
+
+    def open(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return self._write((row["account_no"],), lambda: self.r.primary.accounts.open(row))
+
+    def update(self, ac_no: str, changes: Dict[str, Any]) -> int:
+        return self._write((ac_no,), lambda: self.r.primary.accounts.update(ac_no, changes))
+
+    def update_if(self, ac_no: str, expected: Dict[str, Any], changes: Dict[str, Any]) -> int:
+        return self._write((ac_no,), lambda: self.r.primary.accounts.update_if(ac_no, expected, changes))
+
+    def deposit(self, ac_no: str, amount: int) -> Optional[int]:
+        return self._write((ac_no,), lambda: self.r.primary.accounts.deposit(ac_no, amount))
+
+    def withdraw(self, ac_no: str, amount: int) -> Optional[int]:
+        return self._write((ac_no,), lambda: self.r.primary.accounts.withdraw(ac_no, amount))
+
+    def transfer(self, from_ac: str, to_ac: str, amount: int) -> Optional[int]:
+        return self._write((from_ac, to_ac), lambda: self.r.primary.accounts.transfer(from_ac, to_ac, amount))
+
+    def apply_once(self, key: str, kind: str, ac_no: str, amount: int) -> Dict[str, Any]:
+        return self._write((ac_no,), lambda: self.r.primary.accounts.apply_once(key, kind, ac_no, amount))
+
+    def prepare_leg(self, txid: str, direction: str, ac_no: str, amount: int, counterparty: str) -> Optional[int]:
+        return self._write((ac_no,), lambda: self.r.primary.accounts.prepare_leg(txid, direction, ac_no, amount, counterparty))
+
+    def resolve_leg(self, txid: str, direction: str, commit: bool) -> Optional[str]:
+        return self.r.primary.accounts.resolve_leg(txid, direction, commit)
+
+    def leg_state(self, txid: str, direction: str) -> Optional[str]:
+        return self.r.primary.accounts.leg_state(txid, direction)
+
+    def stale_legs(self, older_than: float) -> List[Dict[str, Any]]:
+        return self.r.primary.accounts.stale_legs(older_than)
+
+
+class ReplicatedUsers(_Writer, UserRepository):
+    def get_by_name(self, user_name: str) -> Optional[Dict[str, Any]]:
+        return self.r.primary.users.get_by_name(user_name)
+
+    def get_role(self, uid: str) -> Optional[str]:
+        return self._read("users", f"user:{uid}", lambda u: u.get_role(uid), retry_empty=True)
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        user = self.r.primary.users.insert(row)
+        for column in ("id", "uid"):
+            if user and user.get(column) is not None:
+                self.r.policy.wrote(f"user:{user[column]}")
+        return user
+
+    def delete(self, user_id: Any) -> None:
+        self._write((f"user:{user_id}",), lambda: self.r.primary.users.delete(user_id))
+
+
+class ReplicatedHistory(_Writer, HistoryRepository):
+    def add(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return self._write((row["account_no"],), lambda: self.r.primary.history.add(row))
+
+    def add_many(self, rows: List[Dict[str, Any]]) -> None:
+        keys = tuple({row["account_no"] for row in rows})
+        self._write(keys, lambda: self.r.primary.history.add_many(rows))
+
+    def list(self, ac_no: str) -> List[Dict[str, Any]]:
+        return self._read("history", ac_no, lambda h: h.list(ac_no))
+
+    def latest_id(self, ac_no: str) -> Optional[Any]:
+        return self._read("history", ac_no, lambda h: h.latest_id(ac_no))
+
+    def scan(self, after_id: Any, limit: int) -> List[Dict[str, Any]]:
+        return self.r.primary.history.scan(after_id, limit)
+
+
+class ReplicatedAudit(_Routed, AuditRepository):
+    def add(self, row: Dict[str, Any]) -> None:
+        self.r.primary.audit.add(row)
+
+    def add_many(self, rows: List[Dict[str, Any]]) -> None:
+        self.r.primary.audit.add_many(rows)
+
+    def query(self, filters: Dict[str, Any], limit: int, after=None) -> List[Dict[str, Any]]:
+        return self._read("audit", None, lambda a: a.query(filters, limit, after))
+
+    def action_counts(self, bucket: str, since, until, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self._read("audit", None, lambda a: a.action_counts(bucket, since, until, filters))
+
+
+class ReplicatedRepository(Repository):
+    """The primary for writes plus named replicas for eligible reads."""
+
+    def __init__(self, primary: Repository, replicas: Dict[str, Repository], policy: ReplicaPolicy):
+        self.primary = primary
+        self.replicas = replicas
+        self.policy = policy
+        self.accounts = ReplicatedAccounts(self)
+        self.users = ReplicatedUsers(self)
+        self.history = ReplicatedHistory(self)
+        self.audit = ReplicatedAudit(self)
+        self.outbox = primary.outbox
+
+    def debug_claims(self) -> Any:
+        return self.primary.debug_claims()
+
+    def replication_lag(self) -> Optional[float]:
+        return self.primary.replication_lag()
+
+    def probe(self):
+        """Measure every replica's lag and feed it to the policy."""
+        for name, replica in self.replicas.items():
+            try:
+                self.policy.observed(name, replica.replication_lag())
+            except Exception as e:
+                print(f"[REPLICA ERROR] lag probe {name}: {e}")
+                self.policy.failed(name)
+
+
+# -------------------- LAG MONITOR --------------------
+class ReplicaMonitor:
+    """Background thread running ReplicatedRepository.probe every `interval` seconds."""
+
+    def __init__(self, repo_factory: Callable[[], ReplicatedRepository], interval: float = 1.0):
+        self.repo_factory = repo_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.repo_factory().probe()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+# -------------------- SETTINGS --------------------
+_policy: Optional[ReplicaPolicy] = None
+
+register(Gauge(
+    "replica_lag_seconds",
+    "Last measured lag per read replica (absent while unknown or unreachable).",
+    fn=lambda: {
+        (("replica", n),): lag for n, lag in list(_policy.lag.items()) if lag is not None
+    } if _policy is not None else None,
+))
+
+
+def wrap_with_replicas(primary: Repository, privileged: bool) -> ReplicatedRepository:
+    """Wrap the primary with READ_REPLICAS; both wrappers share one policy."""
+    global _policy
+    from app.config import settings
+    from app.services.repository import open_backend, parse_backends
+
+    specs = parse_backends(settings.READ_REPLICAS, "READ_REPLICAS")
+    if _policy is None:
+        _policy = ReplicaPolicy(
+            [s["name"] for s in specs],
+            window=settings.READ_YOUR_WRITES_SECONDS,
+            max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+            check_interval=settings.REPLICA_LAG_CHECK_INTERVAL,
+        )
+    replicas = {s["name"]: open_backend(s, privileged, f"replica:{s['name']}") for s in specs}
+    return ReplicatedRepository(primary, replicas, _policy)
+
+
+def monitor_from_settings() -> Optional[ReplicaMonitor]:
+    from app.config import settings
+    from app.services.repository import get_repository
+
+    if not settings.READ_REPLICAS or settings.SHARDS:
+        return None
+    monitor = ReplicaMonitor(lambda: get_repository(privileged=True), settings.REPLICA_LAG_CHECK_INTERVAL)
+    # One probe before serving, so replicas take reads from the first request
+    monitor.repo_factory().probe()
+    return monitor
@@ -0,0 +1,367 @@
+# app/services/repository.py
+
+import json
+import threading
+from functools import lru_cache
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# -------------------- ERRORS --------------------
+# Messages keep the wording of the Postgres RPC exceptions so callers that
+# match on text ("insufficient", "sender", "duplicate") behave the same.
+class RepositoryError(Exception):
+    pass
+
+
+class NotFoundError(RepositoryError):
+    pass
+
+
+class DuplicateError(RepositoryError):
+    pass
+
+
+class InsufficientBalanceError(RepositoryError):
+    pass
+
+
+class UnavailableError(RepositoryError):
+    """The backend did not answer: circuit open, deadline spent (app/core/resilience.py)."""
+
+
+class OutcomeUnknownError(RepositoryError):
+    """A write was sent but never confirmed (timeout, dropped connection): it may have been applied."""
+
+
+# -------------------- INTERFACES --------------------
+class AccountRepository:
+    def get(self, ac_no: str, columns: str) -> Optional[Dict[str, Any]]:
+        """Return the requested columns of one account, or None."""
+        raise NotImplementedError
+
+    def balance(self, ac_no: str) -> Optional[int]:
+        """Current balance, or None if the account does not exist."""
+        row = self.get(ac_no, "balance")
+        return row["balance"] if row else None
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def open(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Open an account: insert the customer login (users row named after the
+        account number, password = `row["pin"]`) and the account in one atomic
+        call. Neither row exists unless both do. Returns account_no and user_id.
+        """
+        raise NotImplementedError
+
+    def update(self, ac_no: str, changes: Dict[str, Any]) -> int:
+        """Apply `changes` and return the number of rows written."""
+        raise NotImplementedError
+
+    def update_if(self, ac_no: str, expected: Dict[str, Any], changes: Dict[str, Any]) -> int:
+        """
+        Compare-and-swap: apply `changes` only while every `expected` column
+        still holds its value, in one statement. Returns rows written (0 when
+        the account is missing or a value no longer matches).
+        """
+        raise NotImplementedError
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Ranked teller lookup: account_no, name, mobileno, gmail and score per
+        hit, best first (see app/services/account_search.py for the rules).
+        """
+        raise NotImplementedError
+
+    def scan_balances(self, after: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        account_no and balance of up to `limit` accounts numbered after
+        `after` ("" for the first page), in account_no order.
+        """
+        raise NotImplementedError
+
+    # Money operations return the balance they wrote (the sender's for a
+    # transfer). None means the backend did not report it.
+    def deposit(self, ac_no: str, amount: int) -> Optional[int]:
+        raise NotImplementedError
+
+    def withdraw(self, ac_no: str, amount: int) -> Optional[int]:
+        raise NotImplementedError
+
+    def transfer(self, from_ac: str, to_ac: str, amount: int) -> Optional[int]:
+        raise NotImplementedError
+
+    def apply_once(self, key: str, kind: str, ac_no: str, amount: int) -> Dict[str, Any]:
+        """
+        Deposit / withdraw at most once per idempotency `key`
+        (sql/009_offline_replay.sql). Returns balance and whether the key
+        had been applied before (duplicate; nothing was posted). A known key
+        with another account, kind or amount raises.
+        """
+        raise NotImplementedError
+
+    # Cross-shard transfer legs (sql/007_cross_shard_transfer.sql). Each is
+    # idempotent on (txid, direction); see app/services/sharding.py.
+    def prepare_leg(self, txid: str, direction: str, ac_no: str, amount: int, counterparty: str) -> Optional[int]:
+        """'out' debits and holds the amount (returns the new balance); 'in' checks the account."""
+        raise NotImplementedError
+
+    def resolve_leg(self, txid: str, direction: str, commit: bool) -> Optional[str]:
+        """Commit or abort a prepared leg; returns its final state, None if unknown."""
+        raise NotImplementedError
+
+    def leg_state(self, txid: str, direction: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def stale_legs(self, older_than: float) -> List[Dict[str, Any]]:
+        """Legs still prepared after `older_than` seconds, oldest first."""
+        raise NotImplementedError
+
+
+class UserRepository:
+    def get_by_name(self, user_name: str) -> Optional[Dict[str, Any]]:
+        """Return id, user_name, role and password hash, or None."""
+        raise NotImplementedError
+
+    def get_role(self, uid: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def delete(self, user_id: Any) -> None:
+        raise NotImplementedError
+
+
+class HistoryRepository:
+    def add(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def add_many(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def list(self, ac_no: str) -> List[Dict[str, Any]]:
+        """All entries for an account, newest first."""
+        raise NotImplementedError
+
+    def latest_id(self, ac_no: str) -> Optional[Any]:
+        """Id of the newest entry for an account (used as a version), or None."""
+        raise NotImplementedError
+
+    def scan(self, after_id: Any, limit: int) -> List[Dict[str, Any]]:
+        """
+        Up to `limit` entries of all accounts with id > `after_id` (0 for the
+        first page), oldest id first: id, account_no, action, amount, context.
+        """
+        raise NotImplementedError
+
+
+class OutboxRepository:
+    """
+    Committed money events (deposit / withdraw / transfer_out / transfer_in).
+    Rows are written by the money operations themselves, atomically with the
+    balance change; consumers only read and acknowledge.
+    """
+
+    def pending(self, limit: int) -> List[Dict[str, Any]]:
+        """Oldest undelivered events first (id order)."""
+        raise NotImplementedError
+
+    def mark_delivered(self, ids: List[Any]) -> None:
+        raise NotImplementedError
+
+
+class AuditRepository:
+    def add(self, row: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def add_many(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def query(
+        self,
+        filters: Dict[str, Any],
+        limit: int,
+        after: Optional[Tuple[Any, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Events matching `filters` (actor, action, ip exact; since / until as
+        datetimes, until exclusive), newest first by (created_at, id).
+        `after` is the (created_at, id) of the previous page's last row.
+        """
+        raise NotImplementedError
+
+    def action_counts(
+        self,
+        bucket: str,
+        since: datetime,
+        until: datetime,
+        filters: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """{bucket, action, events} per `bucket` (minute..month), oldest first."""
+        raise NotImplementedError
+
+
+class Repository:
+    """
+    Data access for the service layer. Services receive one of these as `db`
+    and never talk to a specific client library directly.
+    """
+
+    accounts: AccountRepository
+    users: UserRepository
+    history: HistoryRepository
+    audit: AuditRepository
+    outbox: OutboxRepository
+
+    def debug_claims(self) -> Any:
+        raise NotImplementedError("debug_claims is only available on Supabase")
+
+    def replication_lag(self) -> Optional[float]:
+        """Seconds this database trails its primary, 0 on a primary (sql/008_replica_lag.sql)."""
+        raise NotImplementedError
+
+
+# -------------------- BACKEND SPECS --------------------
+# Extra databases (account shards, read replicas) are configured as JSON
+# lists of specs, one object per database:
+#   {"name": "a", "backend": "supabase", "url": ..., "key": ..., "service_key": ...}
+#   {"name": "b", "backend": "postgres", "dsn": "postgresql://..."}
+#   {"name": "c", "backend": "memory"}
+def parse_backends(spec: str, setting: str) -> List[Dict[str, Any]]:
+    backends = json.loads(spec)
+    if not isinstance(backends, list) or not backends:
+        raise ValueError(f"{setting} must be a non-empty JSON list")
+    names = [b.get("name") for b in backends]
+    if not all(names) or len(set(names)) != len(names):
+        raise ValueError(f"{setting}: every entry needs a unique name")
+    for b in backends:
+        if b.get("backend") not in {"supabase", "postgres", "memory"}:
+            raise ValueError(f"{setting} {b['name']}: backend must be supabase, postgres or memory")
+    return backends
+
+
+# (breaker name, access) -> repository; the privileged and public views of a
+# database share its memory store / connection pool
+_opened: Dict[Tuple[str, str], Repository] = {}
+_opened_lock = threading.Lock()
+
+
+def open_backend(spec: Dict[str, Any], privileged: bool, name: str) -> Repository:
+    """Repository for one spec; `name` keys its circuit breaker."""
+    if spec["backend"] == "memory":
+        access = "memory"
+    elif spec["backend"] == "postgres" and (privileged or not spec.get("url")):
+        access = "postgres"
+    else:
+        access = "service" if privileged else "public"
+
+    with _opened_lock:
+        repo = _opened.get((name, access))
+        if repo is not None:
+            return repo
+        if access == "memory":
+            from app.services.memory_repository import InMemoryRepository
+            repo = InMemoryRepository()
+        elif access == "postgres":
+            from app.services.postgres_repository import PostgresRepository, create_pool
+            repo = PostgresRepository(create_pool(spec["dsn"]), name)
+        else:
+            from app.core.supabase_client import get_client
+            from app.services.supabase_repository import SupabaseRepository
+            key = spec.get("service_key") if privileged else spec.get("key")
+            repo = SupabaseRepository(get_client(spec["url"], key), name)
+        _opened[(name, access)] = repo
+        return repo
+
+
+# -------------------- FACTORY --------------------
+_memory_repo: Optional[Repository] = None
+_sharded_repos: Dict[bool, Repository] = {}
+_replicated: Dict[bool, Repository] = {}
+_postgres_repo: Optional[Repository] = None
+_postgres_failed = False
+_postgres_lock = threading.Lock()
+
+
+def _get_postgres_repository() -> Optional[Repository]:
+    """Pooled Postgres repository, or None if the pool cannot be opened."""
+    global _postgres_repo, _postgres_failed
+    if _postgres_repo is None and not _postgres_failed:
+        with _postgres_lock:
+            if _postgres_repo is None and not _postgres_failed:
+                from app.services.postgres_repository import PostgresRepository, create_pool
+                try:
+                    _postgres_repo = PostgresRepository(create_pool())
+                except Exception as e:
+                    _postgres_failed = True
+                    print(f"[PG BACKEND] falling back to PostgREST: {e}")
+    return _postgres_repo
+
+
+@lru_cache(maxsize=8)
+def _supabase_repository(client) -> Repository:
+    # One wrapper per client: a stable identity lets callers key per-backend
+    # state (e.g. single-flight) on the repository object.
+    from app.services.supabase_repository import SupabaseRepository
+    return SupabaseRepository(client)
+
+
+def get_repository(privileged: bool = True) -> Repository:
+    """
+    Build the repository for the configured DATA_BACKEND.
+    `privileged` selects the service-role key on backends that have one.
+    DATA_BACKEND=postgres falls back to PostgREST if the pool is unavailable.
+    With SHARDS set, accounts are spread over the listed backends instead
+    (app/services/sharding.py) and DATA_BACKEND is not used. READ_REPLICAS
+    adds replicas of the DATA_BACKEND database for eligible reads.
+    """
+    from app.config import settings
+
+    if settings.SHARDS:
+        repo = _sharded_repos.get(privileged)
+        if repo is None:
+            from app.services.sharding import build_sharded_repository
+            with _postgres_lock:
+                repo = _sharded_repos.get(privileged)
+                if repo is None:
+                    repo = _sharded_repos[privileged] = build_sharded_repository(privileged)
+        return repo
+
+    return _with_replicas(_primary_repository(settings, privileged), privileged)
+
+
+def _primary_repository(settings, privileged: bool) -> Repository:
+    if settings.DATA_BACKEND == "memory":
+        global _memory_repo
+        if _memory_repo is None:
+            from app.services.memory_repository import InMemoryRepository
+            _memory_repo = InMemoryRepository()
+        return _memory_repo
+
+    if settings.DATA_BACKEND == "postgres" and privileged:
+        repo = _get_postgres_repository()
+        if repo is not None:
+            return repo
+
+    from app.core.supabase_client import get_public_client, get_service_client
+
+    client = get_service_client() if privileged else get_public_client()
+    return _supabase_repository(client)
+
+
+def _with_replicas(primary: Repository, privileged: bool) -> Repository:
+    """Route eligible reads to READ_REPLICAS (app/services/replicas.py)."""
+    from app.config import settings
+
+    if not settings.READ_REPLICAS:
+        return primary
+    repo = _replicated.get(privileged)
+    if repo is None or repo.primary is not primary:
+        from app.services.replicas import wrap_with_replicas
+        repo = _replicated[privileged] = wrap_with_replicas(primary, privileged)
+    return repo
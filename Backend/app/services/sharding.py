@@ -0,0 +1,426 @@
+# app/services/sharding.py
+#
+# Account-sharded deployment: several databases, each holding a slice of the
+# accounts together with their customer logins, history and money events.
+#
+# ShardRouter maps an account number to a shard:
+#   hash  -> jump consistent hash of the account number (adding a shard moves
+#            only ~1/n of the accounts)
+#   range -> each shard owns account numbers from its "from" bound up to the
+#            next shard's (account numbers are fixed width, so string order is
+#            numeric order)
+#
+# ShardedRepository implements the Repository interface on top of one
+# repository per shard, so services do not know about shards:
+#   accounts / history / outbox -> the account's shard
+#   users                       -> customer logins (named after their account)
+#                                  live with the account, staff on the home
+#                                  (first) shard; ids are "shard:id"
+#   audit                       -> the home shard
+#   search                      -> every shard, merged by score
+#
+# Money operations within one shard use its RPCs unchanged. A transfer across
+# shards runs in two phases over per-shard transfer legs
+# (sql/007_cross_shard_transfer.sql):
+#
+#   prepare out (sender debited) -> prepare in (receiver checked)
+#   -> commit out (the decision) -> commit in (receiver credited)
+#
+# The legs are the recovery log: they are written before any money moves
+# and live in the same databases as the balances. The sender's leg is the
+# single commit point, so after a crash TransferRecovery settles every leg
+# left prepared from the sender's leg alone: committed -> finish, otherwise
+# abort (refund). Any instance may run recovery; leg resolution is
+# idempotent and the first resolution wins.
+
+import hashlib
+import heapq
+import re
+import threading
+import uuid
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.metrics import Counter, register
+from app.services.repository import (
+    Repository,
+    AccountRepository,
+    UserRepository,
+    HistoryRepository,
+    AuditRepository,
+    OutboxRepository,
+    InsufficientBalanceError,
+    NotFoundError,
+    RepositoryError,
+    open_backend,
+    parse_backends,
+)
+
+
+SHARD_TRANSFERS = register(Counter(
+    "shard_transfers_total", "Cross-shard transfers by outcome (committed / aborted / pending)."
+))
+SHARD_RECOVERED = register(Counter(
+    "shard_transfer_legs_recovered_total", "Prepared transfer legs settled by recovery, by outcome."
+))
+
+# Customer logins are named after their account (see AccountRepository.open)
+_ACCOUNT_NAME = re.compile(r"^AC\d+$")
+
+
+# -------------------- ROUTING --------------------
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping & Veach, 2014)."""
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+class ShardRouter:
+    """Maps account numbers to shard names. `bounds` is required for `range`."""
+
+    def __init__(self, names: Sequence[str], strategy: str = "hash", bounds: Optional[Sequence[str]] = None):
+        if not names:
+            raise ValueError("At least one shard is required")
+        if len(set(names)) != len(names):
+            raise ValueError("Shard names must be unique")
+        if strategy not in {"hash", "range"}:
+            raise ValueError("SHARD_STRATEGY must be hash or range")
+        self.names = list(names)
+        self.strategy = strategy
+        if strategy == "range":
+            if bounds is None or len(bounds) != len(names):
+                raise ValueError("Range sharding needs a `from` bound per shard")
+            # The lowest shard takes everything below the second bound
+            self.ranges = sorted(zip(bounds, self.names))
+            self.bounds = [b for b, _ in self.ranges]
+
+    def shard_for(self, ac_no: str) -> str:
+        if self.strategy == "hash":
+            key = int.from_bytes(hashlib.blake2b(ac_no.encode(), digest_size=8).digest(), "big")
+            return self.names[jump_hash(key, len(self.names))]
+        i = max(0, bisect_right(self.bounds, ac_no) - 1)
+        return self.ranges[i][1]
+
+
+# -------------------- COMPOSITE IDS --------------------
+def _qualify(shard: str, row: Optional[Dict[str, Any]], *columns: str) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    row = dict(row)
+    for c in columns:
+        if row.get(c) is not None:
+            row[c] = f"{shard}:{row[c]}"
+    return row
+
+
+def _split(value: Any) -> Tuple[Optional[str], Any]:
+    """"shard:id" -> (shard, id); an unqualified id -> (None, id)."""
+    shard, sep, raw = str(value).partition(":")
+    if not sep:
+        return None, value
+    return shard, int(raw) if raw.isdigit() else raw
+
+
+# -------------------- REPOSITORIES --------------------
+class _ShardedBase:
+    def __init__(self, sharded: "ShardedRepository"):
+        self.sharded = sharded
+
+    def _shard(self, ac_no: str) -> Repository:
+        return self.sharded.for_account(ac_no)
+
+
+class ShardedAccounts(_ShardedBase, AccountRepository):
+    def get(self, ac_no: str, columns: str) -> Optional[Dict[str, Any]]:
+        return self._shard(ac_no).accounts.get(ac_no, columns)
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return self._shard(row["account_no"]).accounts.insert(row)
+
+    def open(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        shard = self.sharded.router.shard_for(row["account_no"])
+        return _qualify(shard, self.sharded.shards[shard].accounts.open(row), "user_id")
+
+    def update(self, ac_no: str, changes: Dict[str, Any]) -> int:
+        return self._shard(ac_no).accounts.update(ac_no, changes)
+
+    def update_if(self, ac_no: str, expected: Dict[str, Any], changes: Dict[str, Any]) -> int:
+        return self._shard(ac_no).accounts.update_if(ac_no, expected, changes)
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        # Each shard ranks its own hits; the global page is the top of the
+        # merged lists (ties broken by account number)
+        hits = []
+        for shard in self.sharded.shards.values():
+            hits.extend(shard.accounts.search(query, limit + offset, 0))
+        hits.sort(key=lambda h: (-h["score"], h["account_no"]))
+        return hits[offset:offset + limit]
+
+    def deposit(self, ac_no: str, amount: int) -> Optional[int]:
+        return self._shard(ac_no).accounts.deposit(ac_no, amount)
+
+    def withdraw(self, ac_no: str, amount: int) -> Optional[int]:
+        return self._shard(ac_no).accounts.withdraw(ac_no, amount)
+
+    def apply_once(self, key: str, kind: str, ac_no: str, amount: int) -> Dict[str, Any]:
+        return self._shard(ac_no).accounts.apply_once(key, kind, ac_no, amount)
+
+    def transfer(self, from_ac: str, to_ac: str, amount: int) -> Optional[int]:
+        src, dst = self._shard(from_ac), self._shard(to_ac)
+        if src is dst:
+            return src.accounts.transfer(from_ac, to_ac, amount)
+        return self.sharded.transfer_across(src, dst, from_ac, to_ac, amount)
+
+
+class ShardedUsers(_ShardedBase, UserRepository):
+    def _for_name(self, user_name: str) -> str:
+        if _ACCOUNT_NAME.match(user_name):
+            return self.sharded.router.shard_for(user_name)
+        return self.sharded.home
+
+    def get_by_name(self, user_name: str) -> Optional[Dict[str, Any]]:
+        shard = self._for_name(user_name)
+        return _qualify(shard, self.sharded.shards[shard].users.get_by_name(user_name), "id")
+
+    def get_role(self, uid: str) -> Optional[str]:
+        shard, raw = _split(uid)
+        repo = self.sharded.shards.get(shard or self.sharded.home)
+        return repo.users.get_role(str(raw)) if repo is not None else None
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        shard = self._for_name(row["user_name"])
+        return _qualify(shard, self.sharded.shards[shard].users.insert(row), "id", "uid")
+
+    def delete(self, user_id: Any) -> None:
+        shard, raw = _split(user_id)
+        self.sharded.shards[shard or self.sharded.home].users.delete(raw)
+
+
+class ShardedHistory(_ShardedBase, HistoryRepository):
+    def add(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return self._shard(row["account_no"]).history.add(row)
+
+    def add_many(self, rows: List[Dict[str, Any]]) -> None:
+        groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            groups[self.sharded.router.shard_for(row["account_no"])].append(row)
+        for shard, group in groups.items():
+            self.sharded.shards[shard].history.add_many(group)
+
+    def list(self, ac_no: str) -> List[Dict[str, Any]]:
+        return self._shard(ac_no).history.list(ac_no)
+
+    def latest_id(self, ac_no: str) -> Optional[Any]:
+        return self._shard(ac_no).history.latest_id(ac_no)
+
+
+class ShardedOutbox(_ShardedBase, OutboxRepository):
+    def pending(self, limit: int) -> List[Dict[str, Any]]:
+        # Merged by time; each shard's own id order (and so every account's
+        # event order) is kept
+        per_shard = [
+            [_qualify(name, e, "id") for e in shard.outbox.pending(limit)]
+            for name, shard in self.sharded.shards.items()
+        ]
+        merged = heapq.merge(*per_shard, key=lambda e: str(e["created_at"]))
+        return [e for _, e in zip(range(limit), merged)]
+
+    def mark_delivered(self, ids: List[Any]) -> None:
+        groups: Dict[str, List[Any]] = defaultdict(list)
+        for value in ids:
+            shard, raw = _split(value)
+            groups[shard or self.sharded.home].append(raw)
+        for shard, raw_ids in groups.items():
+            self.sharded.shards[shard].outbox.mark_delivered(raw_ids)
+
+
+class ShardedRepository(Repository):
+    """
+    One Repository per shard behind the single-database interface. The first
+    shard is the home shard (staff logins, audit log).
+    """
+
+    def __init__(self, shards: Dict[str, Repository], router: ShardRouter):
+        if set(shards) != set(router.names):
+            raise ValueError("Router and shard names differ")
+        self.shards = shards
+        self.router = router
+        self.home = router.names[0]
+        self.accounts = ShardedAccounts(self)
+        self.users = ShardedUsers(self)
+        self.history = ShardedHistory(self)
+        self.audit: AuditRepository = shards[self.home].audit
+        self.outbox = ShardedOutbox(self)
+
+    def for_account(self, ac_no: str) -> Repository:
+        return self.shards[self.router.shard_for(ac_no)]
+
+    def debug_claims(self) -> Any:
+        return {"backend": "sharded", "shards": self.router.names, "home": self.shards[self.home].debug_claims()}
+
+    # ---------- Cross-shard transfer ----------
+    def transfer_across(self, src: Repository, dst: Repository, from_ac: str, to_ac: str, amount: int) -> Optional[int]:
+        """Two-phase transfer; returns the sender's balance like AccountRepository.transfer."""
+        txid = uuid.uuid4().hex
+
+        try:
+            balance = src.accounts.prepare_leg(txid, "out", from_ac, amount, to_ac)
+        except NotFoundError:
+            raise NotFoundError("Sender account not found")
+        except InsufficientBalanceError:
+            raise
+        except Exception:
+            # The debit may have landed before the error (lost reply)
+            self._abort(txid, src, dst)
+            raise
+
+        try:
+            dst.accounts.prepare_leg(txid, "in", to_ac, amount, from_ac)
+        except Exception as e:
+            self._abort(txid, src, dst)
+            if isinstance(e, NotFoundError):
+                raise NotFoundError("Receiver account not found")
+            raise
+
+        if self._decide(txid, src) != "committed":
+            self._abort(txid, src, dst)
+            raise RepositoryError("Transfer aborted")
+        SHARD_TRANSFERS.inc(outcome="committed")
+
+        try:
+            dst.accounts.resolve_leg(txid, "in", True)
+        except Exception as e:
+            # Decided: recovery credits the receiver from the committed out leg
+            print(f"[SHARD ERROR] transfer {txid} committed, receiver credit deferred to recovery: {e}")
+        return balance
+
+    def _decide(self, txid: str, src: Repository) -> Optional[str]:
+        """Commit the sender's leg (the commit point) and return its final state."""
+        try:
+            return src.accounts.resolve_leg(txid, "out", True)
+        except Exception as e:
+            first = e
+        # Outcome unknown: aborting returns the state that actually won
+        try:
+            return src.accounts.resolve_leg(txid, "out", False)
+        except Exception:
+            SHARD_TRANSFERS.inc(outcome="pending")
+            raise RepositoryError(
+                f"Transfer {txid} outcome unknown ({first}); it will be settled by recovery"
+            ) from first
+
+    def _abort(self, txid: str, src: Repository, dst: Repository):
+        SHARD_TRANSFERS.inc(outcome="aborted")
+        for repo, direction in ((src, "out"), (dst, "in")):
+            try:
+                repo.accounts.resolve_leg(txid, direction, False)
+            except Exception as e:
+                print(f"[SHARD ERROR] abort {txid} ({direction}) deferred to recovery: {e}")
+
+    # ---------- Recovery ----------
+    def recover(self, older_than: float) -> Dict[str, int]:
+        """
+        Settle legs left prepared for more than `older_than` seconds. Out legs
+        first: no decision was recorded, so they are aborted (unless a slow
+        coordinator commits first). In legs then follow their out leg.
+        """
+        done = {"committed": 0, "aborted": 0}
+        stale = [(name, leg) for name, shard in self.shards.items() for leg in shard.accounts.stale_legs(older_than)]
+
+        for name, leg in stale:
+            if leg["direction"] == "out":
+                state = self.shards[name].accounts.resolve_leg(leg["txid"], "out", False)
+                self._settled(done, state)
+
+        for name, leg in stale:
+            if leg["direction"] != "in":
+                continue
+            decision = self.for_account(leg["counterparty"]).accounts.leg_state(leg["txid"], "out")
+            if decision == "prepared":
+                continue  # still undecided; its own stale scan will abort it
+            state = self.shards[name].accounts.resolve_leg(leg["txid"], "in", decision == "committed")
+            self._settled(done, state)
+        return done
+
+    @staticmethod
+    def _settled(done: Dict[str, int], state: Optional[str]):
+        if state in done:
+            done[state] += 1
+            SHARD_RECOVERED.inc(outcome=state)
+
+
+# -------------------- RECOVERY LOOP --------------------
+class TransferRecovery:
+    """Background thread running ShardedRepository.recover every `interval` seconds."""
+
+    def __init__(self, repo_factory: Callable[[], ShardedRepository], interval: float = 30.0, older_than: float = 60.0):
+        self.repo_factory = repo_factory
+        self.interval = interval
+        self.older_than = older_than
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Dict[str, int]:
+        return self.repo_factory().recover(self.older_than)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[SHARD ERROR] recovery: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="shard-recovery", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+# -------------------- SETTINGS --------------------
+def parse_shards(spec: str) -> List[Dict[str, Any]]:
+    """
+    SHARDS is a JSON list of backend specs (see parse_backends), the first
+    being the home shard, plus "from": "AC5000000000" per shard with
+    SHARD_STRATEGY=range.
+    """
+    shards = parse_backends(spec, "SHARDS")
+    if any(":" in s["name"] for s in shards):
+        raise ValueError("Shard names may not contain ':'")
+    return shards
+
+
+def build_sharded_repository(privileged: bool = True) -> ShardedRepository:
+    from app.config import settings
+
+    specs = parse_shards(settings.SHARDS)
+    router = ShardRouter(
+        [s["name"] for s in specs],
+        settings.SHARD_STRATEGY,
+        [s.get("from", "") for s in specs] if settings.SHARD_STRATEGY == "range" else None,
+    )
+    return ShardedRepository(
+        {s["name"]: open_backend(s, privileged, f"shard:{s['name']}") for s in specs}, router,
+    )
+
+
+def recovery_from_settings() -> Optional[TransferRecovery]:
+    from app.config import settings
+    from app.services.repository import get_repository
+
+    if not settings.SHARDS or settings.SHARD_RECOVERY_INTERVAL <= 0:
+        return None
+    return TransferRecovery(
+        lambda: get_repository(privileged=True),
+        interval=settings.SHARD_RECOVERY_INTERVAL,
+        older_than=settings.SHARD_RECOVERY_AFTER,
+    )
@@ -0,0 +1,226 @@
+# app/services/supabase_repository.py
+
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+from postgrest import SyncPostgrestClient as Client
+
+from app.core import resilience
+from app.services.postgrest_queries import PostgrestCatalog
+from app.services.repository import (
+    Repository,
+    AccountRepository,
+    UserRepository,
+    HistoryRepository,
+    AuditRepository,
+    OutboxRepository,
+    DuplicateError,
+    InsufficientBalanceError,
+    NotFoundError,
+    RepositoryError,
+)
+
+
+def _translate(e: Exception) -> RepositoryError:
+    """Map PostgREST / RPC exceptions onto repository errors."""
+    if isinstance(e, RepositoryError):
+        return e
+    msg = str(e)
+    low = msg.lower()
+    if "duplicate" in low or "unique constraint" in low:
+        return DuplicateError(msg)
+    if "insufficient" in low:
+        return InsufficientBalanceError(msg)
+    if "not found" in low:
+        return NotFoundError(msg)
+    return RepositoryError(msg)
+
+
+def _first(rows: Optional[List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    return rows[0] if rows else None
+
+
+class SupabaseAccounts(AccountRepository):
+    def __init__(self, queries: PostgrestCatalog):
+        self.queries = queries
+
+    def get(self, ac_no: str, columns: str) -> Optional[Dict[str, Any]]:
+        return _first(self.queries.run(self.queries.account_select(columns), ac_no))
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return _first(self.queries.run("account_insert", body=row)) or {}
+        except Exception as e:
+            raise _translate(e) from e
+
+    def open(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return self._rpc("rpc_create_account", {
+            "p_account_no": row["account_no"],
+            "p_name": row["name"],
+            "p_pin": row["pin"],
+            "p_mobileno": row["mobileno"],
+            "p_gmail": row["gmail"],
+        }) or {}
+
+    def update(self, ac_no: str, changes: Dict[str, Any]) -> int:
+        return len(self.queries.run("account_update", ac_no, body=changes) or [])
+
+    def update_if(self, ac_no: str, expected: Dict[str, Any], changes: Dict[str, Any]) -> int:
+        name = self.queries.account_update_where(", ".join(expected))
+        return len(self.queries.run(name, ac_no, *expected.values(), body=changes) or [])
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+        return self.queries.run("rpc_search_accounts", body={"q": query, "lim": limit, "off": offset}) or []
+
+    def scan_balances(self, after: str, limit: int) -> List[Dict[str, Any]]:
+        return self.queries.run("account_balances", after, limit=limit) or []
+
+    def _rpc(self, name: str, params: Dict[str, Any]):
+        try:
+            return self.queries.run(name, body=params)
+        except Exception as e:
+            raise _translate(e) from e
+
+    def _money(self, name: str, params: Dict[str, Any]) -> Optional[int]:
+        # Scalar RPC result; the void RPCs from before sql/005 return no body
+        balance = self._rpc(name, params)
+        return int(balance) if balance is not None else None
+
+    def deposit(self, ac_no: str, amount: int) -> Optional[int]:
+        return self._money("rpc_deposit", {"ac_no": ac_no, "amount": amount})
+
+    def withdraw(self, ac_no: str, amount: int) -> Optional[int]:
+        return self._money("rpc_withdraw", {"ac_no": ac_no, "amount": amount})
+
+    def transfer(self, from_ac: str, to_ac: str, amount: int) -> Optional[int]:
+        return self._money("rpc_transfer", {"from_ac": from_ac, "to_ac": to_ac, "amount": amount})
+
+    def apply_once(self, key: str, kind: str, ac_no: str, amount: int) -> Dict[str, Any]:
+        return self._rpc("rpc_apply_once", {
+            "p_key": key, "p_kind": kind, "p_account_no": ac_no, "p_amount": amount,
+        }) or {}
+
+    def prepare_leg(self, txid: str, direction: str, ac_no: str, amount: int, counterparty: str) -> Optional[int]:
+        return self._money("rpc_transfer_prepare", {
+            "p_txid": txid,
+            "p_direction": direction,
+            "p_account_no": ac_no,
+            "p_amount": amount,
+            "p_counterparty": counterparty,
+        })
+
+    def resolve_leg(self, txid: str, direction: str, commit: bool) -> Optional[str]:
+        return self._rpc("rpc_transfer_resolve", {"p_txid": txid, "p_direction": direction, "p_commit": commit})
+
+    def leg_state(self, txid: str, direction: str) -> Optional[str]:
+        row = _first(self.queries.run("transfer_leg_state", txid, direction))
+        return row["state"] if row else None
+
+    def stale_legs(self, older_than: float) -> List[Dict[str, Any]]:
+        return self._rpc("rpc_transfer_stale_legs", {"p_seconds": older_than}) or []
+
+
+class SupabaseUsers(UserRepository):
+    def __init__(self, queries: PostgrestCatalog):
+        self.queries = queries
+
+    def get_by_name(self, user_name: str) -> Optional[Dict[str, Any]]:
+        return _first(self.queries.run("user_by_name", user_name))
+
+    def get_role(self, uid: str) -> Optional[str]:
+        row = _first(self.queries.run("user_role", uid))
+        return row["role"] if row else None
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return _first(self.queries.run("user_insert", body=row)) or {}
+        except Exception as e:
+            raise _translate(e) from e
+
+    def delete(self, user_id: Any) -> None:
+        self.queries.run("user_delete", user_id)
+
+
+class SupabaseHistory(HistoryRepository):
+    def __init__(self, queries: PostgrestCatalog):
+        self.queries = queries
+
+    def add(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return _first(self.queries.run("history_insert", body=row)) or {}
+
+    def add_many(self, rows: List[Dict[str, Any]]) -> None:
+        self.queries.run("history_insert_many", body=rows)
+
+    def list(self, ac_no: str) -> List[Dict[str, Any]]:
+        return self.queries.run("history_list", ac_no) or []
+
+    def latest_id(self, ac_no: str) -> Optional[Any]:
+        row = _first(self.queries.run("history_latest_id", ac_no))
+        return row["id"] if row else None
+
+    def scan(self, after_id: Any, limit: int) -> List[Dict[str, Any]]:
+        return self.queries.run("history_scan", after_id, limit=limit) or []
+
+
+class SupabaseAudit(AuditRepository):
+    def __init__(self, queries: PostgrestCatalog):
+        self.queries = queries
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.queries.run("audit_insert", body=row)
+
+    def add_many(self, rows: List[Dict[str, Any]]) -> None:
+        self.queries.run("audit_insert", body=rows)
+
+    def query(self, filters: Dict[str, Any], limit: int, after=None) -> List[Dict[str, Any]]:
+        after_ts, after_id = after or (None, None)
+        return self.queries.run("rpc_audit_events", body={
+            "p_actor": filters.get("actor"),
+            "p_action": filters.get("action"),
+            "p_ip": filters.get("ip"),
+            "p_since": filters.get("since"),
+            "p_until": filters.get("until"),
+            "p_after_ts": after_ts,
+            "p_after_id": after_id,
+            "p_limit": limit,
+        }) or []
+
+    def action_counts(self, bucket: str, since, until, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.queries.run("rpc_audit_action_counts", body={
+            "p_bucket": bucket,
+            "p_since": since,
+            "p_until": until,
+            "p_actor": filters.get("actor"),
+            "p_action": filters.get("action"),
+        }) or []
+
+
+class SupabaseOutbox(OutboxRepository):
+    def __init__(self, queries: PostgrestCatalog):
+        self.queries = queries
+
+    def pending(self, limit: int) -> List[Dict[str, Any]]:
+        return self.queries.run("outbox_pending", "null", limit=limit) or []
+
+    def mark_delivered(self, ids: List[Any]) -> None:
+        if ids:
+            self.queries.run("outbox_mark_delivered", list(ids), "null",
+                             body={"delivered_at": datetime.now(UTC).isoformat()})
+
+
+class SupabaseRepository(Repository):
+    def __init__(self, client: Client, name: str = "supabase"):
+        # `name` keys the circuit breaker, one per project (see sharding)
+        self.client = client
+        self.queries = PostgrestCatalog(client, resilience.get_breaker(name))
+        self.accounts = SupabaseAccounts(self.queries)
+        self.users = SupabaseUsers(self.queries)
+        self.history = SupabaseHistory(self.queries)
+        self.audit = SupabaseAudit(self.queries)
+        self.outbox = SupabaseOutbox(self.queries)
+
+    def debug_claims(self) -> Any:
+        return self.client.rpc("debug_claims").execute().data
+
+    def replication_lag(self) -> Optional[float]:
+        lag = self.queries.run("rpc_replica_lag", body={})
+        return float(lag) if lag is not None else None
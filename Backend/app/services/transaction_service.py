@@ -1,29 +1,43 @@
 # app/services/transaction_service.py
 
-from typing import Tuple
+from typing import Optional, Tuple
 from fastapi import Request
-from supabase import Client
-
 from app.services.auth_service import AuthService
 from app.services.history_service import HistoryService
+from app.services.offline_service import OfflineService, backend_unreachable
+from app.config import settings
+from app.services.repository import Repository
+from app.core.metrics import traced
 
 
 class TransactionService:
     def __init__(self):
         self.auth = AuthService()
         self.history = HistoryService()
+        self.offline = OfflineService()
+
+    # ---------- Balance after a mutation ----------
+    @staticmethod
+    def _with_balance(db: Repository, ac_no: str, message: str, balance: Optional[int]) -> str:
+        """Success message with the balance the write returned (lookup only if it returned none)."""
+        if balance is None:
+            balance = db.accounts.balance(ac_no)
+        return f"{message} New balance: {balance}"
 
     # ---------- Deposit ----------
-    def deposit(self, db: Client, ac_no: str, amount: int, pin: str, request: Request) -> Tuple[bool, str]:
+    @traced("transaction.deposit")
+    def deposit(self, db: Repository, ac_no: str, amount: int, pin: str, request: Request) -> Tuple[bool, str]:
         ok, msg = self.auth.check(db, ac_no=ac_no, pin=pin, request=request)
         if not ok:
+            if settings.OFFLINE_MODE and backend_unreachable():
+                return self.offline.accept("deposit", ac_no, amount, pin, request)
             return False, msg
 
         if amount <= 0:
             return False, "Amount must be greater than zero."
 
         try:
-            db.rpc("deposit_money", {"ac_no": ac_no, "amount": amount}).execute()
+            balance = db.accounts.deposit(ac_no, amount)
         except Exception as e:
             self.auth.log_event(db, ac_no, "deposit_failed", str(e), request)
             return False, f"Deposit failed: {e}"
@@ -31,29 +45,22 @@ class TransactionService:
         self.auth.log_event(db, ac_no, "deposit_success", f"Deposited {amount}", request)
         self.history.add_entry(db, ac_no, "deposit", amount)
 
-        # fetch balance
-        resp = (
-            db.table("accounts")
-            .select("balance")
-            .eq("account_no", ac_no)
-            .single()
-            .execute()
-        )
-        new_balance = resp.data["balance"]
-
-        return True, f"Deposit successful. New balance: {new_balance}"
+        return True, self._with_balance(db, ac_no, "Deposit successful.", balance)
 
     # ---------- Withdraw ----------
-    def withdraw(self, db: Client, ac_no: str, amount: int, pin: str, request: Request) -> Tuple[bool, str]:
+    @traced("transaction.withdraw")
+    def withdraw(self, db: Repository, ac_no: str, amount: int, pin: str, request: Request) -> Tuple[bool, str]:
         ok, msg = self.auth.check(db, ac_no=ac_no, pin=pin, request=request)
         if not ok:
+            if settings.OFFLINE_MODE and settings.OFFLINE_WITHDRAW_LIMIT > 0 and backend_unreachable():
+                return self.offline.accept("withdraw", ac_no, amount, pin, request)
             return False, msg
 
         if amount <= 0:
             return False, "Amount must be greater than zero."
 
         try:
-            db.rpc("withdraw_money", {"ac_no": ac_no, "amount": amount}).execute()
+            balance = db.accounts.withdraw(ac_no, amount)
         except Exception as e:
             self.auth.log_event(db, ac_no, "withdraw_failed", str(e), request)
             error = str(e).lower()
@@ -68,19 +75,11 @@ class TransactionService:
         self.auth.log_event(db, ac_no, "withdraw_success", f"Withdrew {amount}", request)
         self.history.add_entry(db, ac_no, "withdraw", amount)
 
-        resp = (
-            db.table("accounts")
-            .select("balance")
-            .eq("account_no", ac_no)
-            .single()
-            .execute()
-        )
-        new_balance = resp.data["balance"]
-
-        return True, f"Withdraw successful. New balance: {new_balance}"
+        return True, self._with_balance(db, ac_no, "Withdraw successful.", balance)
 
     # ---------- Transfer ----------
-    def transfer(self, db: Client, from_ac: str, to_ac: str, amount: int, pin: str, request: Request) -> Tuple[bool, str]:
+    @traced("transaction.transfer")
+    def transfer(self, db: Repository, from_ac: str, to_ac: str, amount: int, pin: str, request: Request) -> Tuple[bool, str]:
         ok, msg = self.auth.check(db, ac_no=from_ac, pin=pin, request=request)
         if not ok:
             return False, msg
@@ -89,10 +88,7 @@ class TransactionService:
             return False, "Amount must be greater than zero."
 
         try:
-            db.rpc(
-                "transfer_money",
-                {"from_ac": from_ac, "to_ac": to_ac, "amount": amount},
-            ).execute()
+            balance = db.accounts.transfer(from_ac, to_ac, amount)
         except Exception as e:
             self.auth.log_event(db, from_ac, "transfer_failed", str(e), request)
             error = str(e).lower()
@@ -113,13 +109,4 @@ class TransactionService:
         self.history.add_entry(db, from_ac, "transfer_out", amount, context={"to": to_ac})
         self.history.add_entry(db, to_ac, "transfer_in", amount, context={"from": from_ac})
 
-        resp = (
-            db.table("accounts")
-            .select("balance")
-            .eq("account_no", from_ac)
-            .single()
-            .execute()
-        )
-        new_balance = resp.data["balance"]
-
-        return True, f"Transfer successful. New balance: {new_balance}"
+        return True, self._with_balance(db, from_ac, "Transfer successful.", balance)
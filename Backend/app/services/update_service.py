@@ -1,7 +1,13 @@
 from typing import Tuple
 from fastapi import Request
-from supabase import Client
 from app.services.auth_service import AuthService
+from app.services.repository import Repository
+
+
+# Returned when the compare-and-swap matched no row; routes answer 409
+MOBILE_MISMATCH = "Old mobile number does not match."
+EMAIL_MISMATCH = "Old email does not match."
+OLD_VALUE_MISMATCH = {MOBILE_MISMATCH, EMAIL_MISMATCH}
 
 
 class UpdateService:
@@ -9,7 +15,7 @@ class UpdateService:
         self.auth = AuthService()
 
     # ---------- Update Mobile ----------
-    def update_mobile(self, db: Client, ac_no: str, pin: str, old_mobile: str, new_mobile: str, request: Request) -> Tuple[bool, str]:
+    def update_mobile(self, db: Repository, ac_no: str, pin: str, old_mobile: str, new_mobile: str, request: Request) -> Tuple[bool, str]:
         if len(new_mobile) != 10 or not new_mobile.isdigit():
             return False, "Invalid mobile number."
 
@@ -17,28 +23,20 @@ class UpdateService:
         if not ok:
             return False, msg
 
+        # Check and write in one statement: no window for a concurrent change
         try:
-            old = (
-                db.table("accounts")
-                .select("mobileno")
-                .eq("account_no", ac_no)
-                .single()
-                .execute()
-            )
-            if old.data["mobileno"] != old_mobile:
-                return False, "Old mobile number does not match."
-        except Exception as e:
-            return False, f"Database error: {e}"
-
-        try:
-            db.table("accounts").update({"mobileno": new_mobile}).eq("account_no", ac_no).execute()
-            self.auth.log_event(db, ac_no, "update_mobile", f"New mobile: {new_mobile}", request)
-            return True, "Mobile number updated successfully."
+            written = db.accounts.update_if(ac_no, {"mobileno": old_mobile}, {"mobileno": new_mobile})
         except Exception as e:
             return False, f"Update failed: {e}"
 
+        if not written:
+            return False, MOBILE_MISMATCH
+
+        self.auth.log_event(db, ac_no, "update_mobile", f"New mobile: {new_mobile}", request)
+        return True, "Mobile number updated successfully."
+
     # ---------- Update Email ----------
-    def update_email(self, db: Client, ac_no: str, pin: str, old_email: str, new_email: str, request: Request) -> Tuple[bool, str]:
+    def update_email(self, db: Repository, ac_no: str, pin: str, old_email: str, new_email: str, request: Request) -> Tuple[bool, str]:
         if "@" not in new_email or new_email.count("@") != 1:
             return False, "Invalid email."
 
@@ -47,27 +45,18 @@ class UpdateService:
             return False, msg
 
         try:
-            old = (
-                db.table("accounts")
-                .select("gmail")
-                .eq("account_no", ac_no)
-                .single()
-                .execute()
-            )
-            if old.data["gmail"] != old_email:
-                return False, "Old email does not match."
-        except Exception as e:
-            return False, f"Database error: {e}"
-
-        try:
-            db.table("accounts").update({"gmail": new_email}).eq("account_no", ac_no).execute()
-            self.auth.log_event(db, ac_no, "update_email", f"New email: {new_email}", request)
-            return True, "Email updated successfully."
+            written = db.accounts.update_if(ac_no, {"gmail": old_email}, {"gmail": new_email})
         except Exception as e:
             return False, f"Update failed: {e}"
 
+        if not written:
+            return False, EMAIL_MISMATCH
+
+        self.auth.log_event(db, ac_no, "update_email", f"New email: {new_email}", request)
+        return True, "Email updated successfully."
+
     # ---------- Change PIN ----------
-    def change_pin(self, db: Client, ac_no: str, old_pin: str, new_pin: str, request: Request) -> Tuple[bool, str]:
+    def change_pin(self, db: Repository, ac_no: str, old_pin: str, new_pin: str, request: Request) -> Tuple[bool, str]:
         if len(new_pin) != 4 or not new_pin.isdigit():
             return False, "New PIN must be 4 digits."
 
@@ -78,10 +67,10 @@ class UpdateService:
         hashed = self.auth.hash_pin(new_pin)
 
         try:
-            db.table("accounts").update({
+            db.accounts.update(ac_no, {
                 "pin": hashed,
                 "failed_attempts": 0
-            }).eq("account_no", ac_no).execute()
+            })
 
             self.auth.log_event(db, ac_no, "pin_change", "PIN updated successfully", request)
             return True, "PIN changed successfully."
@@ -1,4 +1,37 @@
 from datetime import datetime, timedelta, UTC
 
 def now_utc_ts() -> float:
-    return datetime.now(UTC).timestamp()
\ No newline at end of file
+    return datetime.now(UTC).timestamp()
+
+
+# Units accepted by Postgres date_trunc() that the audit API exposes
+BUCKETS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=31),   # upper bound, for sizing checks only
+}
+
+
+def parse_ts(value) -> datetime:
+    """datetime or ISO string -> aware datetime (naive values are taken as UTC)."""
+    ts = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=UTC)
+
+
+def truncate(ts: datetime, bucket: str) -> datetime:
+    """Python twin of date_trunc(bucket, ts) in UTC."""
+    ts = parse_ts(ts).astimezone(UTC)
+    if bucket == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if bucket == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        return day
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())   # ISO weeks start on Monday
+    if bucket == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown bucket {bucket!r}")
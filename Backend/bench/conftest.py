@@ -0,0 +1,22 @@
+# bench/conftest.py
+import pytest
+
+from harness import build_app
+
+# Seeded on the last bench account (see harness.build_app)
+HISTORY_ROWS = 1000
+
+
+@pytest.fixture(scope="session")
+def bench_env():
+    return build_app(history_rows=HISTORY_ROWS)
+
+
+@pytest.fixture(scope="session")
+def bench_client(bench_env):
+    from fastapi.testclient import TestClient
+
+    app, _, cookies = bench_env
+    client = TestClient(app)
+    client.cookies.update(cookies)
+    return client
@@ -0,0 +1,302 @@
+# bench/fake_postgrest.py
+"""
+In-process stand-in for the Supabase PostgREST API.
+
+Plugged in as an httpx transport, so the real supabase-py query builders,
+JSON encoding and metrics hooks all run; only the network and Postgres are
+replaced. Implements the tables and RPCs the services use:
+
+    users, accounts, history, app_audit_logs, money_outbox
+    deposit_money, withdraw_money, transfer_money (with outbox rows,
+    like sql/001_money_outbox.sql), create_account (sql/006)
+"""
+
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+REST_PREFIX = "/rest/v1/"
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+
+UNIQUE = {
+    "users": ("user_name",),
+    "accounts": ("account_no",),
+}
+
+DEFAULTS = {
+    "accounts": {"balance": 0, "failed_attempts": 0, "is_locked": False},
+    "history": {"context": None},
+    "money_outbox": {"counterparty": None, "delivered_at": None},
+}
+
+
+class PostgrestError(Exception):
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class FakePostgrest(httpx.BaseTransport):
+    """
+    Thread-safe fake PostgREST backend.
+
+    latency:   seconds added to every call (simulated round trip)
+    jitter:    extra uniform random seconds on top of `latency`
+    overrides: per-target latency, e.g. {"rpc.transfer_money": 0.02}
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, overrides: Optional[Dict[str, float]] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.overrides = overrides or {}
+        self.tables: Dict[str, List[dict]] = {
+            "users": [],
+            "accounts": [],
+            "history": [],
+            "app_audit_logs": [],
+            "money_outbox": [],
+        }
+        self.calls: Dict[str, int] = {}
+        self._ids = {name: itertools.count(1) for name in self.tables}
+        self._lock = threading.Lock()
+
+    # ------------------- Transport -------------------
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        target = path[path.find(REST_PREFIX) + len(REST_PREFIX):]
+
+        delay = self.overrides.get(target.replace("/", "."), self.latency)
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+        try:
+            with self._lock:
+                self.calls[target] = self.calls.get(target, 0) + 1
+                if target.startswith("rpc/"):
+                    body = self._rpc(target[4:], _json_body(request))
+                else:
+                    body = self._table(target, request)
+        except PostgrestError as e:
+            return _json_response(e.status, {
+                "code": e.code, "message": e.message, "details": None, "hint": None,
+            })
+
+        if request.headers.get("accept") == SINGLE_OBJECT and isinstance(body, list):
+            if len(body) != 1:
+                return _json_response(406, {
+                    "code": "PGRST116",
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "details": f"The result contains {len(body)} rows",
+                    "hint": None,
+                })
+            body = body[0]
+
+        return _json_response(200 if request.method != "POST" else 201, body)
+
+    # ------------------- Tables -------------------
+    def _table(self, name: str, request: httpx.Request) -> Any:
+        if name not in self.tables:
+            raise PostgrestError(404, "42P01", f'relation "public.{name}" does not exist')
+
+        params = request.url.params
+        rows = self.tables[name]
+
+        if request.method == "POST":
+            payload = _json_body(request)
+            payload = payload if isinstance(payload, list) else [payload]
+            return [self._insert(name, row) for row in payload]
+
+        matched = [row for row in rows if _matches(row, params)]
+
+        if request.method == "GET":
+            order = params.get("order")
+            if order:
+                col, _, direction = order.partition(".")
+                matched.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=direction.startswith("desc"))
+            offset = int(params.get("offset", 0))
+            limit = params.get("limit")
+            matched = matched[offset: offset + int(limit)] if limit else matched[offset:]
+            return [_project(row, params.get("select")) for row in matched]
+
+        if request.method == "PATCH":
+            changes = _json_body(request)
+            for row in matched:
+                self._check_unique(name, {**row, **changes}, ignore=row)
+                row.update(changes)
+            return [dict(row) for row in matched]
+
+        if request.method == "DELETE":
+            keep = [row for row in rows if row not in matched]
+            self.tables[name] = keep
+            return [dict(row) for row in matched]
+
+        raise PostgrestError(405, "PGRST000", f"Unsupported method {request.method}")
+
+    def _insert(self, name: str, row: dict) -> dict:
+        new = {**DEFAULTS.get(name, {}), **row}
+        new.setdefault("id", next(self._ids[name]))
+        new.setdefault("created_at", datetime.now(UTC).isoformat())
+        if name == "users":
+            new.setdefault("uid", new["id"])
+        self._check_unique(name, new)
+        self.tables[name].append(new)
+        return dict(new)
+
+    def _check_unique(self, name: str, row: dict, ignore: Optional[dict] = None):
+        for col in UNIQUE.get(name, ()):
+            for other in self.tables[name]:
+                if other is not ignore and other.get(col) == row.get(col):
+                    raise PostgrestError(
+                        409, "23505",
+                        f'duplicate key value violates unique constraint "{name}_{col}_key"',
+                    )
+
+    def _account(self, ac_no: str) -> Optional[dict]:
+        for row in self.tables["accounts"]:
+            if row["account_no"] == ac_no:
+                return row
+        return None
+
+    def _emit(self, acc: dict, kind: str, amount: int, counterparty: Optional[str] = None):
+        self._insert("money_outbox", {
+            "account_no": acc["account_no"], "kind": kind, "amount": amount,
+            "balance": acc["balance"], "counterparty": counterparty,
+        })
+
+    # ------------------- RPCs -------------------
+    def _rpc(self, fn: str, args: dict) -> Any:
+        if fn == "deposit_money":
+            acc = self._account(args["ac_no"])
+            if acc is None:
+                raise PostgrestError(400, "P0001", "Account not found")
+            acc["balance"] += args["amount"]
+            self._emit(acc, "deposit", args["amount"])
+            return acc["balance"]
+
+        if fn == "withdraw_money":
+            acc = self._account(args["ac_no"])
+            if acc is None:
+                raise PostgrestError(400, "P0001", "Account not found")
+            if acc["balance"] < args["amount"]:
+                raise PostgrestError(400, "P0001", "Insufficient balance")
+            acc["balance"] -= args["amount"]
+            self._emit(acc, "withdraw", args["amount"])
+            return acc["balance"]
+
+        if fn == "transfer_money":
+            sender = self._account(args["from_ac"])
+            receiver = self._account(args["to_ac"])
+            if sender is None:
+                raise PostgrestError(400, "P0001", "Sender account not found")
+            if receiver is None:
+                raise PostgrestError(400, "P0001", "Receiver account not found")
+            if sender["balance"] < args["amount"]:
+                raise PostgrestError(400, "P0001", "Insufficient balance")
+            sender["balance"] -= args["amount"]
+            receiver["balance"] += args["amount"]
+            self._emit(sender, "transfer_out", args["amount"], receiver["account_no"])
+            self._emit(receiver, "transfer_in", args["amount"], sender["account_no"])
+            return sender["balance"]
+
+        if fn == "create_account":
+            # Unique checks first: the real function's transaction leaves no rows on failure
+            ac_no = args["p_account_no"]
+            self._check_unique("users", {"user_name": ac_no})
+            self._check_unique("accounts", {"account_no": ac_no})
+            user = self._insert("users", {"user_name": ac_no, "password": args["p_pin"], "role": "customer"})
+            self._insert("accounts", {
+                "account_no": ac_no, "name": args["p_name"], "pin": args["p_pin"],
+                "mobileno": args["p_mobileno"], "gmail": args["p_gmail"], "user_id": user["id"],
+            })
+            return {"account_no": ac_no, "user_id": user["id"]}
+
+        raise PostgrestError(404, "PGRST202", f"Could not find the function public.{fn}")
+
+    # ------------------- Seeding -------------------
+    def seed_user(self, user_name: str, password_hash: str, role: str) -> dict:
+        with self._lock:
+            return self._insert("users", {
+                "user_name": user_name, "password": password_hash, "role": role,
+            })
+
+    def seed_account(self, account_no: str, pin_hash: str, balance: int = 0, name: str = "Bench User") -> dict:
+        with self._lock:
+            user = self._insert("users", {
+                "user_name": account_no, "password": pin_hash, "role": "customer",
+            })
+            return self._insert("accounts", {
+                "account_no": account_no,
+                "name": name,
+                "pin": pin_hash,
+                "mobileno": "9999999999",
+                "gmail": f"{account_no.lower()}@bench.local",
+                "balance": balance,
+                "user_id": user["id"],
+            })
+
+
+# -------------------- Helpers --------------------
+def _json_body(request: httpx.Request) -> Any:
+    content = request.read()
+    return json.loads(content) if content else {}
+
+
+def _json_response(status: int, body: Any) -> httpx.Response:
+    return httpx.Response(
+        status,
+        content=json.dumps(body).encode(),
+        headers={"content-type": "application/json"},
+    )
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "null" if value is None else str(value)
+
+
+def _matches(row: dict, params: httpx.QueryParams) -> bool:
+    for col, expr in params.multi_items():
+        if col in ("select", "order", "limit", "offset"):
+            continue
+        op, _, value = expr.partition(".")
+        current = row.get(col)
+        if op == "eq" and _as_text(current) != value:
+            return False
+        if op == "neq" and _as_text(current) == value:
+            return False
+        if op == "is" and _as_text(current) != value:
+            return False
+        if op == "in" and _as_text(current) not in value.strip("()").split(","):
+            return False
+        if op in ("gt", "gte", "lt", "lte"):
+            if current is None:
+                return False
+            left, right = (current, type(current)(value)) if not isinstance(current, str) else (current, value)
+            if op == "gt" and not left > right:
+                return False
+            if op == "gte" and not left >= right:
+                return False
+            if op == "lt" and not left < right:
+                return False
+            if op == "lte" and not left <= right:
+                return False
+    return True
+
+
+def _project(row: dict, select: Optional[str]) -> dict:
+    if not select or select.strip() == "*":
+        return dict(row)
+    cols = [c.strip() for c in select.split(",")]
+    return {c: row.get(c) for c in cols}
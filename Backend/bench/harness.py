@@ -0,0 +1,92 @@
+# bench/harness.py
+"""
+Builds the FastAPI app wired to a FakePostgrest backend.
+
+Import this module before anything under `app`, it fills in the settings the
+app validates at startup so no real Supabase project or keys are needed.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("SUPABASE_URL", "http://fake-postgrest.local")
+os.environ.setdefault("SUPABASE_KEY", "bench-anon-key")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-service-key")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+import httpx
+from bcrypt import hashpw, gensalt
+
+from app import create_app
+from app.config import settings
+from app.core.supabase_client import use_http_client
+from app.services import repository
+from app.utils.jwt_tools import make_access
+from bench.fake_postgrest import FakePostgrest
+
+
+BENCH_PIN = "1234"
+# Low cost factor keeps bcrypt from dominating benchmarks of other layers.
+BENCH_HASH_ROUNDS = 4
+
+
+def build_app(
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    accounts: int = 10,
+    balance: int = 10**9,
+    backend: str = "supabase",
+    history_rows: int = 0,
+):
+    """
+    Return (app, backend, cookies) with `accounts` seeded customer accounts
+    (AC0000000001...) sharing BENCH_PIN, plus an admin user. The last account
+    also gets `history_rows` history entries (large-payload benchmarks).
+
+    backend="supabase" runs the real PostgREST client against FakePostgrest;
+    backend="memory" uses the in-memory repository (latency is ignored).
+    """
+    pin_hash = hashpw(BENCH_PIN.encode(), gensalt(BENCH_HASH_ROUNDS)).decode()
+    settings.DATA_BACKEND = backend
+
+    if backend == "memory":
+        repository._memory_repo = None
+        store = repository.get_repository()
+        admin = store.users.insert({"user_name": "bench-admin", "password": pin_hash, "role": "admin"})
+        for i in range(1, accounts + 1):
+            user = store.users.insert({"user_name": account_no(i), "password": pin_hash, "role": "customer"})
+            store.accounts.insert({
+                "account_no": account_no(i),
+                "name": "Bench User",
+                "pin": pin_hash,
+                "mobileno": "9999999999",
+                "gmail": f"{account_no(i).lower()}@bench.local",
+                "balance": balance,
+                "user_id": user["id"],
+            })
+        add_history = store.history.add
+    else:
+        store = FakePostgrest(latency=latency, jitter=jitter)
+        use_http_client(httpx.Client(transport=store))
+        admin = store.seed_user("bench-admin", pin_hash, "admin")
+        for i in range(1, accounts + 1):
+            store.seed_account(account_no(i), pin_hash, balance=balance)
+        add_history = lambda row: store._insert("history", row)
+
+    for n in range(history_rows):
+        add_history({
+            "account_no": account_no(accounts),
+            "action": "deposit",
+            "amount": n + 1,
+            "context": {"channel": "bench", "n": n},
+        })
+
+    cookies = {"atm_token": make_access(str(admin["id"]), "admin")}
+    return create_app(), store, cookies
+
+
+def account_no(i: int) -> str:
+    return f"AC{i:010d}"
@@ -0,0 +1,99 @@
+# bench/import_profile.py
+"""
+Import-time report for the app package.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+prints the slowest modules by cumulative time.
+
+    python -m bench.import_profile --top 25
+    python -m bench.import_profile --json import_profile.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Modules that must not be loaded by `import app.main`
+LAZY_MODULES = ("supabase", "postgrest", "psycopg")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("SUPABASE_URL", "http://profile.local")
+    env.setdefault("SUPABASE_KEY", "profile")
+    env.setdefault("SUPABASE_SERVICE_ROLE_KEY", "profile")
+    env.setdefault("SECRET_KEY", "profile")
+    return env
+
+
+def measure_import(module: str = "app.main") -> dict:
+    """Wall time, loaded lazy modules and per-module timings for one cold import."""
+    code = (
+        "import sys, time, json\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - t\n"
+        f"lazy = {LAZY_MODULES!r}\n"
+        "print(json.dumps({'seconds': elapsed, "
+        "'loaded': sorted(m for m in lazy if m in sys.modules)}))\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    modules: List[dict] = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            modules.append({
+                "module": m.group(4),
+                "self_us": int(m.group(1)),
+                "cumulative_us": int(m.group(2)),
+                "depth": (len(m.group(3)) - 1) // 2,
+            })
+    result["modules"] = modules
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time profile of app.main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", help="write the full report here")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    report = measure_import()
+    print(f"import app.main: {report['seconds'] * 1000:.1f} ms "
+          f"(profiled run {(time.perf_counter() - started) * 1000:.0f} ms)")
+    print(f"lazy modules loaded at import: {report['loaded'] or 'none'}\n")
+
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    slowest = sorted(report["modules"], key=lambda r: r["cumulative_us"], reverse=True)
+    for row in slowest[:args.top]:
+        print(f"{row['cumulative_us'] / 1000:>10.1f}ms {row['self_us'] / 1000:>8.1f}ms  "
+              f"{'  ' * row['depth']}{row['module']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
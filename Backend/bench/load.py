@@ -0,0 +1,219 @@
+# bench/load.py
+"""
+Concurrent load driver.
+
+Runs a weighted mix of endpoints against the app in-process (FakePostgrest
+backend with injected latency) or against a live server, then reports RPS
+and p50/p95/p99 per endpoint.
+
+    python -m bench.load --concurrency 32 --duration 10 --latency 0.005 --out run.json
+    python -m bench.load --compare baseline.json --out run.json --max-regression 0.10
+    python -m bench.load --backend memory
+    python -m bench.load --concurrency 256 --history-rows 2000 --only deposit history_export
+    python -m bench.load ... --no-admission        # same run without admission control
+
+Shed requests (503 from admission control) are counted separately and left
+out of the latency percentiles, which describe admitted requests.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from bench.harness import BENCH_PIN, account_no, build_app
+from app.config import settings
+
+
+Scenario = Callable[[int], Tuple[str, str, dict]]
+
+
+def _scenarios(accounts: int) -> Dict[str, Tuple[int, Scenario]]:
+    """name -> (weight, fn(seq) -> (method, path, kwargs))"""
+    def pick(seq: int) -> str:
+        return account_no(seq % accounts + 1)
+
+    return {
+        "auth_check": (4, lambda seq: ("GET", "/auth/check", {})),
+        "deposit": (3, lambda seq: ("POST", "/transaction/deposit", {
+            "json": {"acc_no": pick(seq), "pin": BENCH_PIN, "amount": 10},
+        })),
+        "withdraw": (2, lambda seq: ("POST", "/transaction/withdraw", {
+            "json": {"acc_no": pick(seq), "pin": BENCH_PIN, "amount": 5},
+        })),
+        "transfer": (2, lambda seq: ("POST", "/transaction/transfer", {
+            "json": {"acc_no": pick(seq), "rec_acc_no": pick(seq + 1), "pin": BENCH_PIN, "amount": 1},
+        })),
+        "history": (1, lambda seq: ("GET", f"/history/{pick(seq)}", {"params": {"pin": BENCH_PIN}})),
+        # Full dump of the account seeded with --history-rows
+        "history_export": (1, lambda seq: ("GET", f"/history/{account_no(accounts)}", {"params": {"pin": BENCH_PIN}})),
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def summarize(samples: Dict[str, List[Tuple[float, int]]], elapsed: float) -> dict:
+    report = {}
+    for name, rows in sorted(samples.items()):
+        latencies = sorted(lat for lat, status in rows if status != 503)
+        shed = len(rows) - len(latencies)
+        errors = sum(1 for _, status in rows if (status >= 500 and status != 503) or status == 0)
+        report[name] = {
+            "requests": len(rows),
+            "errors": errors,
+            "shed": shed,
+            "rps": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+    return report
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    concurrency: int,
+    duration: float,
+    accounts: int,
+    only: Optional[List[str]] = None,
+) -> dict:
+    scenarios = _scenarios(accounts)
+    if only:
+        scenarios = {k: v for k, v in scenarios.items() if k in only}
+    names = list(scenarios)
+    weights = [scenarios[n][0] for n in names]
+
+    samples: Dict[str, List[Tuple[float, int]]] = {n: [] for n in names}
+    deadline = time.perf_counter() + duration
+    counter = iter(range(10**12))
+
+    async def worker():
+        rng = random.Random()
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, kwargs = scenarios[name][1](next(counter))
+            start = time.perf_counter()
+            retry_after = 0.0
+            try:
+                res = await client.request(method, path, **kwargs)
+                status = res.status_code
+                if status == 503:
+                    retry_after = float(res.headers.get("retry-after", 0))
+            except (httpx.HTTPError, ValueError):
+                status = 0
+            samples[name].append((time.perf_counter() - start, status))
+            if retry_after:
+                # Behave like a well-mannered client instead of hammering a shedding server
+                # (jittered, so shed clients do not return in one wave)
+                pause = retry_after * rng.uniform(0.5, 1.5)
+                await asyncio.sleep(min(pause, max(0.0, deadline - time.perf_counter())))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - started)
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Return a line per endpoint whose p95 or RPS regressed past the threshold."""
+    failures = []
+    for name, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            failures.append(f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+        if before["rps"] and now["rps"] < before["rps"] * (1 - max_regression):
+            failures.append(f"{name}: rps {before['rps']} -> {now['rps']}")
+    return failures
+
+
+async def _main(args) -> int:
+    if args.base_url:
+        cookies = {"atm_token": args.token} if args.token else {}
+        client = httpx.AsyncClient(base_url=args.base_url, cookies=cookies, timeout=30)
+    else:
+        settings.ADMISSION_CONTROL = args.admission
+        app, _, cookies = build_app(
+            latency=args.latency,
+            jitter=args.jitter,
+            accounts=args.accounts,
+            backend=args.backend,
+            history_rows=args.history_rows,
+        )
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://bench",
+            cookies=cookies,
+            timeout=30,
+        )
+
+    async with client:
+        endpoints = await run_load(client, args.concurrency, args.duration, args.accounts, args.only)
+
+    result = {
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "target": args.base_url or "in-process",
+            "backend": args.backend,
+            "admission": args.admission,
+            "history_rows": args.history_rows,
+        },
+        "endpoints": endpoints,
+    }
+
+    print(f"{'endpoint':<15} {'reqs':>7} {'err':>5} {'shed':>6} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, row in endpoints.items():
+        print(
+            f"{name:<15} {row['requests']:>7} {row['errors']:>5} {row['shed']:>6} {row['rps']:>9} "
+            f"{row['p50_ms']:>8}ms {row['p95_ms']:>8}ms {row['p99_ms']:>8}ms"
+        )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            failures = compare(result, json.load(f), args.max_regression)
+        for line in failures:
+            print(f"REGRESSION {line}")
+        return 1 if failures else 0
+
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="RupeeWave load driver")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.005, help="fake DB latency per call (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--backend", choices=["supabase", "memory"], default="supabase")
+    parser.add_argument("--only", nargs="*", help="restrict to these scenarios")
+    parser.add_argument("--history-rows", type=int, default=0, help="history rows on the last account (history_export)")
+    parser.add_argument("--no-admission", dest="admission", action="store_false",
+                        help="disable admission control for in-process runs")
+    parser.add_argument("--base-url", help="hit a running server instead of the in-process app")
+    parser.add_argument("--token", help="atm_token cookie for --base-url runs")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    return asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
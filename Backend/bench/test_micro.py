@@ -0,0 +1,238 @@
+# bench/test_micro.py
+#
+# Micro-benchmarks, run with:
+#   pytest bench/test_micro.py --benchmark-json=bench_micro.json
+#   pytest bench/test_micro.py --benchmark-compare=0001 --benchmark-compare-fail=mean:10%
+
+import itertools
+import os
+import tracemalloc
+
+import pytest
+from bcrypt import hashpw, gensalt, checkpw
+
+from fastapi.encoders import jsonable_encoder
+
+from conftest import HISTORY_ROWS
+from harness import BENCH_PIN, account_no
+from app.utils.jwt_tools import make_access, decode_token
+from app.schemas.account_schemas import CreateAccountRequest
+from app.schemas.transaction_schemas import TransferRequest
+from app.schemas.update_schemas import UpdateEmailRequest
+from app.utils.json_tools import dumps
+
+
+# -------- JWT --------
+def test_jwt_make_access(benchmark):
+    benchmark(make_access, "42", "teller")
+
+
+def test_jwt_decode(benchmark):
+    token = make_access("42", "teller")
+    claims = benchmark(decode_token, token)
+    assert claims["sub"] == "42"
+
+
+# -------- bcrypt (production cost factor) --------
+def test_bcrypt_hash(benchmark):
+    benchmark.pedantic(hashpw, args=(BENCH_PIN.encode(), gensalt()), rounds=5)
+
+
+def test_bcrypt_verify(benchmark):
+    hashed = hashpw(BENCH_PIN.encode(), gensalt())
+    ok = benchmark.pedantic(checkpw, args=(BENCH_PIN.encode(), hashed), rounds=5)
+    assert ok
+
+
+# -------- Schemas --------
+def test_schema_create_account(benchmark):
+    payload = {
+        "holder_name": "Bench User",
+        "pin": "1234",
+        "vpin": "1234",
+        "mobileno": "9999999999",
+        "gmail": "bench@example.com",
+    }
+    benchmark(CreateAccountRequest.model_validate, payload)
+
+
+def test_schema_transfer(benchmark):
+    payload = {"acc_no": "AC0000000001", "rec_acc_no": "AC0000000002", "pin": "1234", "amount": 10}
+    benchmark(TransferRequest.model_validate, payload)
+
+
+def test_schema_update_email(benchmark):
+    payload = {"acc_no": "AC0000000001", "pin": "1234", "oemail": "a@example.com", "nemail": "b@example.com"}
+    benchmark(UpdateEmailRequest.model_validate, payload)
+
+
+# -------- JSON encoding (history-sized payloads) --------
+def _history_rows():
+    return [
+        {"id": n, "account_no": account_no(1), "action": "deposit", "amount": n,
+         "context": {"channel": "bench"}, "created_at": "2025-01-01T00:00:00+00:00"}
+        for n in range(HISTORY_ROWS)
+    ]
+
+
+def test_json_history_generic_encoder(benchmark):
+    import json
+    payload = {"history": _history_rows()}
+    benchmark(lambda: json.dumps(jsonable_encoder(payload)).encode())
+
+
+def test_json_history_fast_encoder(benchmark):
+    payload = {"history": _history_rows()}
+    benchmark(dumps, payload)
+
+
+# -------- Repository calls (query build + PostgREST round trip, no latency) --------
+def _alloc_peak(fn, calls=20) -> int:
+    """Largest transient allocation (bytes) of a single call."""
+    tracemalloc.start()
+    try:
+        worst = 0
+        for _ in range(calls):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            worst = max(worst, tracemalloc.get_traced_memory()[1] - before)
+        return worst
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture(scope="module")
+def bench_repo(bench_env):
+    from app.services.repository import get_repository
+    return get_repository()
+
+
+@pytest.mark.parametrize("op", [
+    "accounts.get", "accounts.update", "accounts.deposit", "accounts.open", "users.get_role", "audit.add",
+])
+def test_repo_call(benchmark, bench_repo, op):
+    ac = account_no(1)
+    new_accounts = itertools.count(10**9)
+    fn = {
+        "accounts.get": lambda: bench_repo.accounts.get(ac, "balance"),
+        "accounts.update": lambda: bench_repo.accounts.update(ac, {"failed_attempts": 0}),
+        "accounts.deposit": lambda: bench_repo.accounts.deposit(ac, 1),
+        "accounts.open": lambda: bench_repo.accounts.open({
+            "account_no": f"AC{next(new_accounts)}", "name": "Bench User", "pin": "x",
+            "mobileno": "9999999999", "gmail": "open@bench.local",
+        }),
+        "users.get_role": lambda: bench_repo.users.get_role("1"),
+        "audit.add": lambda: bench_repo.audit.add({"actor": ac, "action": "bench", "details": "-"}),
+    }[op]
+    benchmark.extra_info["alloc_peak_bytes"] = _alloc_peak(fn)
+    benchmark(fn)
+
+
+# -------- Request pipeline over the fake backend --------
+def test_request_noop(benchmark, bench_client):
+    # No DB, no auth: isolates middleware + routing overhead
+    res = benchmark(bench_client.get, "/health/live")
+    assert res.status_code == 200
+
+
+def test_request_auth_check(benchmark, bench_client):
+    res = benchmark(bench_client.get, "/auth/check")
+    assert res.status_code == 200
+
+
+def test_request_deposit(benchmark, bench_client):
+    body = {"acc_no": account_no(1), "pin": BENCH_PIN, "amount": 1}
+    res = benchmark(bench_client.post, "/transaction/deposit", json=body)
+    assert res.status_code == 200
+
+
+def test_request_history(benchmark, bench_client):
+    res = benchmark(bench_client.get, f"/history/{account_no(1)}", params={"pin": BENCH_PIN})
+    assert res.status_code == 200
+
+
+def test_request_history_large(benchmark, bench_client):
+    res = benchmark(bench_client.get, f"/history/{account_no(10)}", params={"pin": BENCH_PIN})
+    assert len(res.json()["history"]) == HISTORY_ROWS
+
+
+# -------- Account search index (memory backend) --------
+SEARCH_ACCOUNTS = int(os.environ.get("BENCH_SEARCH_ACCOUNTS", "100000"))
+
+_SYLLABLES = ["a", "ra", "vi", "ka", "ma", "ni", "sha", "pri", "ya", "deep", "an", "ku",
+              "su", "re", "sh", "la", "ti", "ro", "han", "me", "na", "jay", "ar", "jun"]
+_SURNAMES = ["sharma", "verma", "patel", "reddy", "nair", "iyer", "gupta", "singh", "das",
+             "rao", "menon", "joshi", "kumar", "pillai", "bose", "khan", "mehta", "shah",
+             "chopra", "kapoor", "malhotra", "bhat", "naidu", "mishra", "pandey", "yadav"]
+
+
+@pytest.fixture(scope="module")
+def search_index():
+    import random
+    from app.services.account_search import AccountSearchIndex
+
+    rnd = random.Random(7)
+    rows = []
+    for n in range(SEARCH_ACCOUNTS):
+        first = "".join(rnd.choice(_SYLLABLES) for _ in range(rnd.randint(2, 3)))
+        last = rnd.choice(_SURNAMES)
+        rows.append({
+            "account_no": f"AC{1000000000 + n}",
+            "name": f"{first.title()} {last.title()}",
+            "mobileno": str(9000000000 + rnd.randrange(10 ** 9)),
+            "gmail": f"{first}.{last}{n}@mail.com",
+        })
+    index = AccountSearchIndex()
+    index.bulk_load(rows)
+    return index
+
+
+@pytest.mark.parametrize("query", ["prisha", "prisha sharma", "prihsa sahrma", "98765", "ac1000001", "prisha.sharma1@mial"])
+def test_account_search(benchmark, search_index, query):
+    benchmark.extra_info["accounts"] = SEARCH_ACCOUNTS
+    benchmark(search_index.search, query, 20)
+
+
+# -------- Ledger reconciliation (history pages from memory, no backend) --------
+LEDGER_ROWS = int(os.environ.get("BENCH_LEDGER_ROWS", "500000"))
+LEDGER_ACCOUNTS = 20000
+
+
+@pytest.fixture(scope="module")
+def ledger_repo():
+    import random
+    from types import SimpleNamespace
+
+    rnd = random.Random(11)
+    numbers = [f"AC{1000000000 + n}" for n in range(LEDGER_ACCOUNTS)]
+    history, balances = [], dict.fromkeys(numbers, 0)
+    while len(history) < LEDGER_ROWS:
+        ac, amount = rnd.choice(numbers), rnd.randint(1, 5000)
+        if rnd.random() < 0.7:
+            history.append({"id": len(history) + 1, "account_no": ac, "action": "deposit", "amount": amount, "context": None})
+            balances[ac] += amount
+        else:
+            to = rnd.choice(numbers)
+            history.append({"id": len(history) + 1, "account_no": ac, "action": "transfer_out", "amount": amount, "context": {"to": to}})
+            history.append({"id": len(history) + 1, "account_no": to, "action": "transfer_in", "amount": amount, "context": {"from": ac}})
+            balances[ac] -= amount
+            balances[to] += amount
+    accounts = [{"account_no": n, "balance": balances[n]} for n in numbers]
+    position = {n: i for i, n in enumerate(numbers)}
+    return SimpleNamespace(
+        history=SimpleNamespace(scan=lambda after, limit: history[after:after + limit]),
+        accounts=SimpleNamespace(scan_balances=lambda after, limit: accounts[position[after] + 1 if after else 0:][:limit]),
+    )
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_reconcile(benchmark, ledger_repo, engine):
+    from app.services.reconciliation import Reconciler
+
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    reconciler = Reconciler(ledger_repo, chunk_size=50000, settle=0, vectorized=engine == "numpy")
+    report = benchmark.pedantic(reconciler.run, rounds=3)
+    benchmark.extra_info["rows_per_second"] = int(report["history_rows"] / report["seconds"])
+    assert report["mismatches"] == report["orphan_transfers"] == []
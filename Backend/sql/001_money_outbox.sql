@@ -0,0 +1,114 @@
+-- sql/001_money_outbox.sql
+--
+-- Transactional outbox for committed money movements.
+--
+-- The money RPCs below write their outbox rows in the same transaction as
+-- the balance change, so an event exists if and only if the movement
+-- committed. A single relay (app/core/outbox.py) reads undelivered rows in
+-- id order and marks them delivered after the sink accepts them.
+--
+-- Per-account ordering: every movement locks the account row before it
+-- inserts its outbox row, so for one account, id order is commit order.
+
+create table if not exists money_outbox (
+    id            bigserial primary key,
+    account_no    text        not null,
+    kind          text        not null,   -- deposit | withdraw | transfer_out | transfer_in
+    amount        bigint      not null,
+    balance       bigint      not null,   -- balance after the movement
+    counterparty  text,
+    created_at    timestamptz not null default now(),
+    delivered_at  timestamptz
+);
+
+-- The relay only ever scans the undelivered tail
+create index if not exists money_outbox_pending_idx
+    on money_outbox (id) where delivered_at is null;
+
+
+-- -------------------- MONEY RPCs --------------------
+-- Error texts are matched by the API ("not found", "insufficient", "sender",
+-- "receiver"); keep them stable.
+
+create or replace function deposit_money(ac_no text, amount bigint)
+returns void
+language plpgsql
+as $$
+declare
+    new_balance bigint;
+begin
+    update accounts set balance = balance + amount
+     where account_no = ac_no
+    returning balance into new_balance;
+
+    if not found then
+        raise exception 'Account not found';
+    end if;
+
+    insert into money_outbox (account_no, kind, amount, balance)
+    values (ac_no, 'deposit', amount, new_balance);
+end;
+$$;
+
+
+create or replace function withdraw_money(ac_no text, amount bigint)
+returns void
+language plpgsql
+as $$
+declare
+    new_balance bigint;
+begin
+    update accounts set balance = balance - amount
+     where account_no = ac_no and balance >= amount
+    returning balance into new_balance;
+
+    if not found then
+        if exists (select 1 from accounts where account_no = ac_no) then
+            raise exception 'Insufficient balance';
+        end if;
+        raise exception 'Account not found';
+    end if;
+
+    insert into money_outbox (account_no, kind, amount, balance)
+    values (ac_no, 'withdraw', amount, new_balance);
+end;
+$$;
+
+
+create or replace function transfer_money(from_ac text, to_ac text, amount bigint)
+returns void
+language plpgsql
+as $$
+declare
+    sender_balance   bigint;
+    receiver_balance bigint;
+begin
+    -- Lock both rows in a fixed order so opposite transfers cannot deadlock
+    perform 1 from accounts
+      where account_no in (from_ac, to_ac)
+      order by account_no
+      for update;
+
+    select balance into sender_balance from accounts where account_no = from_ac;
+    if not found then
+        raise exception 'Sender account not found';
+    end if;
+    if not exists (select 1 from accounts where account_no = to_ac) then
+        raise exception 'Receiver account not found';
+    end if;
+    if sender_balance < amount then
+        raise exception 'Insufficient balance';
+    end if;
+
+    update accounts set balance = balance - amount
+     where account_no = from_ac
+    returning balance into sender_balance;
+    update accounts set balance = balance + amount
+     where account_no = to_ac
+    returning balance into receiver_balance;
+
+    insert into money_outbox (account_no, kind, amount, balance, counterparty)
+    values (from_ac, 'transfer_out', amount, sender_balance, to_ac),
+           (to_ac,   'transfer_in',  amount, receiver_balance, from_ac);
+end;
+$$;
@@ -0,0 +1,45 @@
+-- sql/002_history_feed.sql
+--
+-- Live history feed across workers (FEED_CHANNEL=postgres).
+--
+-- Each inserted history row is sent on the `history_feed` channel. NOTIFY is
+-- delivered only when the inserting transaction commits, so listeners never
+-- see a row that was rolled back. Every API worker keeps one LISTEN
+-- connection (app/core/history_feed.py) and fans rows out to its SSE clients.
+--
+-- Payloads are capped at 8000 bytes by Postgres; `context` is dropped from
+-- oversized rows and the client picks it up from GET /history.
+
+create or replace function notify_history_feed() returns trigger
+language plpgsql as $$
+declare
+    payload text;
+begin
+    payload := json_build_object(
+        'id', new.id,
+        'account_no', new.account_no,
+        'action', new.action,
+        'amount', new.amount,
+        'context', new.context,
+        'created_at', new.created_at
+    )::text;
+
+    if octet_length(payload) > 7900 then
+        payload := json_build_object(
+            'id', new.id,
+            'account_no', new.account_no,
+            'action', new.action,
+            'amount', new.amount,
+            'created_at', new.created_at
+        )::text;
+    end if;
+
+    perform pg_notify('history_feed', payload);
+    return null;
+end;
+$$;
+
+drop trigger if exists history_feed_notify on history;
+create trigger history_feed_notify
+    after insert on history
+    for each row execute function notify_history_feed();
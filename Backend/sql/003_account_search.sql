@@ -0,0 +1,91 @@
+-- sql/003_account_search.sql
+--
+-- Teller account search (GET /account/search).
+--
+-- Prefix lookups use btree text_pattern_ops indexes; fuzzy name / email
+-- lookups use GiST trigram indexes, which also serve `<->` nearest-neighbour
+-- ordering, so every branch reads only the first `off + lim` index entries
+-- instead of scoring the whole table. Postgres keeps all of these current on
+-- every insert and update, including the ones made by account creation and
+-- the contact update endpoints.
+--
+-- Ranking must match app/services/account_search.py: prefix hits score 1,
+-- fuzzy hits (email if the term has an @, else name) score similarity()
+-- (>= 0.3), ordered by (score desc, matched key, account_no).
+
+create extension if not exists pg_trgm;
+
+create index if not exists accounts_account_no_prefix_idx on accounts (lower(account_no) text_pattern_ops);
+create index if not exists accounts_mobileno_prefix_idx   on accounts (mobileno text_pattern_ops);
+create index if not exists accounts_name_prefix_idx       on accounts (lower(name) text_pattern_ops);
+create index if not exists accounts_gmail_prefix_idx      on accounts (lower(gmail) text_pattern_ops);
+create index if not exists accounts_name_trgm_idx         on accounts using gist (lower(name) gist_trgm_ops);
+create index if not exists accounts_gmail_trgm_idx        on accounts using gist (lower(gmail) gist_trgm_ops);
+
+
+create or replace function search_accounts(q text, lim int default 20, off int default 0)
+returns table (account_no text, name text, mobileno text, gmail text, score real)
+language plpgsql stable as $$
+declare
+    term    text := lower(regexp_replace(trim(q), '\s+', ' ', 'g'));
+    n       int  := lim + off;
+    pattern text;
+begin
+    if length(term) < 2 then
+        return;
+    end if;
+    -- LIKE metacharacters in the input are literals
+    pattern := replace(replace(replace(term, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+
+    return query
+    with hits as (
+        -- account number
+        (select a.account_no as ac, lower(a.account_no) as key, 1::real as s
+           from accounts a
+          where term ~ '^(ac)?[0-9]+$'
+            and lower(a.account_no) like case when term like 'ac%' then pattern else 'ac' || pattern end
+          order by lower(a.account_no) limit n)
+        union all
+        -- mobile number
+        (select a.account_no, a.mobileno, 1::real
+           from accounts a
+          where term ~ '^[0-9]+$' and a.mobileno like pattern
+          order by a.mobileno limit n)
+        union all
+        -- name / email prefix
+        (select a.account_no, lower(a.name), 1::real
+           from accounts a
+          where term !~ '^(ac)?[0-9]+$' and lower(a.name) like pattern
+          order by lower(a.name) limit n)
+        union all
+        (select a.account_no, lower(a.gmail), 1::real
+           from accounts a
+          where term !~ '^(ac)?[0-9]+$' and lower(a.gmail) like pattern
+          order by lower(a.gmail) limit n)
+        union all
+        -- fuzzy: email when the term has an @, name otherwise
+        (select a.account_no, lower(a.name), similarity(lower(a.name), term)
+           from accounts a
+          where term !~ '^(ac)?[0-9]+$' and length(term) >= 3 and position('@' in term) = 0
+            and lower(a.name) % term
+          order by lower(a.name) <-> term limit n)
+        union all
+        (select a.account_no, lower(a.gmail), similarity(lower(a.gmail), term)
+           from accounts a
+          where term !~ '^(ac)?[0-9]+$' and length(term) >= 3 and position('@' in term) > 0
+            and lower(a.gmail) % term
+          order by lower(a.gmail) <-> term limit n)
+    ),
+    best as (
+        select distinct on (h.ac) h.ac, h.key, h.s
+          from hits h
+         where h.s >= 0.3
+         order by h.ac, h.s desc, h.key
+    )
+    select a.account_no, a.name, a.mobileno, a.gmail, b.s
+      from best b
+      join accounts a on a.account_no = b.ac
+     order by b.s desc, b.key, b.ac
+     limit lim offset off;
+end;
+$$;
@@ -0,0 +1,154 @@
+-- sql/004_audit_logs.sql
+--
+-- Queryable audit log (GET /audit/events, GET /audit/counts).
+--
+-- app_audit_logs becomes a table range-partitioned by month on created_at:
+--   - time-range queries and dashboards only touch the months they cover
+--   - retention is `drop table app_audit_logs_yYYYYmMM` instead of a large
+--     DELETE followed by vacuum
+-- Every index is declared on the parent and created on each partition.
+-- Keyset pagination walks (created_at desc, id desc), so each filter has an
+-- index that ends in those two columns and a page is one index range scan.
+--
+-- Run once. It moves the existing rows into the partitioned table; on a
+-- large table, run it in a maintenance window.
+
+begin;
+
+alter table if exists app_audit_logs rename to app_audit_logs_legacy;
+
+create table app_audit_logs (
+    id          bigint generated by default as identity,
+    actor       text        not null,
+    action      text        not null,
+    details     text,
+    ip          text,
+    user_agent  text,
+    created_at  timestamptz not null default now(),
+    primary key (id, created_at)           -- must include the partition key
+) partition by range (created_at);
+
+-- Rows outside every monthly partition land here instead of failing the insert
+create table app_audit_logs_default partition of app_audit_logs default;
+
+create index app_audit_logs_time_idx   on app_audit_logs (created_at desc, id desc);
+create index app_audit_logs_actor_idx  on app_audit_logs (actor, created_at desc, id desc);
+create index app_audit_logs_action_idx on app_audit_logs (action, created_at desc, id desc);
+create index app_audit_logs_ip_idx     on app_audit_logs (ip, created_at desc, id desc);
+
+
+-- -------------------- PARTITION MAINTENANCE --------------------
+-- Creates this month's partition and the next `months_ahead`. Schedule it
+-- daily (pg_cron: select cron.schedule('audit-partitions', '0 3 * * *',
+-- 'select ensure_audit_partitions(3)')).
+create or replace function ensure_audit_partitions(months_ahead int default 3)
+returns void
+language plpgsql
+as $$
+declare
+    month_start date := date_trunc('month', now())::date;
+    part_start  date;
+    part_name   text;
+begin
+    for i in 0..months_ahead loop
+        part_start := (month_start + make_interval(months => i))::date;
+        part_name  := format('app_audit_logs_y%sm%s', to_char(part_start, 'YYYY'), to_char(part_start, 'MM'));
+        if to_regclass(part_name) is null then
+            execute format(
+                'create table %I partition of app_audit_logs for values from (%L) to (%L)',
+                part_name, part_start, (part_start + interval '1 month')::date
+            );
+        end if;
+    end loop;
+end;
+$$;
+
+-- Partitions for the legacy rows, then this month and the next three
+do $$
+declare
+    m date;
+begin
+    if to_regclass('app_audit_logs_legacy') is not null then
+        for m in
+            select distinct date_trunc('month', created_at)::date from app_audit_logs_legacy
+        loop
+            execute format(
+                'create table if not exists %I partition of app_audit_logs for values from (%L) to (%L)',
+                format('app_audit_logs_y%sm%s', to_char(m, 'YYYY'), to_char(m, 'MM')),
+                m, (m + interval '1 month')::date
+            );
+        end loop;
+    end if;
+end;
+$$;
+
+select ensure_audit_partitions(3);
+
+insert into app_audit_logs (id, actor, action, details, ip, user_agent, created_at)
+select id, actor, action, details, ip, user_agent, created_at
+  from app_audit_logs_legacy;
+
+select setval(
+    pg_get_serial_sequence('app_audit_logs', 'id'),
+    coalesce((select max(id) from app_audit_logs), 0) + 1,
+    false
+);
+
+drop table app_audit_logs_legacy;
+
+commit;
+
+
+-- -------------------- QUERY RPCs --------------------
+-- Plain SQL functions so the planner inlines them: a null filter folds away
+-- and the remaining predicates pick the matching index.
+
+-- One page, newest first. Pass the last row's (created_at, id) as
+-- (after_ts, after_id) for the next page.
+create or replace function audit_events(
+    p_actor    text        default null,
+    p_action   text        default null,
+    p_ip       text        default null,
+    p_since    timestamptz default null,
+    p_until    timestamptz default null,
+    p_after_ts timestamptz default null,
+    p_after_id bigint      default null,
+    p_limit    int         default 50
+)
+returns setof app_audit_logs
+language sql stable
+as $$
+    select *
+      from app_audit_logs
+     where (p_actor  is null or actor  = p_actor)
+       and (p_action is null or action = p_action)
+       and (p_ip     is null or ip     = p_ip)
+       and (p_since  is null or created_at >= p_since)
+       and (p_until  is null or created_at <  p_until)
+       and (p_after_ts is null or (created_at, id) < (p_after_ts, p_after_id))
+     order by created_at desc, id desc
+     limit p_limit;
+$$;
+
+
+-- Events per action per bucket ('minute' | 'hour' | 'day' | 'week' |
+-- 'month'), aggregated in the database; only the counts leave it.
+create or replace function audit_action_counts(
+    p_bucket text,
+    p_since  timestamptz,
+    p_until  timestamptz,
+    p_actor  text default null,
+    p_action text default null
+)
+returns table (bucket timestamptz, action text, events bigint)
+language sql stable
+as $$
+    select date_trunc(p_bucket, l.created_at) as bucket, l.action, count(*) as events
+      from app_audit_logs l
+     where l.created_at >= p_since
+       and l.created_at <  p_until
+       and (p_actor  is null or l.actor  = p_actor)
+       and (p_action is null or l.action = p_action)
+     group by 1, 2
+     order by 1, 2;
+$$;
@@ -0,0 +1,107 @@
+-- sql/005_money_rpc_balance.sql
+--
+-- The money RPCs return the balance they just wrote (the sender's for a
+-- transfer), so the API no longer reads the account again to report it.
+-- Bodies are unchanged from sql/001_money_outbox.sql apart from the return.
+--
+-- A return type cannot be changed in place, so the functions are dropped and
+-- recreated in one transaction; callers never see them missing. Until this
+-- runs, the API falls back to a balance lookup when an RPC returns nothing.
+
+begin;
+
+drop function if exists deposit_money(text, bigint);
+drop function if exists withdraw_money(text, bigint);
+drop function if exists transfer_money(text, text, bigint);
+
+
+create or replace function deposit_money(ac_no text, amount bigint)
+returns bigint
+language plpgsql
+as $$
+declare
+    new_balance bigint;
+begin
+    update accounts set balance = balance + amount
+     where account_no = ac_no
+    returning balance into new_balance;
+
+    if not found then
+        raise exception 'Account not found';
+    end if;
+
+    insert into money_outbox (account_no, kind, amount, balance)
+    values (ac_no, 'deposit', amount, new_balance);
+
+    return new_balance;
+end;
+$$;
+
+
+create or replace function withdraw_money(ac_no text, amount bigint)
+returns bigint
+language plpgsql
+as $$
+declare
+    new_balance bigint;
+begin
+    update accounts set balance = balance - amount
+     where account_no = ac_no and balance >= amount
+    returning balance into new_balance;
+
+    if not found then
+        if exists (select 1 from accounts where account_no = ac_no) then
+            raise exception 'Insufficient balance';
+        end if;
+        raise exception 'Account not found';
+    end if;
+
+    insert into money_outbox (account_no, kind, amount, balance)
+    values (ac_no, 'withdraw', amount, new_balance);
+
+    return new_balance;
+end;
+$$;
+
+
+create or replace function transfer_money(from_ac text, to_ac text, amount bigint)
+returns bigint
+language plpgsql
+as $$
+declare
+    sender_balance   bigint;
+    receiver_balance bigint;
+begin
+    -- Lock both rows in a fixed order so opposite transfers cannot deadlock
+    perform 1 from accounts
+      where account_no in (from_ac, to_ac)
+      order by account_no
+      for update;
+
+    select balance into sender_balance from accounts where account_no = from_ac;
+    if not found then
+        raise exception 'Sender account not found';
+    end if;
+    if not exists (select 1 from accounts where account_no = to_ac) then
+        raise exception 'Receiver account not found';
+    end if;
+    if sender_balance < amount then
+        raise exception 'Insufficient balance';
+    end if;
+
+    update accounts set balance = balance - amount
+     where account_no = from_ac
+    returning balance into sender_balance;
+    update accounts set balance = balance + amount
+     where account_no = to_ac
+    returning balance into receiver_balance;
+
+    insert into money_outbox (account_no, kind, amount, balance, counterparty)
+    values (from_ac, 'transfer_out', amount, sender_balance, to_ac),
+           (to_ac,   'transfer_in',  amount, receiver_balance, from_ac);
+
+    return sender_balance;
+end;
+$$;
+
+commit;
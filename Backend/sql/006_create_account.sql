@@ -0,0 +1,35 @@
+-- sql/006_create_account.sql
+--
+-- Account opening as one RPC. The customer login (users row, user_name =
+-- account number, password = PIN hash) and the accounts row are inserted by
+-- one function call, so they commit together or not at all: a failed account
+-- insert can no longer leave an orphan user behind, and opening an account
+-- is one round trip instead of an insert, an insert and a compensating
+-- delete on failure.
+--
+-- A taken account number raises the usual unique violation (23505); the API
+-- draws a new number and calls again.
+
+create or replace function create_account(
+    p_account_no text,
+    p_name       text,
+    p_pin        text,
+    p_mobileno   text,
+    p_gmail      text
+)
+returns json
+language plpgsql
+as $$
+declare
+    new_user_id users.id%type;
+begin
+    insert into users (user_name, password, role)
+    values (p_account_no, p_pin, 'customer')
+    returning id into new_user_id;
+
+    insert into accounts (account_no, name, pin, mobileno, gmail, failed_attempts, is_locked, user_id)
+    values (p_account_no, p_name, p_pin, p_mobileno, p_gmail, 0, false, new_user_id);
+
+    return json_build_object('account_no', p_account_no, 'user_id', new_user_id);
+end;
+$$;
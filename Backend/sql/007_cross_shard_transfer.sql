@@ -0,0 +1,138 @@
+-- sql/007_cross_shard_transfer.sql
+--
+-- Participant side of cross-shard transfers (app/services/sharding.py).
+-- Run on every shard.
+--
+-- A transfer between accounts on two shards is split into two legs, one per
+-- shard, each a row in transfer_log:
+--
+--   1. prepare 'out' on the sender's shard   -> debits the sender (funds held)
+--   2. prepare 'in'  on the receiver's shard -> checks the receiver exists
+--   3. resolve 'out' as committed            -> the commit point
+--   4. resolve 'in'  as committed            -> credits the receiver
+--
+-- Any failure before step 3 resolves both legs as aborted (the debit is
+-- refunded). transfer_log is also the recovery log: a leg still 'prepared'
+-- after a crash is settled by the recovery loop, which follows the sender's
+-- leg ('committed' -> commit, anything else -> abort). Every function is
+-- idempotent on (txid, direction), so recovery and a slow coordinator may
+-- race safely: the first resolution wins and the other sees its result.
+
+create table if not exists transfer_log (
+    txid          text        not null,
+    direction     text        not null check (direction in ('out', 'in')),
+    account_no    text        not null,
+    counterparty  text        not null,
+    amount        bigint      not null check (amount > 0),
+    state         text        not null default 'prepared'
+                              check (state in ('prepared', 'committed', 'aborted')),
+    created_at    timestamptz not null default now(),
+    resolved_at   timestamptz,
+    primary key (txid, direction)
+);
+
+-- Recovery only ever scans unresolved legs
+create index if not exists transfer_log_prepared_idx
+    on transfer_log (created_at) where state = 'prepared';
+
+
+-- Returns the sender's balance after the debit for 'out', null for 'in'.
+create or replace function transfer_prepare(
+    p_txid         text,
+    p_direction    text,
+    p_account_no   text,
+    p_amount       bigint,
+    p_counterparty text
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    new_balance bigint;
+begin
+    if exists (select 1 from transfer_log where txid = p_txid and direction = p_direction) then
+        return (select balance from accounts where account_no = p_account_no);
+    end if;
+
+    if p_direction = 'out' then
+        update accounts set balance = balance - p_amount
+         where account_no = p_account_no and balance >= p_amount
+        returning balance into new_balance;
+
+        if not found then
+            if exists (select 1 from accounts where account_no = p_account_no) then
+                raise exception 'Insufficient balance';
+            end if;
+            raise exception 'Account not found';
+        end if;
+    elsif not exists (select 1 from accounts where account_no = p_account_no) then
+        raise exception 'Account not found';
+    end if;
+
+    insert into transfer_log (txid, direction, account_no, counterparty, amount)
+    values (p_txid, p_direction, p_account_no, p_counterparty, p_amount);
+
+    return new_balance;
+end;
+$$;
+
+
+-- Settles a prepared leg; returns the leg's final state (null if unknown).
+create or replace function transfer_resolve(p_txid text, p_direction text, p_commit boolean)
+returns text
+language plpgsql
+as $$
+declare
+    leg         transfer_log%rowtype;
+    new_balance bigint;
+begin
+    select * into leg from transfer_log
+     where txid = p_txid and direction = p_direction
+       for update;
+
+    if not found then
+        return null;
+    end if;
+    if leg.state <> 'prepared' then
+        return leg.state;
+    end if;
+
+    if p_commit then
+        if leg.direction = 'in' then
+            update accounts set balance = balance + leg.amount
+             where account_no = leg.account_no
+            returning balance into new_balance;
+        else
+            select balance into new_balance from accounts where account_no = leg.account_no;
+        end if;
+
+        insert into money_outbox (account_no, kind, amount, balance, counterparty)
+        values (leg.account_no,
+                case leg.direction when 'out' then 'transfer_out' else 'transfer_in' end,
+                leg.amount, new_balance, leg.counterparty);
+    elsif leg.direction = 'out' then
+        update accounts set balance = balance + leg.amount
+         where account_no = leg.account_no;
+    end if;
+
+    update transfer_log
+       set state = case when p_commit then 'committed' else 'aborted' end,
+           resolved_at = now()
+     where txid = p_txid and direction = p_direction
+    returning state into leg.state;
+
+    return leg.state;
+end;
+$$;
+
+
+-- Prepared legs older than p_seconds, oldest first (recovery input).
+create or replace function transfer_stale_legs(p_seconds double precision)
+returns setof transfer_log
+language sql stable
+as $$
+    select * from transfer_log
+     where state = 'prepared'
+       and created_at < now() - make_interval(secs => p_seconds)
+     order by created_at;
+$$;
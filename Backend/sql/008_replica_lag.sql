@@ -0,0 +1,19 @@
+-- sql/008_replica_lag.sql
+--
+-- Replication lag probe for read-replica routing (app/services/replicas.py).
+-- Run on the primary; replicas receive it through replication.
+--
+-- 0 on a primary, and on a replica that has replayed everything it received
+-- (an idle primary would otherwise look like a growing lag); otherwise the
+-- age of the last replayed transaction.
+
+create or replace function replica_lag_seconds()
+returns double precision
+language sql stable
+as $$
+    select case
+        when not pg_is_in_recovery() then 0
+        when pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() then 0
+        else coalesce(extract(epoch from now() - pg_last_xact_replay_timestamp()), 0)
+    end;
+$$;
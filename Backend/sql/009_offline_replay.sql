@@ -0,0 +1,52 @@
+-- sql/009_offline_replay.sql
+--
+-- Exactly-once posting of money operations taken offline by an ATM terminal
+-- (app/core/offline.py). The terminal journals each operation with an
+-- idempotency key and replays it here once the database is reachable; a
+-- replay after a crash (applied, but the local ack never written) finds the
+-- key and returns the original result instead of posting twice.
+
+create table if not exists applied_requests (
+    key         text        primary key,
+    account_no  text        not null,
+    kind        text        not null check (kind in ('deposit', 'withdraw')),
+    amount      bigint      not null,
+    balance     bigint,
+    created_at  timestamptz not null default now()
+);
+
+
+-- Returns {"balance": <after the operation>, "duplicate": <key seen before>};
+-- a known key with another account, kind or amount is an error, not a duplicate.
+-- Two concurrent calls with one key: the loser's insert violates the
+-- primary key and rolls back its own money operation.
+create or replace function apply_once(p_key text, p_kind text, p_account_no text, p_amount bigint)
+returns json
+language plpgsql
+as $$
+declare
+    prev        applied_requests%rowtype;
+    new_balance bigint;
+begin
+    select * into prev from applied_requests where key = p_key;
+    if found then
+        if (prev.account_no, prev.kind, prev.amount) is distinct from (p_account_no, p_kind, p_amount) then
+            raise exception 'Idempotency key % was used for a different operation', p_key;
+        end if;
+        return json_build_object('balance', prev.balance, 'duplicate', true);
+    end if;
+
+    if p_kind = 'deposit' then
+        new_balance := deposit_money(p_account_no, p_amount);
+    elsif p_kind = 'withdraw' then
+        new_balance := withdraw_money(p_account_no, p_amount);
+    else
+        raise exception 'Unknown operation %', p_kind;
+    end if;
+
+    insert into applied_requests (key, account_no, kind, amount, balance)
+    values (p_key, p_account_no, p_kind, p_amount, new_balance);
+
+    return json_build_object('balance', new_balance, 'duplicate', false);
+end;
+$$;
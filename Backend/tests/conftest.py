@@ -13,3 +13,25 @@ from Backend.app.main import app
 @pytest.fixture(scope="session")
 def client():
     return TestClient(app)
+
+
+@pytest.fixture
+def memory_client(client, monkeypatch):
+    """Shared client wired to a fresh in-memory backend, logged in as admin."""
+    from bcrypt import hashpw, gensalt
+    from app.config import settings
+    from app.services import repository
+    from app.utils.jwt_tools import make_access
+
+    monkeypatch.setattr(settings, "DATA_BACKEND", "memory")
+    monkeypatch.setattr(repository, "_memory_repo", None)
+
+    repo = repository.get_repository()
+    admin = repo.users.insert({
+        "user_name": "admin",
+        "password": hashpw(b"admin", gensalt(4)).decode(),
+        "role": "admin",
+    })
+    client.cookies.set("atm_token", make_access(str(admin["id"]), "admin"))
+    yield client
+    client.cookies.clear()
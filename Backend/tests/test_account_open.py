@@ -0,0 +1,50 @@
+import pytest
+
+from app.services import account_service
+from app.services.memory_repository import InMemoryRepository
+from app.services.repository import DuplicateError
+
+
+def _row(ac_no):
+    return {"account_no": ac_no, "name": "Open User", "pin": "hash", "mobileno": "9999999999", "gmail": "o@mail.com"}
+
+
+def test_open_creates_user_and_account_together():
+    repo = InMemoryRepository()
+    created = repo.accounts.open(_row("AC1"))
+
+    user = repo.users.get_by_name("AC1")
+    assert created == {"account_no": "AC1", "user_id": user["id"]}
+    assert user["role"] == "customer" and user["password"] == "hash"
+    assert repo.accounts.get("AC1", "user_id, balance, is_locked") == {"user_id": user["id"], "balance": 0, "is_locked": False}
+
+
+def test_conflict_leaves_no_orphan_rows():
+    repo = InMemoryRepository()
+    # Account number already taken by a login that has no account
+    repo.users.insert({"user_name": "AC2", "password": "x", "role": "customer"})
+    repo.accounts.insert({**_row("AC3"), "user_id": None})
+
+    for ac_no in ("AC2", "AC3"):
+        with pytest.raises(DuplicateError):
+            repo.accounts.open(_row(ac_no))
+    assert repo.accounts.get("AC2", "account_no") is None
+    assert repo.users.get_by_name("AC3") is None
+
+
+def test_endpoint_retries_a_taken_account_number(memory_client, monkeypatch):
+    from app.services import repository
+
+    repo = repository.get_repository()
+    repo.accounts.open(_row("AC1000000001"))
+    numbers = iter(["AC1000000001", "AC1000000002"])
+    monkeypatch.setattr(account_service.AuthService, "generate_account_no", lambda self: next(numbers))
+
+    res = memory_client.post("/account/create", json={
+        "holder_name": "Retry User", "pin": "1234", "vpin": "1234",
+        "gmail": "retry@mail.com", "mobileno": "9999999970",
+    })
+    assert res.status_code == 200
+    assert res.json()["account_no"] == "AC1000000002"
+    assert repo.users.get_by_name("AC1000000002")["role"] == "customer"
+
@@ -0,0 +1,69 @@
+from app.services.account_search import AccountSearchIndex, similarity, trigrams
+
+
+def _index(*rows):
+    index = AccountSearchIndex()
+    for n, (name, mobile, gmail) in enumerate(rows):
+        index.upsert({"account_no": f"AC{1000000000 + n}", "name": name, "mobileno": mobile, "gmail": gmail})
+    return index
+
+
+def test_trigram_similarity_matches_pg_trgm():
+    # SELECT similarity('word', 'two words') -> 0.363636
+    assert round(similarity(trigrams("word"), trigrams("two words")), 6) == 0.363636
+
+
+def test_prefix_fuzzy_and_number_lookup():
+    index = _index(
+        ("Alice Smith", "9876500001", "alice@mail.com"),
+        ("Alicia Keys", "9876500002", "keys@mail.com"),
+        ("Bob Stone", "9123400003", "bob@mail.com"),
+    )
+    assert [h[0] for h in index.search("ALI", 10)] == ["AC1000000000", "AC1000000001"]
+    assert index.search("alise smith", 10)[0][0] == "AC1000000000"
+    assert [h[0] for h in index.search("91234", 10)] == ["AC1000000002"]
+    assert [h[0] for h in index.search("ac100000000", 10)] == ["AC1000000000", "AC1000000001", "AC1000000002"]
+    assert index.search("zz", 10) == []
+
+
+def test_update_reindexes_and_pages_are_stable():
+    index = _index(*[(f"Carol {n:02d}", f"90000000{n:02d}", f"c{n}@mail.com") for n in range(30)])
+    index.upsert({"account_no": "AC1000000000", "name": "Zed", "mobileno": "9000000000", "gmail": "z@mail.com"})
+    assert all(h[0] != "AC1000000000" for h in index.search("carol", 50))
+
+    everything = index.search("carol", 50)
+    pages = index.search("carol", 10) + index.search("carol", 10, 10) + index.search("carol", 10, 20)
+    assert pages == everything[:30]
+
+
+def test_search_endpoint(memory_client):
+    created = []
+    for n, name in enumerate(["Priya Raman", "Priyanka Das", "Rahul Verma"]):
+        res = memory_client.post("/account/create", json={
+            "holder_name": name,
+            "pin": "1234",
+            "vpin": "1234",
+            "gmail": f"user{n}@mail.com",
+            "mobileno": f"98765432{n:02d}",
+        })
+        created.append(res.json()["account_no"])
+
+    res = memory_client.get("/account/search", params={"q": "priy", "limit": 1})
+    body = res.json()
+    assert res.status_code == 200
+    assert body["results"][0]["account_no"] == created[0]
+    assert body["next_offset"] == 1
+    assert "pin" not in body["results"][0]
+
+    # Typo still finds the holder
+    assert memory_client.get("/account/search", params={"q": "rahol verma"}).json()["results"][0]["account_no"] == created[2]
+
+    # Contact updates are searchable straight away
+    res = memory_client.put("/update/update-mobile", json={
+        "acc_no": created[1], "pin": "1234", "omobile": "9876543201", "nmobile": "9111111111",
+    })
+    assert res.status_code == 200
+    hits = memory_client.get("/account/search", params={"q": "91111"}).json()["results"]
+    assert [h["account_no"] for h in hits] == [created[1]]
+
+    assert memory_client.get("/account/search", params={"q": "a"}).status_code == 400
@@ -0,0 +1,95 @@
+import asyncio
+
+from app.core.admission import AdmissionMiddleware, GradientLimit, CRITICAL, BULK, EXEMPT
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _windows(limit, clock, rtt, inflight, n):
+    for _ in range(n):
+        clock.now += limit.window
+        limit.observe(rtt, inflight)
+
+
+def test_limit_shrinks_when_latency_rises_and_recovers():
+    clock = _Clock()
+    limit = GradientLimit(initial=100, min_limit=8, max_limit=400, clock=clock)
+    _windows(limit, clock, 0.01, 90, 20)
+    steady = limit.limit
+    assert steady > 100                    # saturated at flat latency: probe upwards
+
+    _windows(limit, clock, 0.08, 90, 20)   # queueing
+    assert limit.limit < steady / 2
+
+    low = limit.limit
+    _windows(limit, clock, 0.01, int(low), 40)
+    assert limit.limit > low
+
+
+def test_idle_traffic_does_not_inflate_the_limit():
+    clock = _Clock()
+    limit = GradientLimit(initial=50, clock=clock)
+    _windows(limit, clock, 0.01, 2, 50)
+    assert limit.limit == 50
+
+
+def _call(app, path):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        await app({"type": "http", "method": "GET", "path": path, "headers": []}, receive, send)
+        return sent[0]
+
+    return run()
+
+
+def test_low_priority_is_shed_first():
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    gate = AdmissionMiddleware(
+        slow_app,
+        priorities={"/transaction": CRITICAL, "/history": BULK, "/health": EXEMPT},
+        limit=GradientLimit(initial=4, min_limit=4, max_limit=4),
+        retry_after=2,
+    )
+
+    async def run():
+        held = [asyncio.ensure_future(_call(gate, "/history/AC1")) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert gate.inflight == 2
+
+        shed = await _call(gate, "/history/AC2")          # bulk share (2 of 4) used up
+        assert shed["status"] == 503
+        assert (b"retry-after", b"2") in shed["headers"]
+
+        held += [asyncio.ensure_future(_call(gate, p)) for p in (
+            "/transaction/deposit", "/transaction/withdraw", "/history/AC1/stream", "/health/live",
+        )]
+        await asyncio.sleep(0)
+        assert gate.inflight == 4                         # stream and probe are not counted
+
+        assert (await _call(gate, "/account/balance/AC1"))["status"] == 503   # normal: 4 >= 0.8 * 4
+        assert (await _call(gate, "/transaction/transfer"))["status"] == 503  # the limit itself
+
+        release.set()
+        assert [m["status"] for m in await asyncio.gather(*held)] == [200] * 6
+        assert gate.inflight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, UTC
+
+from app.services import repository
+from app.services.audit_service import decode_cursor, encode_cursor
+from app.utils.time_tools import truncate
+
+
+def _seed():
+    db = repository.get_repository()
+    for n in range(7):
+        db.audit.add({"actor": "AC1", "action": "pin_failed", "details": str(n), "ip": "10.0.0.1", "user_agent": "t"})
+    db.audit.add({"actor": "AC2", "action": "login", "details": "-", "ip": "10.0.0.2", "user_agent": "t"})
+    return db
+
+
+def test_cursor_round_trip():
+    ts = datetime(2026, 1, 2, 3, 4, 5, tzinfo=UTC)
+    assert decode_cursor(encode_cursor({"created_at": ts.isoformat(), "id": 42})) == (ts, 42)
+
+
+def test_truncate_matches_date_trunc():
+    ts = datetime(2026, 10, 15, 13, 47, 12, tzinfo=UTC)   # a Thursday
+    assert truncate(ts, "hour") == datetime(2026, 10, 15, 13, tzinfo=UTC)
+    assert truncate(ts, "week") == datetime(2026, 10, 12, tzinfo=UTC)
+    assert truncate(ts, "month") == datetime(2026, 10, 1, tzinfo=UTC)
+
+
+def test_events_filter_and_keyset_pages(memory_client):
+    _seed()
+
+    seen, cursor = [], None
+    while True:
+        params = {"actor": "AC1", "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        body = memory_client.get("/audit/events", params=params).json()
+        seen += [e["details"] for e in body["events"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [str(n) for n in reversed(range(7))]
+    only_ip = memory_client.get("/audit/events", params={"ip": "10.0.0.2"}).json()["events"]
+    assert [e["action"] for e in only_ip] == ["login"]
+    assert memory_client.get("/audit/events", params={"cursor": "!!"}).status_code == 400
+
+
+def test_counts_per_bucket(memory_client):
+    _seed()
+    since = (datetime.now(UTC) - timedelta(hours=1)).isoformat()
+
+    body = memory_client.get("/audit/counts", params={"bucket": "day", "since": since}).json()
+    counts = {c["action"]: c["events"] for c in body["counts"]}
+    assert counts["pin_failed"] == 7 and counts["login"] == 1
+
+    assert memory_client.get("/audit/counts", params={"bucket": "minute", "since": "2020-01-01T00:00:00Z"}).status_code == 400
+    assert memory_client.get("/audit/counts", params={"bucket": "year"}).status_code == 400
@@ -0,0 +1,64 @@
+import httpx
+from postgrest import SyncPostgrestClient
+
+from app.services import repository
+from app.services.supabase_repository import SupabaseRepository
+
+
+def _account(client) -> str:
+    res = client.post("/account/create", json={
+        "holder_name": "Contact User",
+        "pin": "1234",
+        "vpin": "1234",
+        "gmail": "contact@mail.com",
+        "mobileno": "9999999970",
+    })
+    return res.json()["account_no"]
+
+
+def test_update_if_is_compare_and_swap(memory_client):
+    ac_no = _account(memory_client)
+    db = repository.get_repository()
+
+    assert db.accounts.update_if(ac_no, {"mobileno": "1111111111"}, {"mobileno": "9000000000"}) == 0
+    assert db.accounts.update_if(ac_no, {"mobileno": "9999999970"}, {"mobileno": "9000000000"}) == 1
+    assert db.accounts.get(ac_no, "mobileno") == {"mobileno": "9000000000"}
+    assert db.accounts.update_if("AC404", {"mobileno": "9000000000"}, {"mobileno": "1"}) == 0
+
+
+def test_stale_old_value_is_a_conflict(memory_client):
+    ac_no = _account(memory_client)
+
+    body = {"acc_no": ac_no, "pin": "1234", "omobile": "9999999970", "nmobile": "9123456780"}
+    assert memory_client.put("/update/update-mobile", json=body).status_code == 200
+
+    # Same request again: the old value no longer matches
+    res = memory_client.put("/update/update-mobile", json=body)
+    assert res.status_code == 409
+    assert res.json()["detail"] == "Old mobile number does not match."
+
+    res = memory_client.put("/update/update-email", json={
+        "acc_no": ac_no, "pin": "1234", "oemail": "wrong@mail.com", "nemail": "new@mail.com",
+    })
+    assert res.status_code == 409
+
+
+def test_postgrest_update_filters_on_old_value():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json=[])
+
+    client = SyncPostgrestClient(
+        "http://db.local/rest/v1",
+        headers={"apiKey": "k", "Authorization": "Bearer k"},
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+    repo = SupabaseRepository(client)
+
+    assert repo.accounts.update_if("AC1", {"gmail": "a@b.c"}, {"gmail": "x@y.z"}) == 0
+    req = seen[0]
+    assert req.method == "PATCH"
+    assert req.url.params["account_no"] == "eq.AC1"
+    assert req.url.params["gmail"] == "eq.a@b.c"
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import tracemalloc
+
+from app.config import settings
+from app.core.history_feed import HistoryFeed, event_stream, RESYNC_EVENT, HEARTBEAT
+
+
+def _account(client) -> str:
+    res = client.post("/account/create", json={
+        "holder_name": "Feed User",
+        "pin": "1234",
+        "vpin": "1234",
+        "gmail": "feed@mail.com",
+        "mobileno": "9999999980",
+    })
+    return res.json()["account_no"]
+
+
+def test_fan_out_only_to_matching_account():
+    async def run():
+        feed = HistoryFeed(queue_size=4)
+        a, b = feed.subscribe("A"), feed.subscribe("B")
+        feed.publish({"id": 1, "account_no": "A"})
+        await asyncio.sleep(0)
+        assert a.queue.get_nowait()["id"] == 1
+        assert b.queue.empty()
+
+        feed.unsubscribe("A", a)
+        feed.unsubscribe("B", b)
+        assert feed.subscribers() == 0
+
+    asyncio.run(run())
+
+
+def test_publish_from_worker_thread():
+    async def run():
+        feed = HistoryFeed()
+        sub = feed.subscribe("A")
+        t = threading.Thread(target=feed.publish, args=({"id": 7, "account_no": "A"},))
+        t.start()
+        row = await asyncio.wait_for(sub.queue.get(), 1)
+        t.join()
+        assert row["id"] == 7
+
+    asyncio.run(run())
+
+
+def test_slow_subscriber_gets_resync_not_unbounded_queue():
+    async def run():
+        feed = HistoryFeed(queue_size=2)
+        stream = event_stream(feed, "A", heartbeat=5)
+        assert await stream.__anext__() == b"retry: 3000\n\n"
+
+        for n in range(10):
+            feed.publish({"id": n, "account_no": "A"})
+        await asyncio.sleep(0)
+        (sub,) = feed._subs["A"]
+        assert sub.queue.qsize() <= 2
+
+        assert await stream.__anext__() == RESYNC_EVENT
+        feed.publish({"id": 11, "account_no": "A"})
+        assert (await stream.__anext__()).startswith(b"id: 11\n")
+        await stream.aclose()
+        assert feed.subscribers() == 0
+
+    asyncio.run(run())
+
+
+def test_idle_subscribers_are_cheap():
+    async def run():
+        feed = HistoryFeed(queue_size=32)
+        streams = []
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for n in range(2000):
+            stream = event_stream(feed, f"AC{n % 100}", heartbeat=60)
+            await stream.__anext__()
+            streams.append(stream)
+        per_sub = (tracemalloc.get_traced_memory()[0] - before) / 2000
+        tracemalloc.stop()
+
+        assert feed.subscribers() == 2000
+        assert per_sub < 8192
+        for stream in streams:
+            await stream.aclose()
+        assert feed.subscribers() == 0
+
+    asyncio.run(run())
+
+
+def test_stream_endpoint_replays_and_heartbeats(memory_client, monkeypatch):
+    # The TestClient reads the whole body, so let the stream end on its own
+    monkeypatch.setattr(settings, "FEED_HEARTBEAT_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "FEED_MAX_STREAM_SECONDS", 0.2)
+    ac_no = _account(memory_client)
+    memory_client.post("/transaction/deposit", json={"acc_no": ac_no, "pin": "1234", "amount": 50})
+
+    res = memory_client.get(
+        f"/history/{ac_no}/stream", params={"pin": "1234"},
+        headers={"Last-Event-ID": "0", "Accept-Encoding": "gzip"},
+    )
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in res.headers
+
+    lines = res.text.splitlines()
+    assert "event: history" in lines
+    assert any(line.startswith("data: ") and '"deposit"' in line for line in lines)
+    assert HEARTBEAT.decode().strip() in lines
+
+
+def test_stream_requires_pin(memory_client):
+    ac_no = _account(memory_client)
+    res = memory_client.get(f"/history/{ac_no}/stream", params={"pin": "0000"})
+    assert res.status_code == 400
+
+
+def test_add_entry_publishes_committed_row(memory_client):
+    from app.core.history_feed import get_feed
+    from app.services import repository
+    from app.services.history_service import HistoryService
+
+    db = repository.get_repository()
+
+    async def run():
+        feed = get_feed()
+        sub = feed.subscribe("ACX")
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, HistoryService().add_entry, db, "ACX", "deposit", 10
+            )
+            row = await asyncio.wait_for(sub.queue.get(), 1)
+        finally:
+            feed.unsubscribe("ACX", sub)
+        assert row["id"] is not None and row["amount"] == 10
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+from app.core.compression import choose_encoding
+from app.services import repository
+
+
+def _account(client) -> str:
+    res = client.post("/account/create", json={
+        "holder_name": "Cache User",
+        "pin": "1234",
+        "vpin": "1234",
+        "gmail": "cache@mail.com",
+        "mobileno": "9999999990",
+    })
+    return res.json()["account_no"]
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") == ""
+    assert choose_encoding("") == ""
+
+
+def test_history_etag_and_304(memory_client):
+    ac_no = _account(memory_client)
+    memory_client.post("/transaction/deposit", json={"acc_no": ac_no, "pin": "1234", "amount": 50})
+
+    first = memory_client.get(f"/history/{ac_no}", params={"pin": "1234"})
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    again = memory_client.get(f"/history/{ac_no}", params={"pin": "1234"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+    memory_client.post("/transaction/deposit", json={"acc_no": ac_no, "pin": "1234", "amount": 5})
+    changed = memory_client.get(f"/history/{ac_no}", params={"pin": "1234"}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_balance_conditional_get_still_checks_pin(memory_client):
+    ac_no = _account(memory_client)
+    res = memory_client.get(f"/account/balance/{ac_no}", params={"pin": "1234"})
+    assert res.json() == {"account_no": ac_no, "balance": 0}
+
+    etag = res.headers["etag"]
+    assert memory_client.get(f"/account/balance/{ac_no}", params={"pin": "1234"},
+                             headers={"If-None-Match": etag}).status_code == 304
+    assert memory_client.get(f"/account/balance/{ac_no}", params={"pin": "0000"},
+                             headers={"If-None-Match": etag}).status_code == 400
+
+
+def test_large_history_is_compressed(memory_client):
+    ac_no = _account(memory_client)
+    db = repository.get_repository()
+    for n in range(200):
+        db.history.add({"account_no": ac_no, "action": "deposit", "amount": n})
+
+    res = memory_client.get(f"/history/{ac_no}", params={"pin": "1234"},
+                            headers={"Accept-Encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in res.headers["vary"].lower()
+    assert len(res.json()["history"]) == 200   # httpx decodes transparently
+
+    small = memory_client.get("/health/live", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert "accept-encoding" in small.headers["vary"].lower()       # a larger body would be compressed
+
+    plain = memory_client.get(f"/history/{ac_no}", params={"pin": "1234"},
+                              headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert "accept-encoding" in plain.headers["vary"].lower()
+
+
+def test_auth_check_revalidates(memory_client):
+    etag = memory_client.get("/auth/check").headers["etag"]
+    assert memory_client.get("/auth/check", headers={"If-None-Match": etag}).status_code == 304
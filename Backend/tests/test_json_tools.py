@@ -0,0 +1,35 @@
+from datetime import datetime, UTC
+from decimal import Decimal
+
+import json
+
+from app.utils.json_tools import FastJSONResponse, dumps
+
+
+def test_dumps_matches_generic_encoding():
+    row = {
+        "id": 1,
+        "amount": Decimal("250"),
+        "rate": Decimal("1.5"),
+        "context": {"to": "AC0000000002"},
+        "created_at": datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC),
+    }
+    assert json.loads(dumps({"history": [row]})) == {"history": [{
+        "id": 1,
+        "amount": 250,
+        "rate": 1.5,
+        "context": {"to": "AC0000000002"},
+        "created_at": "2025-01-02T03:04:05+00:00",
+    }]}
+
+
+def test_fast_response_body_and_media_type():
+    res = FastJSONResponse({"history": []})
+    assert res.body == b'{"history":[]}'
+    assert res.media_type == "application/json"
+
+
+def test_openapi_documents_response_models(client):
+    paths = client.get("/openapi.json").json()["paths"]
+    ok = paths["/history/{ac_no}"]["get"]["responses"]["200"]["content"]["application/json"]
+    assert ok["schema"]["$ref"].endswith("/HistoryResponse")
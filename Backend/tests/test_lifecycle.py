@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import create_app
+from app.core import lifecycle
+from app.core.write_buffer import WriteBuffer
+
+
+def test_ready_only_after_startup():
+    app = create_app()
+    lifecycle.state.ready = False
+    lifecycle.state.draining = False
+
+    assert TestClient(app).get("/health/ready").status_code == 503
+
+    with TestClient(app) as client:
+        assert client.get("/health/live").status_code == 200
+        assert client.get("/health/ready").status_code == 200
+
+        lifecycle.state.draining = True
+        assert client.get("/health/ready").status_code == 503
+        assert client.get("/health/live").status_code == 200
+
+    assert lifecycle.state.ready is False
+
+
+def test_write_buffer_flushes_on_demand():
+    written = []
+    buf = WriteBuffer("test", written.extend, max_items=1000, interval=60)
+    buf.add({"n": 1})
+    buf.add({"n": 2})
+    assert buf.pending() == 2
+
+    buf.flush()
+    assert written == [{"n": 1}, {"n": 2}]
+    assert buf.pending() == 0
+
+
+def test_write_buffer_keeps_a_failed_batch_and_writes_through_when_backed_up():
+    written, down = [], [True]
+
+    def write_many(rows):
+        if down[0]:
+            raise ConnectionError("backend down")
+        written.extend(rows)
+
+    buf = WriteBuffer("test-retry", write_many, max_items=1000, interval=60, max_pending=3)
+    buf.add({"n": 1})
+    buf.add({"n": 2})
+    assert buf.flush() is False and buf.pending() == 2      # kept, not dropped
+    buf.add({"n": 3})
+
+    with pytest.raises(ConnectionError):                    # queue full: the caller sees the outage
+        buf.add({"n": 4})
+
+    down[0] = False
+    assert buf.flush() is True
+    assert written == [{"n": 1}, {"n": 2}, {"n": 3}]
+    assert buf.pending() == 0
@@ -0,0 +1,38 @@
+from bcrypt import hashpw, gensalt
+
+from app.core.metrics import BCRYPT_LATENCY
+from app.services import repository
+from app.services.auth_service import AuthService, _DUMMY_HASH
+
+
+def _verify_count() -> float:
+    return sum(series[-2] for key, series in BCRYPT_LATENCY._series.items() if ("op", "verify") in key)
+
+
+def test_dummy_hash_has_default_cost():
+    assert _DUMMY_HASH[:7] == gensalt()[:7]
+
+
+def test_login_reads_user_once(memory_client, monkeypatch):
+    db = repository.get_repository()
+    db.users.insert({"user_name": "teller1", "password": hashpw(b"secret", gensalt(4)).decode(), "role": "teller"})
+
+    calls = []
+    original = db.users.get_by_name
+    monkeypatch.setattr(db.users, "get_by_name", lambda name: calls.append(name) or original(name))
+
+    res = memory_client.post("/auth/login", data={"username": "teller1", "password": "secret"})
+    assert res.status_code == 200
+    assert res.json()["role"] == "teller"
+    assert calls == ["teller1"]
+
+
+def test_unknown_user_still_runs_bcrypt(memory_client):
+    db = repository.get_repository()
+    before = _verify_count()
+
+    assert AuthService().authenticate(db, "nobody", "secret") is None
+    assert _verify_count() == before + 1
+
+    res = memory_client.post("/auth/login", data={"username": "nobody", "password": "secret"})
+    assert res.status_code == 401
@@ -0,0 +1,49 @@
+from app.core.metrics import (
+    Histogram,
+    server_timing_header,
+    span,
+    start_request_spans,
+    _db_target,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("demo_seconds", "demo", buckets=(0.1, 1.0))
+    h.observe(0.05, route="/x")
+    h.observe(0.5, route="/x")
+    h.observe(5.0, route="/x")
+
+    text = "\n".join(h.render())
+    assert 'demo_seconds_bucket{route="/x",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/x",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{route="/x",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="/x"} 3' in text
+
+
+def test_spans_collapse_into_server_timing():
+    spans = start_request_spans()
+    with span("auth.check"):
+        pass
+    with span("auth.check"):
+        pass
+
+    assert len(spans) == 2
+    header = server_timing_header(spans)
+    assert header.startswith("auth.check;dur=")
+    assert header.count("auth.check") == 1
+
+
+def test_db_target_names():
+    assert _db_target("/rest/v1/accounts") == "accounts"
+    assert _db_target("/rest/v1/rpc/deposit_money") == "rpc.deposit_money"
+
+
+def test_server_timing_header_on_response(client):
+    res = client.get("/auth/health")
+    assert res.status_code == 200
+    assert "total;dur=" in res.headers["server-timing"]
+
+
+def test_metrics_requires_admin(client):
+    res = client.get("/metrics")
+    assert res.status_code == 401
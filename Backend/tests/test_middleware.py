@@ -0,0 +1,72 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.middleware import RequestContextMiddleware
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/echo")
+    def echo(request: Request):
+        return {
+            "request_id": request.state.request_id,
+            "has_repos": bool(request.state.supabase and request.state.service),
+        }
+
+    @app.get("/refresh")
+    def refresh(request: Request):
+        request.state.new_access_token = "fresh-token"
+        return {"ok": True}
+
+    return app
+
+
+def test_request_id_generated_and_echoed():
+    client = TestClient(_app())
+    res = client.get("/echo")
+    assert res.json()["has_repos"] is True
+    assert res.headers["x-request-id"] == res.json()["request_id"]
+    assert "total;dur=" in res.headers["server-timing"]
+
+
+def test_request_id_reused_only_when_valid():
+    client = TestClient(_app())
+    assert client.get("/echo", headers={"X-Request-ID": "lb-123"}).headers["x-request-id"] == "lb-123"
+    assert client.get("/echo", headers={"X-Request-ID": "bad id\x7f"}).headers["x-request-id"] != "bad id\x7f"
+
+
+def test_cookie_refreshed_when_handler_asks():
+    client = TestClient(_app())
+    assert "set-cookie" not in client.get("/echo").headers
+    cookie = client.get("/refresh").headers["set-cookie"]
+    assert cookie.startswith("atm_token=fresh-token") and "HttpOnly" in cookie
+
+
+def test_streaming_body_is_not_buffered():
+    sent = []
+
+    async def chunks():
+        yield b"first"
+        # The first chunk must already be on the wire before the second is produced
+        assert any(m.get("body") == b"first" for m in sent)
+        yield b"second"
+
+    async def endpoint(scope, receive, send):
+        await StreamingResponse(chunks())(scope, receive, send)
+
+    async def receive():
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""}
+    asyncio.run(RequestContextMiddleware(endpoint)(scope, receive, send))
+
+    bodies = [m["body"] for m in sent if m["type"] == "http.response.body" and m.get("body")]
+    assert bodies == [b"first", b"second"]
@@ -0,0 +1,228 @@
+import time
+
+import pytest
+
+from app.core import offline, resilience
+from app.core.offline import KeyReused, OfflineJournal, OfflineReplayer
+from app.services.memory_repository import InMemoryRepository
+from app.services.repository import UnavailableError
+
+
+def _repo(*accounts):
+    repo = InMemoryRepository()
+    for ac_no, balance in accounts:
+        repo.accounts.insert({"account_no": ac_no, "name": "O", "pin": "h", "mobileno": "1", "gmail": "o@mail.com", "balance": balance})
+    return repo
+
+
+def _backend_down(monkeypatch, repo):
+    """Every repository call fails the way an open circuit does."""
+    def unreachable(*args, **kwargs):
+        resilience._mark_unavailable(2)
+        raise resilience.CircuitOpenError("memory unavailable (circuit open)")
+
+    for part in (repo.accounts, repo.users, repo.history, repo.audit):
+        for name in dir(type(part)):
+            if not name.startswith("_") and callable(getattr(part, name)):
+                monkeypatch.setattr(part, name, unreachable)
+
+
+def test_journal_survives_reopen_and_a_torn_tail(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = OfflineJournal(path)
+    first, _ = journal.append("deposit", "AC1", 10, client_key="k1")
+    journal.append("deposit", "AC1", 20, client_key="k2")
+    assert journal.append("deposit", "AC1", 10, client_key="k1") == (first, False)   # same key, same entry
+    journal.ack([(first["seq"], "applied", None)])
+    journal.close()
+
+    with open(path, "ab") as f:
+        f.write(b'{"seq": 3, "key": "k3", "kind": "dep')   # crash mid-append
+
+    journal = OfflineJournal(path)
+    assert [(e["key"], e["amount"]) for e in journal.pending()] == [("deposit:AC1:k2", 20)]
+    entry, created = journal.append("deposit", "AC1", 5)
+    assert created and entry["seq"] == 3
+    journal.close()
+    assert OfflineJournal(path).pending()[-1]["seq"] == 3
+
+
+def test_workers_share_one_journal(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    one, two = OfflineJournal(path), OfflineJournal(path)     # two worker processes
+
+    one.append("withdraw", "AC1", 60)
+    two.append("withdraw", "AC1", 30)
+    assert one.pending_amount("withdraw", "AC1") == two.pending_amount("withdraw", "AC1") == 90
+    assert [e["seq"] for e in one.pending()] == [1, 2]
+
+    since = time.time() - 1
+    one.pin_failed("AC1", since)
+    assert two.pin_failed("AC1", since) == 2
+    assert one.pin_failures("AC1", since) == 2
+    assert one.pin_failures("AC1", time.time()) == 0          # checked online since
+
+    # One replayer at a time; the other worker's round is a no-op
+    repo = _repo(("AC1", 100))
+    with one.replaying() as allowed:
+        assert allowed
+        assert OfflineReplayer(two, lambda: repo).replay_once() == {"applied": 0, "duplicate": 0, "conflict": 0}
+    assert OfflineReplayer(two, lambda: repo).replay_once()["applied"] == 2
+    assert repo.accounts.balance("AC1") == 10
+    assert one.pending_amount("withdraw", "AC1") == 0
+
+    # Compaction keeps the wrong-PIN records; the other worker reloads the new file
+    one.append("deposit", "AC1", 5)
+    assert one.compact()
+    assert [(e["seq"], e["amount"]) for e in two.pending()] == [(3, 5)]
+    assert two.pin_failures("AC1", since) == 2
+    two.append("deposit", "AC1", 6)
+    assert [e["amount"] for e in one.pending()] == [5, 6]
+    one.close()
+    two.close()
+
+
+def test_client_keys_are_scoped_and_never_reused_for_another_operation(tmp_path):
+    journal = OfflineJournal(str(tmp_path / "journal.jsonl"))
+    entry, _ = journal.append("withdraw", "AC1", 20, client_key="atm-1")
+    assert entry["key"] == "withdraw:AC1:atm-1"
+    for other in (("withdraw", "AC2", 20), ("withdraw", "AC1", 25), ("deposit", "AC1", 20)):
+        with pytest.raises(KeyReused):
+            journal.append(*other, client_key="atm-1")
+    assert len(journal.pending()) == 1
+
+    # The backend refuses a known key for a different operation too
+    repo = _repo(("AC1", 100), ("AC2", 100))
+    assert OfflineReplayer(journal, lambda: repo).replay_once()["applied"] == 1
+    with pytest.raises(ValueError, match="different operation"):
+        repo.accounts.apply_once("withdraw:AC1:atm-1", "withdraw", "AC2", 20)
+    assert repo.accounts.balance("AC2") == 100
+    journal.close()
+
+
+def test_replay_after_a_crash_posts_each_entry_once(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    repo = _repo(("AC1", 0))
+    journal = OfflineJournal(path)
+    for amount in (10, 20, 30):
+        journal.append("deposit", "AC1", amount)
+
+    # Posted, then the process dies before the ack batch is written
+    crashing = OfflineReplayer(journal, lambda: repo)
+    journal.ack = lambda results: (_ for _ in ()).throw(SystemExit("crash"))
+    with pytest.raises(SystemExit):
+        crashing.replay_once()
+    journal.close()
+    assert repo.accounts.balance("AC1") == 60
+
+    journal = OfflineJournal(path)
+    assert len(journal.pending()) == 3
+    assert OfflineReplayer(journal, lambda: repo).replay_once() == {"applied": 0, "duplicate": 3, "conflict": 0}
+    assert repo.accounts.balance("AC1") == 60
+    assert journal.pending() == []
+
+
+def test_replay_keeps_order_while_offline_and_reports_conflicts(tmp_path):
+    repo = _repo(("AC1", 5))
+    journal = OfflineJournal(str(tmp_path / "journal.jsonl"))
+    journal.append("withdraw", "AC1", 50)                  # paid out, but the balance is gone
+    journal.append("deposit", "AC1", 10)
+    journal.append("deposit", "AC404", 10)
+
+    real = repo.accounts.apply_once
+    calls = {"n": 0}
+
+    def flaky(*args):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise UnavailableError("circuit open")
+        return real(*args)
+
+    repo.accounts.apply_once = flaky
+    replayer = OfflineReplayer(journal, lambda: repo)
+    assert replayer.replay_once() == {"applied": 0, "duplicate": 0, "conflict": 1}
+    assert [e["amount"] for e in journal.pending()] == [10, 10]   # stopped, order kept
+
+    assert replayer.replay_once() == {"applied": 1, "duplicate": 0, "conflict": 1}
+    assert repo.accounts.balance("AC1") == 15
+    conflicts = [r for r in repo.store.audit if r["action"] == "offline_conflict"]
+    assert [r["actor"] for r in conflicts] == ["AC1", "AC404"]
+
+
+def test_replay_throughput(tmp_path):
+    n = 3000
+    repo = _repo(*[(f"AC{i}", 0) for i in range(100)])
+    journal = OfflineJournal(str(tmp_path / "journal.jsonl"))
+    for i in range(n):
+        journal.append("deposit", f"AC{i % 100}", 1)
+
+    start = time.perf_counter()
+    done = OfflineReplayer(journal, lambda: repo, batch_size=500).replay_once()
+    elapsed = time.perf_counter() - start
+
+    assert done["applied"] == n
+    assert sum(repo.accounts.balance(f"AC{i}") for i in range(100)) == n
+    # One fsync per 500 acks; per-entry cost is the backend call
+    assert n / elapsed > 1000, f"{n / elapsed:.0f} entries/s"
+
+
+def test_endpoints_fall_back_to_the_journal(memory_client, monkeypatch, tmp_path):
+    from app.config import settings
+    from app.services import repository
+
+    monkeypatch.setattr(settings, "OFFLINE_MODE", True)
+    monkeypatch.setattr(settings, "OFFLINE_WITHDRAW_LIMIT", 100)
+    monkeypatch.setattr(settings, "OFFLINE_JOURNAL_DIR", str(tmp_path))
+    monkeypatch.setattr(offline, "_journal", None)
+    monkeypatch.setattr(offline, "pin_cache", None)
+
+    res = memory_client.post("/account/create", json={
+        "holder_name": "Offline User", "pin": "1234", "vpin": "1234",
+        "gmail": "offline@mail.com", "mobileno": "9999999940",
+    })
+    ac_no = res.json()["account_no"]
+    deposit = {"acc_no": ac_no, "pin": "1234", "amount": 500}
+    assert memory_client.post("/transaction/deposit", json=deposit).status_code == 200   # caches the PIN hash
+
+    repo = repository.get_repository()
+    with monkeypatch.context() as outage:
+        _backend_down(outage, repo)      # the role lookup included
+        headers = {"Idempotency-Key": "atm-7-0001"}
+        res = memory_client.post("/transaction/deposit", json={**deposit, "amount": 40}, headers=headers)
+        assert res.status_code == 200 and "accepted offline (ref atm-7-0001)" in res.json()["message"]
+        memory_client.post("/transaction/deposit", json={**deposit, "amount": 40}, headers=headers)    # client retry
+
+        # Another worker already paid out 70 and saw two wrong PINs
+        other = OfflineJournal(offline.get_journal().path)
+        other.append("withdraw", ac_no, 70)
+        withdraw = {"acc_no": ac_no, "pin": "1234", "amount": 40}
+        res = memory_client.post("/transaction/withdraw", json=withdraw)                             # 110 > limit
+        assert res.status_code == 400 and "limited" in res.json()["detail"]       # final: no Retry-After
+        assert "retry-after" not in res.headers
+        headers = {"Idempotency-Key": "atm-7-0002"}
+        assert memory_client.post("/transaction/withdraw", json={**withdraw, "amount": 30}, headers=headers).status_code == 200
+        res = memory_client.post("/transaction/withdraw", json={**withdraw, "amount": 30}, headers=headers)   # retry at the limit
+        assert res.status_code == 200 and "ref atm-7-0002" in res.json()["message"]
+        res = memory_client.post("/transaction/withdraw", json={**withdraw, "amount": 5}, headers=headers)
+        assert res.status_code == 409 and "different operation" in res.json()["detail"]
+
+        cached = offline.get_pin_cache().get(ac_no)
+        other.pin_failed(ac_no, cached["seen"])
+        other.pin_failed(ac_no, cached["seen"])
+        res = memory_client.post("/transaction/withdraw", json={**withdraw, "pin": "9999", "amount": 1})
+        assert res.status_code == 400 and res.json()["detail"] == "Account locked after 3 wrong PIN attempts."
+        res = memory_client.post("/transaction/deposit", json={**deposit, "amount": 1})
+        assert res.status_code == 400 and res.json()["detail"] == "Account locked. Contact bank."
+
+        # Not decidable offline (PIN never seen): retry later
+        res = memory_client.post("/transaction/deposit", json={**deposit, "acc_no": "AC404"})
+        assert res.status_code == 503 and "retry-after" in res.headers
+        other.close()
+
+    done = offline.replayer_from_settings().replay_once()
+    assert done == {"applied": 3, "duplicate": 0, "conflict": 0}
+    assert repo.accounts.balance(ac_no) == 500 + 40 - 70 - 30
+    offline_rows = [h for h in repo.history.list(ac_no) if "offline" in (h.get("context") or {})]
+    assert sorted(h["action"] for h in offline_rows) == ["deposit", "withdraw", "withdraw"]
+    assert {"offline": f"deposit:{ac_no}:atm-7-0001"} in [h["context"] for h in offline_rows]
+    offline.get_journal().close()
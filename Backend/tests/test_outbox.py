@@ -0,0 +1,100 @@
+import json
+
+import httpx
+import pytest
+
+from app.core.outbox import FileSink, OutboxRelay, QueueSink, WebhookSink, create_sink
+from app.services.memory_repository import InMemoryRepository
+from app.services.repository import InsufficientBalanceError
+
+
+def _repo():
+    repo = InMemoryRepository()
+    for ac in ("AC1", "AC2"):
+        repo.accounts.insert({"account_no": ac, "name": "Outbox User", "pin": "x", "balance": 0})
+    return repo
+
+
+def _drain(sink_queue):
+    items = []
+    while not sink_queue.empty():
+        items.append(sink_queue.get_nowait())
+    return items
+
+
+def test_money_operations_write_events_atomically():
+    repo = _repo()
+    repo.accounts.deposit("AC1", 100)
+    repo.accounts.transfer("AC1", "AC2", 30)
+    with pytest.raises(InsufficientBalanceError):
+        repo.accounts.withdraw("AC2", 500)   # failed movement -> no event
+
+    events = repo.outbox.pending(10)
+    assert [(e["account_no"], e["kind"], e["amount"], e["balance"]) for e in events] == [
+        ("AC1", "deposit", 100, 100),
+        ("AC1", "transfer_out", 30, 70),
+        ("AC2", "transfer_in", 30, 30),
+    ]
+    assert events[1]["counterparty"] == "AC2"
+
+
+def test_relay_delivers_in_order_and_acknowledges():
+    repo = _repo()
+    for n in range(5):
+        repo.accounts.deposit("AC1", n + 1)
+
+    sink = QueueSink()
+    relay = OutboxRelay(lambda: repo, sink, batch_size=2)
+    assert relay.drain() == 5
+    assert [e["amount"] for e in _drain(sink.queue)] == [1, 2, 3, 4, 5]
+    assert repo.outbox.pending(10) == []
+
+
+class _FlakySink(QueueSink):
+    def __init__(self):
+        super().__init__()
+        self.fail = True
+
+    def deliver(self, events):
+        if self.fail:
+            self.fail = False
+            raise ConnectionError("sink down")
+        super().deliver(events)
+
+
+def test_failed_batch_is_redelivered():
+    repo = _repo()
+    repo.accounts.deposit("AC1", 10)
+    repo.accounts.deposit("AC1", 20)
+
+    sink = _FlakySink()
+    relay = OutboxRelay(lambda: repo, sink, batch_size=10)
+    with pytest.raises(ConnectionError):
+        relay.run_once()
+    assert len(repo.outbox.pending(10)) == 2   # not acknowledged
+
+    assert relay.run_once() == 2
+    assert [e["amount"] for e in _drain(sink.queue)] == [10, 20]
+
+
+def test_file_and_webhook_sinks(tmp_path):
+    events = [{"id": 1, "account_no": "AC1", "kind": "deposit", "amount": 5, "balance": 5}]
+
+    sink = create_sink(f"file:{tmp_path / 'events.jsonl'}")
+    assert isinstance(sink, FileSink)
+    sink.deliver(events)
+    sink.close()
+    assert json.loads((tmp_path / "events.jsonl").read_text().strip())["amount"] == 5
+
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(503 if len(seen) == 1 else 204)
+
+    hook = WebhookSink("http://hooks.local/money", client=httpx.Client(transport=httpx.MockTransport(handler)))
+    with pytest.raises(httpx.HTTPStatusError):
+        hook.deliver(events)
+    hook.deliver(events)
+    assert seen[0].headers["idempotency-key"] == seen[1].headers["idempotency-key"] == "outbox-1-1"
+    assert json.loads(seen[1].content)["events"][0]["kind"] == "deposit"
@@ -0,0 +1,60 @@
+import httpx
+import pytest
+from postgrest import SyncPostgrestClient
+
+from app.services.postgrest_queries import PostgrestCatalog
+from app.services.repository import DuplicateError
+from app.services.supabase_repository import SupabaseRepository
+
+
+def _repo(handler):
+    client = SyncPostgrestClient(
+        "http://db.local/rest/v1",
+        headers={"apiKey": "k", "Authorization": "Bearer k"},
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+    return SupabaseRepository(client)
+
+
+def test_prepared_select_binds_and_quotes():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json=[{"balance": 7}])
+
+    repo = _repo(handler)
+    assert repo.accounts.balance("AC 1&x") == 7
+
+    req = seen[0]
+    assert req.method == "GET"
+    assert req.url.path == "/rest/v1/accounts"
+    assert req.url.params["select"] == "balance"
+    assert req.url.params["account_no"] == "eq.AC 1&x"
+    assert req.url.params["limit"] == "1"
+    assert req.headers["apikey"] == "k"
+    assert req.headers["authorization"] == "Bearer k"
+
+
+def test_rpc_error_maps_to_repository_error():
+    def handler(request):
+        return httpx.Response(409, json={"code": "23505", "message": "duplicate key value", "details": None, "hint": None})
+
+    with pytest.raises(DuplicateError):
+        _repo(handler).users.insert({"user_name": "x"})
+
+
+def test_account_select_is_prepared_once():
+    catalog = _repo(lambda r: httpx.Response(200, json=[])).queries
+    assert isinstance(catalog, PostgrestCatalog)
+    name = catalog.account_select("pin, failed_attempts")
+    assert catalog.account_select("pin, failed_attempts") == name
+    assert catalog._prepared[name].url.endswith("select=pin,failed_attempts&limit=1")
+
+
+def test_money_rpc_returns_balance_and_tolerates_void():
+    answers = iter([httpx.Response(200, json=150), httpx.Response(204)])
+    repo = _repo(lambda r: next(answers))
+    assert repo.accounts.deposit("AC1", 50) == 150
+    # RPCs deployed before sql/005 return no body
+    assert repo.accounts.deposit("AC1", 50) is None
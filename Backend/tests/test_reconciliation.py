@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from app.services import reconciliation
+from app.services.memory_repository import InMemoryRepository
+from app.services.reconciliation import Reconciler
+from app.services.sharding import ShardRouter, ShardedRepository
+
+ENGINES = [
+    pytest.param(False, id="python"),
+    pytest.param(True, id="numpy", marks=pytest.mark.skipif(reconciliation.np is None, reason="numpy not installed")),
+]
+
+
+def _open(repo, *numbers):
+    for ac_no in numbers:
+        repo.accounts.insert({"account_no": ac_no, "name": "L", "pin": "h", "mobileno": "1", "gmail": "l@mail.com"})
+
+
+def _deposit(repo, ac_no, amount):
+    repo.accounts.deposit(ac_no, amount)
+    repo.history.add({"account_no": ac_no, "action": "deposit", "amount": amount})
+
+
+def _withdraw(repo, ac_no, amount):
+    repo.accounts.withdraw(ac_no, amount)
+    repo.history.add({"account_no": ac_no, "action": "withdraw", "amount": amount})
+
+
+def _transfer(repo, from_ac, to_ac, amount, halves=("out", "in")):
+    repo.accounts.transfer(from_ac, to_ac, amount)
+    if "out" in halves:
+        repo.history.add({"account_no": from_ac, "action": "transfer_out", "amount": amount, "context": {"to": to_ac}})
+    if "in" in halves:
+        repo.history.add({"account_no": to_ac, "action": "transfer_in", "amount": amount, "context": {"from": from_ac}})
+
+
+def _ledger(repo):
+    _open(repo, "AC1", "AC2", "AC3")
+    _deposit(repo, "AC1", 500)
+    _deposit(repo, "AC2", 100)
+    _transfer(repo, "AC1", "AC2", 120)
+    _withdraw(repo, "AC2", 20)
+    _transfer(repo, "AC2", "AC3", 50)
+    repo.history.add({"account_no": "AC3", "action": "pin_change", "amount": 0})
+
+
+@pytest.mark.parametrize("vectorized", ENGINES)
+def test_a_consistent_ledger_reports_nothing(vectorized):
+    repo = InMemoryRepository()
+    _ledger(repo)
+
+    report = Reconciler(repo, chunk_size=2, settle=0, vectorized=vectorized).run()
+    assert (report["history_rows"], report["accounts"]) == (8, 3)
+    assert report["mismatches"] == report["orphan_transfers"] == report["unsettled"] == []
+
+
+@pytest.mark.parametrize("vectorized", ENGINES)
+def test_drift_and_orphan_transfers_are_reported(vectorized):
+    repo = InMemoryRepository()
+    _ledger(repo)
+    repo.accounts.deposit("AC1", 30)                                  # history insert failed
+    _transfer(repo, "AC3", "AC1", 10, halves=("out",))                # transfer_in lost
+    repo.history.add({"account_no": "AC9", "action": "deposit", "amount": 5})   # no such account
+
+    report = Reconciler(repo, chunk_size=3, settle=0, vectorized=vectorized).run()
+    assert sorted((m["account_no"], m["balance"], m["ledger"], m["difference"]) for m in report["mismatches"]) == [
+        ("AC1", 420, 380, 40),
+        ("AC9", None, 5, -5),
+    ]
+    [orphan] = report["orphan_transfers"]
+    assert orphan["from"] == "AC3" and orphan["to"] == "AC1" and orphan["amount"] == 10
+    assert orphan["missing"] == "transfer_in" and orphan["count"] == 1 and len(orphan["ids"]) == 1
+
+
+def test_differences_that_settle_are_not_reported(monkeypatch):
+    repo = InMemoryRepository()
+    _ledger(repo)
+    real_scan = repo.history.scan
+
+    # A deposit lands while the scan runs; its history row trails the balance
+    def scan(after_id, limit):
+        page = real_scan(after_id, limit)
+        if not page:
+            repo.accounts.deposit("AC2", 7)
+            repo.history.add({"account_no": "AC2", "action": "deposit", "amount": 7})
+        return page
+
+    monkeypatch.setattr(repo.history, "scan", scan)
+    report = Reconciler(repo, chunk_size=100, settle=0, vectorized=False).run()
+    assert report["mismatches"] == [] and report["unsettled"] == []
+
+
+def test_shards_are_reconciled_together():
+    router = ShardRouter(["a", "b"])
+    repo = ShardedRepository({"a": InMemoryRepository(), "b": InMemoryRepository()}, router)
+    numbers = [f"AC{1000000000 + i}" for i in range(12)]
+    a = next(n for n in numbers if router.shard_for(n) == "a")
+    b = next(n for n in numbers if router.shard_for(n) == "b")
+    _open(repo, a, b)
+    _deposit(repo, a, 100)
+    _transfer(repo, a, b, 40)                                          # halves on different shards
+    _transfer(repo, a, b, 5, halves=("in",))                          # transfer_out lost
+
+    report = Reconciler(repo, chunk_size=1, settle=0).run()
+    assert report["accounts"] == 2
+    assert [(m["account_no"], m["difference"]) for m in report["mismatches"]] == [(a, -5)]
+    assert [(o["from"], o["to"], o["missing"]) for o in report["orphan_transfers"]] == [(a, b, "transfer_out")]
+
+
+def test_main_prints_the_report_and_records_it(memory_client, monkeypatch, capsys):
+    from app.config import settings
+    from app.services import repository
+
+    monkeypatch.setattr(settings, "RECONCILE_SETTLE_SECONDS", 0)
+    repo = repository.get_repository()
+    _open(repo, "AC7")
+    repo.accounts.deposit("AC7", 15)
+
+    with pytest.raises(SystemExit) as exit_info:
+        reconciliation.main()
+    assert exit_info.value.code == 1
+    report = json.loads(capsys.readouterr().out)
+    assert [m["account_no"] for m in report["mismatches"]] == ["AC7"]
+    [event] = [r for r in repo.store.audit if r["action"] == "ledger_reconciliation"]
+    assert "1 mismatches" in event["details"]
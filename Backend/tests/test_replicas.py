@@ -0,0 +1,106 @@
+import json
+
+from app.services.memory_repository import InMemoryRepository
+from app.services.replicas import ReplicaPolicy, ReplicatedRepository
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _replicated(lag=0.5):
+    clock = Clock()
+    policy = ReplicaPolicy(["r1"], window=2.0, max_lag=5.0, check_interval=1.0, clock=clock)
+    primary, replica = InMemoryRepository(), InMemoryRepository()
+    repo = ReplicatedRepository(primary, {"r1": replica}, policy)
+    if lag is not None:
+        policy.observed("r1", lag)
+    return repo, replica, clock
+
+
+def _account(repo, ac_no, balance):
+    repo.accounts.insert({"account_no": ac_no, "name": "R", "pin": "h", "mobileno": "1", "gmail": "r@mail.com", "balance": balance})
+
+
+def test_policy_routes_by_lag_and_recent_writes():
+    clock = Clock()
+    policy = ReplicaPolicy(["r1", "r2"], window=2.0, max_lag=5.0, check_interval=1.0, clock=clock)
+    assert policy.choose("AC1") is None                # lag not measured yet
+
+    policy.observed("r1", 3.0)
+    policy.observed("r2", 9.0)                         # too far behind
+    assert policy.choose("AC1") == "r1"
+
+    policy.wrote("AC1")
+    clock.now += 2.5                                   # past the window, not past lag + interval
+    assert policy.choose("AC1") is None
+    assert policy.choose("AC2") == "r1"                # other accounts unaffected
+    clock.now += 2.0
+    assert policy.choose("AC1") == "r1"
+
+    policy.failed("r1")
+    assert policy.choose("AC2") is None
+
+
+def test_reads_stick_to_the_primary_after_a_write():
+    repo, replica, clock = _replicated()
+    _account(replica, "AC1", 100)                      # replica snapshot
+    _account(repo.primary, "AC1", 100)
+
+    assert repo.accounts.deposit("AC1", 50) == 150
+    assert repo.accounts.balance("AC1") == 150         # read-your-writes: primary
+    assert repo.history.list("AC1") == []
+
+    clock.now += 3
+    assert repo.accounts.balance("AC1") == 100         # now served by the (stale) replica
+
+
+def test_replica_failures_and_misses_fall_back_to_the_primary(monkeypatch):
+    repo, replica, _ = _replicated()
+    user = repo.primary.users.insert({"user_name": "teller", "password": "x", "role": "teller"})
+
+    # Not replicated yet: the replica has no such user
+    assert repo.users.get_role(str(user["id"])) == "teller"
+
+    def down(*args):
+        raise ConnectionError("replica down")
+
+    monkeypatch.setattr(replica.history, "list", down)
+    _account(repo.primary, "AC2", 0)
+    repo.primary.history.add({"account_no": "AC2", "action": "deposit", "amount": 5})
+    assert [h["action"] for h in repo.history.list("AC2")] == ["deposit"]
+    assert repo.policy.lag["r1"] is None                # no more reads until the next probe
+
+    repo.probe()
+    assert repo.policy.lag["r1"] == 0.0
+
+
+def test_endpoints_read_through_replicas(memory_client, monkeypatch):
+    from app.config import settings
+    from app.services import replicas, repository
+
+    monkeypatch.setattr(settings, "READ_REPLICAS", json.dumps([{"name": "r1", "backend": "memory"}]))
+    monkeypatch.setattr(repository, "_replicated", {})
+    monkeypatch.setattr(repository, "_opened", {})
+    monkeypatch.setattr(replicas, "_policy", None)
+
+    repo = repository.get_repository()
+    assert isinstance(repo, ReplicatedRepository)
+    assert repository.get_repository(privileged=False).policy is repo.policy
+    repo.probe()
+
+    res = memory_client.post("/account/create", json={
+        "holder_name": "Replica User", "pin": "1234", "vpin": "1234",
+        "gmail": "replica@mail.com", "mobileno": "9999999950",
+    })
+    ac_no = res.json()["account_no"]
+    res = memory_client.post("/transaction/deposit", json={"acc_no": ac_no, "pin": "1234", "amount": 70})
+    assert res.status_code == 200 and res.json()["message"].endswith("New balance: 70")
+
+    res = memory_client.get(f"/history/{ac_no}", params={"pin": "1234"})
+    assert res.status_code == 200
+    assert [h["action"] for h in res.json()["history"]] == ["deposit"]
@@ -0,0 +1,119 @@
+import pytest
+
+from app.config import settings
+from app.services import repository
+from app.services.memory_repository import InMemoryRepository
+from app.services.repository import (
+    DuplicateError,
+    InsufficientBalanceError,
+    NotFoundError,
+)
+
+
+def _account(repo, ac_no, balance=0):
+    user = repo.users.insert({"user_name": ac_no, "password": "x", "role": "customer"})
+    return repo.accounts.insert({"account_no": ac_no, "name": "Mem User", "pin": "x",
+                                 "balance": balance, "user_id": user["id"]})
+
+
+def test_unique_account_numbers():
+    repo = InMemoryRepository()
+    _account(repo, "AC1")
+    with pytest.raises(DuplicateError):
+        repo.accounts.insert({"account_no": "AC1", "name": "Dup"})
+    with pytest.raises(DuplicateError):
+        repo.users.insert({"user_name": "AC1", "password": "x", "role": "customer"})
+
+
+def test_transfer_is_atomic():
+    repo = InMemoryRepository()
+    _account(repo, "AC1", balance=100)
+    _account(repo, "AC2")
+
+    with pytest.raises(InsufficientBalanceError):
+        repo.accounts.transfer("AC1", "AC2", 500)
+    with pytest.raises(NotFoundError, match="Receiver"):
+        repo.accounts.transfer("AC1", "AC404", 10)
+
+    assert repo.accounts.get("AC1", "balance") == {"balance": 100}
+    repo.accounts.transfer("AC1", "AC2", 40)
+    assert repo.accounts.get("AC1", "balance")["balance"] == 60
+    assert repo.accounts.get("AC2", "balance")["balance"] == 40
+
+
+def test_history_newest_first():
+    repo = InMemoryRepository()
+    repo.history.add({"account_no": "AC1", "action": "deposit", "amount": 1})
+    repo.history.add({"account_no": "AC1", "action": "withdraw", "amount": 1})
+    assert [r["action"] for r in repo.history.list("AC1")] == ["withdraw", "deposit"]
+
+
+def test_money_flow_on_memory_backend(memory_client):
+    accounts = []
+    for i in range(2):
+        res = memory_client.post("/account/create", json={
+            "holder_name": "Memory User",
+            "pin": "1234",
+            "vpin": "1234",
+            "gmail": f"mem{i}@mail.com",
+            "mobileno": "9999999990",
+        })
+        assert res.status_code == 200
+        accounts.append(res.json()["account_no"])
+    sender, receiver = accounts
+
+    res = memory_client.post("/transaction/deposit", json={"acc_no": sender, "pin": "1234", "amount": 500})
+    assert res.status_code == 200
+    assert res.json()["message"].endswith("500")
+
+    res = memory_client.post("/transaction/withdraw", json={"acc_no": sender, "pin": "1234", "amount": 10**6})
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Insufficient balance."
+
+    res = memory_client.post("/transaction/transfer", json={
+        "acc_no": sender, "rec_acc_no": receiver, "pin": "1234", "amount": 100,
+    })
+    assert res.status_code == 200
+    assert res.json()["message"].endswith("400")
+
+    res = memory_client.get(f"/history/{receiver}", params={"pin": "1234"})
+    assert [h["action"] for h in res.json()["history"]] == ["transfer_in"]
+
+
+def test_postgres_backend_falls_back_to_postgrest(monkeypatch):
+    from app.services.supabase_repository import SupabaseRepository
+
+    monkeypatch.setattr(settings, "DATA_BACKEND", "postgres")
+    monkeypatch.setattr(settings, "DATABASE_URL", "")
+    monkeypatch.setattr(repository, "_postgres_repo", None)
+    monkeypatch.setattr(repository, "_postgres_failed", False)
+
+    assert isinstance(repository.get_repository(), SupabaseRepository)
+    assert repository._postgres_failed
+
+
+def test_writes_return_balance_without_follow_up_read(memory_client, monkeypatch):
+    res = memory_client.post("/account/create", json={
+        "holder_name": "Returning User",
+        "pin": "1234",
+        "vpin": "1234",
+        "gmail": "ret@mail.com",
+        "mobileno": "9999999991",
+    })
+    ac_no = res.json()["account_no"]
+
+    db = repository.get_repository()
+    assert db.accounts.deposit(ac_no, 70) == 70
+
+    def no_lookup(ac):
+        raise AssertionError("balance re-read after a write")
+
+    monkeypatch.setattr(db.accounts, "balance", no_lookup)
+    res = memory_client.post("/transaction/withdraw", json={"acc_no": ac_no, "pin": "1234", "amount": 20})
+    assert res.json()["message"].endswith("50")
+
+    res = memory_client.post("/auth/create-user", json={
+        "username": "teller9", "pas": "secret", "vps": "secret", "role": "teller",
+    })
+    assert res.status_code == 200
+    assert res.json()["user_id"] == db.users.get_by_name("teller9")["id"]
@@ -0,0 +1,214 @@
+import httpx
+import pytest
+from postgrest import SyncPostgrestClient
+from postgrest.exceptions import APIError
+
+from app.config import settings
+from app.core import resilience
+from app.core.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded
+from app.services.repository import OutcomeUnknownError
+from app.services.postgrest_queries import PostgrestCatalog
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _catalog(handler, breaker):
+    client = SyncPostgrestClient(
+        "http://db.local/rest/v1",
+        headers={"apiKey": "k", "Authorization": "Bearer k"},
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+    return PostgrestCatalog(client, breaker=breaker)
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "DB_RETRY_BACKOFF", 0.0)
+
+
+def test_breaker_opens_probes_and_closes():
+    clock = _Clock()
+    breaker = CircuitBreaker("t", failure_threshold=2, reset_timeout=5, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 5
+    assert breaker.allow()          # the single probe
+    assert not breaker.allow()      # others still fail fast
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.retry_after() == 5
+
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_reads_retry_writes_do_not():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) % 2:
+            return httpx.Response(503, json={"message": "upstream down", "code": "PGRST001"})
+        return httpx.Response(200, json=[{"id": 1}])
+
+    catalog = _catalog(handler, CircuitBreaker("t", failure_threshold=10))
+    assert catalog.run("user_by_name", "alice") == [{"id": 1}]
+    assert calls == ["GET", "GET"]
+
+    calls.clear()
+    with pytest.raises(APIError):
+        catalog.run("rpc_deposit", body={"ac_no": "AC1", "amount": 1})
+    assert calls == ["POST"]
+
+
+def test_open_circuit_fails_fast_and_business_errors_do_not_trip_it():
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        if request.method == "POST":
+            return httpx.Response(409, json={"message": "duplicate key value", "code": "23505"})
+        raise httpx.ConnectError("refused")
+
+    breaker = CircuitBreaker("t", failure_threshold=3, reset_timeout=60)
+    catalog = _catalog(handler, breaker)
+    for _ in range(5):
+        with pytest.raises(APIError):
+            catalog.run("user_insert", body={"user_name": "x"})
+    assert breaker.state == "closed"
+
+    with pytest.raises(httpx.ConnectError):
+        catalog.run("user_by_name", "alice")      # 3 attempts -> open
+    sent.clear()
+    with pytest.raises(CircuitOpenError):
+        catalog.run("user_by_name", "alice")
+    assert sent == []
+
+
+def test_deadline_caps_call_timeout_and_stops_calls():
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(request.extensions["timeout"]["read"])
+        return httpx.Response(200, json=[])
+
+    catalog = _catalog(handler, CircuitBreaker("t"))
+    with resilience.deadline(0.5):
+        catalog.run("user_by_name", "alice")
+    assert 0 < timeouts[0] <= 0.5
+
+    with resilience.deadline(0.5) as budget:
+        budget.expires = 0          # already spent
+        with pytest.raises(DeadlineExceeded):
+            catalog.run("user_by_name", "alice")
+    assert len(timeouts) == 1
+
+
+def test_unavailable_backend_answers_503(memory_client, monkeypatch):
+    from app.services import repository
+
+    breaker = CircuitBreaker("t", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    repo = repository.get_repository()
+    monkeypatch.setattr(repo.accounts, "get", lambda *a: resilience.call(breaker, lambda t: None, lambda e: True))
+
+    res = memory_client.get("/account/balance/AC1", params={"pin": "1234"})
+    assert res.status_code == 503
+    assert 1 <= int(res.headers["retry-after"]) <= 30
+
+    # Plain validation errors keep their status
+    res = memory_client.post("/account/create", json={
+        "holder_name": "X", "pin": "12", "vpin": "12", "gmail": "x@mail.com", "mobileno": "9999999999",
+    })
+    assert res.status_code in (400, 422)
+    assert memory_client.get("/auth/health").status_code == 200
+
+
+def test_open_circuit_on_the_role_lookup_answers_503(memory_client, monkeypatch):
+    from app.services import repository
+
+    breaker = CircuitBreaker("t", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    repo = repository.get_repository()
+    down = lambda *a: resilience.call(breaker, lambda t: None, lambda e: True)
+    monkeypatch.setattr(repo.users, "get_role", down)
+    monkeypatch.setattr(repo.accounts, "get", down)
+
+    res = memory_client.post("/transaction/deposit", json={"acc_no": "AC1", "pin": "1234", "amount": 10})
+    assert res.status_code == 503
+    assert 1 <= int(res.headers["retry-after"]) <= 30
+
+    # A transport error that outlived the retries is no 500 either
+    def refused(*a):
+        resilience._mark_unavailable(2)
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(repo.users, "get_role", refused)
+    res = memory_client.get("/account/balance/AC1", params={"pin": "1234"})
+    assert res.status_code == 503 and res.headers["retry-after"] == "2"
+
+
+def test_unanswered_write_is_not_reported_as_unavailable():
+    def handler(request):
+        if request.url.path.endswith(("/rpc/deposit_money", "/app_audit_logs", "/accounts")):
+            raise httpx.ReadTimeout("no answer", request=request)
+        raise httpx.ConnectError("refused", request=request)
+
+    catalog = _catalog(handler, CircuitBreaker("t", failure_threshold=10))
+
+    # Sent, never answered: the deposit may have been applied
+    with resilience.deadline(5) as budget:
+        with pytest.raises(OutcomeUnknownError):
+            catalog.run("rpc_deposit", body={"ac_no": "AC1", "amount": 1})
+    assert budget.unavailable is None and budget.outcome_unknown
+
+    # Never reached the backend: safe to retry later
+    with resilience.deadline(5) as budget:
+        with pytest.raises(httpx.ConnectError):
+            catalog.run("rpc_withdraw", body={"ac_no": "AC1", "amount": 1})
+    assert budget.unavailable is not None and not budget.outcome_unknown
+
+    # Side writes move no money: an unanswered one is a plain outage
+    for name, values, body in (("audit_insert", (), {"action": "pin_failed"}),
+                               ("account_update", ("AC1",), {"failed_attempts": 1})):
+        with resilience.deadline(5) as budget:
+            with pytest.raises(httpx.ReadTimeout):
+                catalog.run(name, *values, body=body)
+        assert budget.unavailable is not None and not budget.outcome_unknown
+
+
+def test_timed_out_money_write_answers_without_retry_after(memory_client, monkeypatch):
+    from app.services import repository
+    from app.services.postgrest_queries import _not_applied, _transient
+
+    res = memory_client.post("/account/create", json={
+        "holder_name": "Timeout User", "pin": "1234", "vpin": "1234",
+        "gmail": "timeout@mail.com", "mobileno": "9999999930",
+    })
+    ac_no = res.json()["account_no"]
+
+    def timed_out(timeout):
+        raise httpx.ReadTimeout("no answer")
+
+    breaker = CircuitBreaker("t", failure_threshold=10)
+
+    def deposit(*args):
+        resilience._mark_unavailable(1)    # e.g. a replica read that failed over earlier
+        return resilience.call(breaker, timed_out, _transient, not_applied=_not_applied, money=True)
+
+    monkeypatch.setattr(repository.get_repository().accounts, "deposit", deposit)
+
+    res = memory_client.post("/transaction/deposit", json={"acc_no": ac_no, "pin": "1234", "amount": 10})
+    assert res.status_code == 400
+    assert "retry-after" not in res.headers
+    assert "may have been applied" in res.json()["detail"]
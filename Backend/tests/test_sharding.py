@@ -0,0 +1,197 @@
+import json
+from collections import Counter
+
+import pytest
+
+from app.services import account_service
+from app.services.memory_repository import InMemoryRepository
+from app.services.repository import InsufficientBalanceError, NotFoundError
+from app.services.sharding import ShardRouter, ShardedRepository, jump_hash
+
+
+def _sharded(names=("a", "b", "c"), strategy="hash", bounds=None):
+    router = ShardRouter(names, strategy, bounds)
+    return ShardedRepository({n: InMemoryRepository() for n in names}, router)
+
+
+def _open(repo, ac_no, balance=0):
+    repo.accounts.open({"account_no": ac_no, "name": ac_no, "pin": "h", "mobileno": "9999999999", "gmail": "s@mail.com"})
+    if balance:
+        repo.accounts.deposit(ac_no, balance)
+
+
+def _pair(repo, same=False):
+    """Two account numbers on different shards (or the same one)."""
+    first = "AC1000000000"
+    for i in range(1, 200):
+        other = f"AC{1000000000 + i}"
+        if (repo.router.shard_for(other) == repo.router.shard_for(first)) == same:
+            return first, other
+    raise AssertionError("no pair found")
+
+
+def _total(repo):
+    return sum(r.accounts.balance(ac) for r in repo.shards.values() for ac in list(r.store.accounts))
+
+
+def test_hash_routing_is_stable_and_moves_few_keys_on_growth():
+    keys = [f"AC{1000000000 + i}" for i in range(2000)]
+    three = ShardRouter(["a", "b", "c"])
+    four = ShardRouter(["a", "b", "c", "d"])
+
+    assert [three.shard_for(k) for k in keys] == [three.shard_for(k) for k in keys]
+    assert min(Counter(three.shard_for(k) for k in keys).values()) > 500
+    moved = [k for k in keys if three.shard_for(k) != four.shard_for(k)]
+    assert all(four.shard_for(k) == "d" for k in moved)
+    assert len(moved) < 0.35 * len(keys)
+    assert jump_hash(12345, 1) == 0
+
+
+def test_range_routing():
+    router = ShardRouter(["low", "high"], "range", ["AC0000000000", "AC5000000000"])
+    assert router.shard_for("AC1000000000") == "low"
+    assert router.shard_for("AC5000000000") == "high"
+    assert router.shard_for("AC9999999999") == "high"
+
+
+def test_same_shard_transfer_uses_the_shard_rpc():
+    repo = _sharded()
+    a, b = _pair(repo, same=True)
+    _open(repo, a, 100)
+    _open(repo, b)
+
+    assert repo.accounts.transfer(a, b, 40) == 60
+    shard = repo.for_account(a)
+    assert shard.accounts.balance(b) == 40
+    assert shard.store.transfer_log == {}
+
+
+def test_cross_shard_transfer_commits_both_legs():
+    repo = _sharded()
+    a, b = _pair(repo)
+    _open(repo, a, 100)
+    _open(repo, b)
+
+    assert repo.accounts.transfer(a, b, 30) == 70
+    assert repo.accounts.balance(a) == 70 and repo.accounts.balance(b) == 30
+
+    events = [(e["account_no"], e["kind"], e["balance"]) for e in repo.outbox.pending(10)]
+    assert (a, "transfer_out", 70) in events and (b, "transfer_in", 30) in events
+    legs = [leg["state"] for r in repo.shards.values() for leg in r.store.transfer_log.values()]
+    assert legs == ["committed", "committed"]
+
+    repo.outbox.mark_delivered([e["id"] for e in repo.outbox.pending(10)])
+    assert repo.outbox.pending(10) == []
+
+
+def test_cross_shard_failures_leave_balances_untouched():
+    repo = _sharded()
+    a, b = _pair(repo)
+    _open(repo, a, 50)
+
+    with pytest.raises(NotFoundError, match="Receiver"):
+        repo.accounts.transfer(a, b, 20)
+    assert repo.accounts.balance(a) == 50
+
+    _open(repo, b)
+    with pytest.raises(InsufficientBalanceError):
+        repo.accounts.transfer(a, b, 80)
+    missing = next(f"AC{n}" for n in range(9999999999, 0, -1) if repo.router.shard_for(f"AC{n}") != repo.router.shard_for(b))
+    with pytest.raises(NotFoundError, match="Sender"):
+        repo.accounts.transfer(missing, b, 1)
+    assert (repo.accounts.balance(a), repo.accounts.balance(b)) == (50, 0)
+    assert all(leg["state"] == "aborted" for r in repo.shards.values() for leg in r.store.transfer_log.values())
+
+
+@pytest.mark.parametrize("crash_at, expected", [
+    ("commit_out", (100, 0)),   # never decided -> presumed abort, sender refunded
+    ("commit_in", (70, 30)),    # decided -> recovery credits the receiver
+])
+def test_recovery_settles_a_crashed_coordinator(monkeypatch, crash_at, expected):
+    repo = _sharded()
+    a, b = _pair(repo)
+    _open(repo, a, 100)
+    _open(repo, b)
+    src, dst = repo.for_account(a).accounts, repo.for_account(b).accounts
+
+    target, direction = (src, "out") if crash_at == "commit_out" else (dst, "in")
+    real = type(target).resolve_leg
+
+    def crash(self, txid, d, commit):
+        if self is target and d == direction and commit:
+            raise SystemExit("coordinator died")
+        return real(self, txid, d, commit)
+
+    monkeypatch.setattr(type(target), "resolve_leg", crash)
+    # A dead process does not get to run _decide's fallback either
+    monkeypatch.setattr(repo, "_decide", lambda txid, s: s.accounts.resolve_leg(txid, "out", True))
+    with pytest.raises(SystemExit):
+        repo.accounts.transfer(a, b, 30)
+    monkeypatch.undo()
+
+    assert repo.accounts.balance(a) == 70 and _total(repo) == 70   # money in flight
+    assert repo.recover(older_than=3600) == {"committed": 0, "aborted": 0}
+
+    settled = repo.recover(older_than=0)
+    assert sum(settled.values()) >= 1
+    assert (repo.accounts.balance(a), repo.accounts.balance(b)) == expected
+    assert _total(repo) == 100
+    assert repo.recover(older_than=0) == {"committed": 0, "aborted": 0}
+
+
+def test_customer_logins_live_with_their_account_staff_on_home():
+    repo = _sharded()
+    a, b = _pair(repo)
+    _open(repo, a)
+    staff = repo.users.insert({"user_name": "teller1", "password": "x", "role": "teller"})
+
+    customer = repo.users.get_by_name(a)
+    assert customer["id"].startswith(repo.router.shard_for(a) + ":")
+    assert staff["id"].startswith("a:")
+    assert repo.users.get_role(customer["id"]) == "customer"
+    assert repo.users.get_role(staff["id"]) == "teller"
+
+    repo.users.delete(staff["id"])
+    assert repo.users.get_by_name("teller1") is None
+
+
+def test_search_merges_shards():
+    repo = _sharded()
+    for i in range(6):
+        _open(repo, f"AC{1000000000 + i * 7919}")
+    hits = repo.accounts.search("AC10000", 4)
+    assert len(hits) == 4
+    assert repo.accounts.search("AC10000", 4, 4) == sorted(
+        repo.accounts.search("AC10000", 10), key=lambda h: (-h["score"], h["account_no"]))[4:8]
+
+
+def test_endpoints_transfer_across_shards(memory_client, monkeypatch):
+    from app.config import settings
+    from app.services import repository
+
+    shards = [{"name": n, "backend": "memory"} for n in ("a", "b")]
+    monkeypatch.setattr(settings, "SHARDS", json.dumps(shards))
+    monkeypatch.setattr(repository, "_sharded_repos", {})
+    monkeypatch.setattr(repository, "_opened", {})
+
+    from app.utils.jwt_tools import make_access
+
+    repo = repository.get_repository()
+    admin = repo.users.insert({"user_name": "admin", "password": "x", "role": "admin"})
+    memory_client.cookies.set("atm_token", make_access(admin["id"], "admin"))   # "a:1"
+
+    a, b = _pair(repo)
+    numbers = iter([a, b])
+    monkeypatch.setattr(account_service.AuthService, "generate_account_no", lambda self: next(numbers))
+    for ac_no in (a, b):
+        res = memory_client.post("/account/create", json={
+            "holder_name": "Shard User", "pin": "1234", "vpin": "1234",
+            "gmail": "shard@mail.com", "mobileno": "9999999960",
+        })
+        assert res.json()["account_no"] == ac_no
+
+    assert memory_client.post("/transaction/deposit", json={"acc_no": a, "pin": "1234", "amount": 500}).status_code == 200
+    res = memory_client.post("/transaction/transfer", json={"acc_no": a, "rec_acc_no": b, "pin": "1234", "amount": 200})
+    assert res.status_code == 200
+    assert repository.get_repository(privileged=False).accounts.balance(b) == 200
+    assert [h["action"] for h in repo.history.list(b)] == ["transfer_in"]
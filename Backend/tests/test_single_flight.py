@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+
+
+def _run_concurrently(n, target):
+    results = [None] * n
+
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def test_concurrent_reads_share_one_call():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def slow_read():
+        calls.append(1)
+        release.wait(5)
+        return ["row"]
+
+    threads, results = _run_concurrently(8, lambda: flight.do("AC1", slow_read))
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [["row"]] * 8
+
+
+def test_errors_fan_out_and_are_not_kept():
+    flight = SingleFlight("test")
+
+    def boom():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("AC1", boom)
+    assert flight.do("AC1", lambda: "ok") == "ok"
+
+
+def test_forget_starts_a_fresh_call_after_a_write():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    seen = []
+
+    def read(version):
+        def _fn():
+            seen.append(version)
+            release.wait(5)
+            return version
+        return _fn
+
+    threads, before = _run_concurrently(1, lambda: flight.do("AC1", read("old")))
+    time.sleep(0.05)
+    flight.forget("AC1")  # a write landed
+    late, after = _run_concurrently(1, lambda: flight.do("AC1", read("new")))
+    time.sleep(0.05)
+    release.set()
+    for t in threads + late:
+        t.join()
+
+    assert before == ["old"] and after == ["new"]
+    assert seen == ["old", "new"]
+
+
+def test_disabled_calls_through():
+    flight = SingleFlight("test", enabled=False)
+    calls = []
+    flight.do("k", lambda: calls.append(1))
+    flight.do("k", lambda: calls.append(1))
+    assert len(calls) == 2
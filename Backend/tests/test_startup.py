@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Generous enough for slow CI runners; override with IMPORT_BUDGET_SECONDS
+IMPORT_BUDGET = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+
+# Loaded on first use (warmup), never by `import app.main`
+LAZY_MODULES = ("supabase", "postgrest", "psycopg")
+
+_PROBE = (
+    "import sys, time, json\n"
+    "t = time.perf_counter()\n"
+    "import app.main\n"
+    "elapsed = time.perf_counter() - t\n"
+    f"print(json.dumps({{'seconds': elapsed, "
+    f"'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))\n"
+)
+
+
+def _cold_import() -> dict:
+    env = dict(os.environ)
+    env.setdefault("SUPABASE_URL", "http://startup.local")
+    env.setdefault("SUPABASE_KEY", "startup")
+    env.setdefault("SUPABASE_SERVICE_ROLE_KEY", "startup")
+    env.setdefault("SECRET_KEY", "startup")
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_import_skips_data_backend_clients():
+    assert _cold_import()["loaded"] == []
+
+
+def test_import_time_within_budget():
+    # Best of three to ignore a cold page cache on the first run
+    best = min(_cold_import()["seconds"] for _ in range(3))
+    assert best < IMPORT_BUDGET, f"import app.main took {best:.3f}s (budget {IMPORT_BUDGET}s)"
+
+
+def test_import_without_env_defers_validation():
+    env = {k: v for k, v in os.environ.items()
+           if not k.startswith("SUPABASE") and k != "SECRET_KEY"}
+    proc = subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    assert proc.returncode == 0, proc.stderr